@@ -1,12 +1,18 @@
 import sys
+import time
+import threading
 import requests
 import json
 import argparse
 import os
+from requests.adapters import HTTPAdapter
 from concurrent.futures import ThreadPoolExecutor
 
-from config import AGENTS, TIMEOUTS, GENERATION
-from utils import save_output
+from config import AGENTS, TIMEOUTS, GENERATION, ENGINE
+from utils import (
+    save_output, ResponseCache, get_endpoint_pool, agent_urls, prefill_from_response, get_token_budget, profiled,
+    configure_cassette, get_cassette
+)
 
 # Prompts Especializados
 SYSTEM_PROMPTS = {
@@ -23,10 +29,57 @@ SYSTEM_PROMPTS = {
     Focus strictly on the requested fix."""
 }
 
-def call_api(agent_name, prompt, mode="default"):
+# Pedido de continuacion cuando una respuesta se corta por max_tokens
+CONTINUE_PROMPT = ("Continue exactly where you stopped. Output ONLY the remaining code, "
+                   "without repeating what was already written and without explanations.")
+
+# Sesion HTTP compartida por proceso (conexiones keep-alive reutilizables)
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+def get_session(pool_size=None):
+    """
+    Devuelve la sesion HTTP compartida del proceso.
+    Si se pide un pool mayor al actual, se recrea con el nuevo tamano.
+    """
+    global _session, _session_pool_size
+    pool_size = pool_size or ENGINE['pool_size']
+
+    with _session_lock:
+        if _session is None or pool_size > _session_pool_size:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=sum(len(agent_urls(a)) for a in AGENTS.values()), pool_maxsize=pool_size, pool_block=True)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            if _session is not None:
+                _session.close()
+            _session = session
+            _session_pool_size = pool_size
+        return _session
+
+def mode_max_tokens(mode="default"):
+    """max_tokens maximo del modo (limite del presupuesto dinamico)"""
+    return GENERATION['max_tokens_patch'] if mode == "patch" else GENERATION['max_tokens_default']
+
+def task_max_tokens(mode, output=None, template_name=None, task_name=None):
+    """max_tokens de una tarea segun el presupuesto aprendido (None: maximo del modo)"""
+    budget = get_token_budget()
+    if budget is None:
+        return None
+    return budget.max_tokens(mode_max_tokens(mode), output, template_name, task_name)
+
+def build_request(agent_name, prompt, mode="default", url=None, slot=None, max_tokens=None, history=None):
+    """
+    Construye (url, headers, payload) para una peticion de chat completions.
+    url permite elegir uno de los endpoints del agente (ver EndpointPool) y
+    slot fija la peticion a un slot de llama.cpp reutilizando su cache de prompt.
+    max_tokens reemplaza el maximo del modo (ver TokenBudget) e history agrega
+    mensajes tras el prompt (continuaciones).
+    """
     agent = AGENTS.get(agent_name)
     if not agent:
-        return f"Error: Agente '{agent_name}' no encontrado"
+        return None
 
     headers = {
         "Content-Type": "application/json",
@@ -34,40 +87,371 @@ def call_api(agent_name, prompt, mode="default"):
     }
 
     sys_msg = SYSTEM_PROMPTS["patch"] if mode == "patch" else SYSTEM_PROMPTS["default"]
-    max_tokens = GENERATION['max_tokens_patch'] if mode == "patch" else GENERATION['max_tokens_default']
 
     data = {
         "model": agent['model'],
         "messages": [
             {"role": "system", "content": sys_msg},
             {"role": "user", "content": prompt}
-        ],
+        ] + (history or []),
         "temperature": 0.2,
-        "max_tokens": max_tokens,
+        "max_tokens": max_tokens or mode_max_tokens(mode),
         "stream": False
     }
+    if slot is not None:
+        data["id_slot"] = slot
+        data["cache_prompt"] = True
+
+    return url or agent['url'], headers, data
+
+def response_cache_key(agent_name, prompt, mode="default"):
+    """
+    Clave de cache de la peticion (modelo, system prompt, prompt, temperatura, max_tokens del modo).
+
+    El presupuesto aprendido de la tarea (TokenBudget) queda fuera: cambia entre
+    ejecuciones y las continuaciones completan la salida aunque se agote, igual
+    que en Cassette.make_key.
+    """
+    built = build_request(agent_name, prompt, mode)
+    if built is None:
+        return None
+    return ResponseCache.make_key(built[2])
+
+def completion_result(success, content='', error='', **extra):
+    """Resultado normalizado de una peticion (mismas claves en todos los motores)"""
+    result = {
+        'success': success,
+        'content': content,
+        'error': error,
+        'usage': None,
+        'ttft': None,
+        'timeout': False,
+        'aborted': False,
+        'prefill': None,
+        'finish_reason': None,
+        'continuations': 0,
+        'finished_at': time.time(),
+    }
+    result.update(extra)
+    return result
+
+def continuation_messages(content):
+    """Mensajes para pedir la continuacion de una respuesta cortada"""
+    return [
+        {"role": "assistant", "content": content},
+        {"role": "user", "content": CONTINUE_PROMPT}
+    ]
+
+def continuation_text(content, more):
+    """
+    Texto a anexar de una continuacion. Si el bloque de codigo quedo abierto y
+    el modelo vuelve a abrir uno, se descarta esa linea de apertura.
+    """
+    if content.count('```') % 2 == 1 and more.lstrip().startswith('```'):
+        more = more.lstrip()
+        more = more.split('\n', 1)[1] if '\n' in more else ''
+    return more
+
+def sum_counts(total, extra):
+    """Suma contadores enteros de dos dicts (usage, prefill); None si ambos faltan"""
+    if not total or not extra:
+        return total or extra
+    merged = dict(total)
+    for key, value in extra.items():
+        if isinstance(value, int) and isinstance(merged.get(key, 0), int):
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+def endpoint_ok(result):
+    """
+    Indica si el endpoint respondio correctamente (para EndpointPool.release).
+    Un aborto propio o un 4xx (prompt invalido) no son culpa del servidor.
+    """
+    return result['success'] or result['aborted'] or 400 <= result.get('status', 0) < 500
+
+def routed(agent_name, completion, *args, pin=None):
+    """
+    Ejecuta completion(url, slot, ...) contra el endpoint con menos peticiones
+    en vuelo del agente y registra el resultado en su pool.
+
+    pin ({'url', 'slot'}, ver plan_prefix_dispatch) prefiere un endpoint y slot
+    concretos; si ese endpoint esta expulsado se usa otro sin fijar slot.
+    """
+    pool = get_endpoint_pool(agent_name)
+    if pool is None:
+        return completion_result(False, error=f"Error: Agente '{agent_name}' no encontrado")
+    url = pool.acquire(prefer=pin['url'] if pin else None)
+    slot = pin['slot'] if pin and pin['url'] == url else None
+    result = None
+    try:
+        result = completion(url, slot, *args)
+    finally:
+        pool.release(url, result is not None and endpoint_ok(result))
+    return result
+
+def taped(agent_name, prompt, mode, live, on_text=None, index=None):
+    """
+    Ejecuta live() grabando su resultado en la cassette del proceso, o sirve
+    la generacion desde la cassette sin contactar al servidor (--replay).
+
+    Args:
+        live: Funcion sin argumentos que hace la peticion real
+        on_text: Callback de streaming (la reproduccion tambien lo alimenta)
+        index: Turno de la peticion reservado por el proceso padre (motor subprocess)
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return live()
+    payload = build_request(agent_name, prompt, mode)[2]
+    if cassette.replaying:
+        return cassette.replay(payload, on_text, index)
+    started = time.time()
+    result = live()
+    cassette.record(payload, result, started, stream=on_text is not None)
+    return result
+
+def request_completion(agent_name, prompt, mode="default", session=None, pin=None, max_tokens=None):
+    """
+    Ejecuta una peticion de generacion y devuelve el resultado estructurado.
+    Si la respuesta se corta por max_tokens se pide su continuacion.
+
+    Returns:
+        dict: {'success', 'content', 'error', 'usage', 'ttft', 'timeout', 'aborted',
+               'prefill', 'finish_reason', 'continuations'}
+    """
+    return taped(agent_name, prompt, mode,
+                 lambda: routed(agent_name, _request_completion, agent_name, prompt, mode, session, max_tokens, pin=pin))
+
+def _request_completion(url, slot, agent_name, prompt, mode, session, max_tokens=None):
+    url, headers, data = build_request(agent_name, prompt, mode, url, slot, max_tokens)
+
+    post = session.post if session is not None else requests.post
+    try:
+        response = post(url, headers=headers, json=data, timeout=TIMEOUTS['generation'])
+        if response.status_code != 200:
+            return completion_result(False, error=f"Error {response.status_code}: {response.text}", status=response.status_code)
+        body = response.json()
+        choice = body['choices'][0]
+        result = completion_result(True, choice['message']['content'], usage=body.get('usage'),
+                                   prefill=prefill_from_response(body), finish_reason=choice.get('finish_reason'))
+    except requests.Timeout as e:
+        return completion_result(False, error=f"Exception: {e}", timeout=True)
+    except Exception as e:
+        return completion_result(False, error=f"Exception: {e}")
+
+    return continue_completion(url, slot, agent_name, prompt, mode, session, max_tokens, result)
+
+def continue_completion(url, slot, agent_name, prompt, mode, session, max_tokens, result, on_text=None):
+    """
+    Completa una respuesta cortada por max_tokens (finish_reason 'length')
+    pidiendo al mismo endpoint y slot que continue donde se quedo, hasta
+    GENERATION['max_continuations'] veces. Si una continuacion falla se
+    conserva lo generado hasta ese momento.
+
+    Args:
+        result: Resultado exitoso de la peticion original (se actualiza)
+        on_text: Callback de streaming para el texto anexado (puede abortar)
+    """
+    post = session.post if session is not None else requests.post
+    while result['finish_reason'] == 'length' and result['continuations'] < GENERATION['max_continuations']:
+        url, headers, data = build_request(agent_name, prompt, mode, url, slot, max_tokens,
+                                           continuation_messages(result['content']))
+        try:
+            response = post(url, headers=headers, json=data, timeout=TIMEOUTS['generation'])
+            if response.status_code != 200:
+                break
+            body = response.json()
+            choice = body['choices'][0]
+        except Exception:
+            break
 
+        more = continuation_text(result['content'], choice['message']['content'] or '')
+        result.update(
+            content=result['content'] + more,
+            finish_reason=choice.get('finish_reason'),
+            continuations=result['continuations'] + 1,
+            usage=sum_counts(result['usage'], body.get('usage')),
+            prefill=sum_counts(result['prefill'], prefill_from_response(body)),
+        )
+        abort_error = on_text(more) if on_text and more else None
+        if abort_error:
+            result.update(success=False, error=f"Stream abortado: {abort_error}", aborted=True)
+            break
+    result['finished_at'] = time.time()
+    return result
+
+def parse_sse_line(line):
+    """
+    Interpreta una linea SSE de chat completions en streaming.
+
+    Returns:
+        tuple: (delta: str, done: bool, event: dict|None)
+    """
+    if not line or not line.startswith('data:'):
+        return '', False, None
+    data = line[5:].strip()
+    if data == '[DONE]':
+        return '', True, None
     try:
-        response = requests.post(agent['url'], headers=headers, json=data, timeout=TIMEOUTS['generation'])
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        return f"Error {response.status_code}: {response.text}"
+        event = json.loads(data)
+    except json.JSONDecodeError:
+        return '', False, None
+    choices = event.get('choices') or [{}]
+    delta = (choices[0].get('delta') or {}).get('content') or ''
+    return delta, False, event
+
+def stream_completion(agent_name, prompt, mode="default", session=None, on_text=None, pin=None, max_tokens=None):
+    """
+    Ejecuta una peticion en streaming (SSE) y entrega el texto a medida que llega.
+
+    Args:
+        on_text: Callback (delta) -> None o mensaje de error. Si devuelve un
+                 mensaje, la peticion se cancela en el acto.
+
+    Returns:
+        dict: mismas claves que request_completion
+    """
+    return taped(agent_name, prompt, mode,
+                 lambda: routed(agent_name, _stream_completion, agent_name, prompt, mode, session, on_text, max_tokens,
+                                pin=pin),
+                 on_text)
+
+def _stream_completion(url, slot, agent_name, prompt, mode, session, on_text, max_tokens=None):
+    url, headers, data = build_request(agent_name, prompt, mode, url, slot, max_tokens)
+    data['stream'] = True
+
+    post = session.post if session is not None else requests.post
+    started = time.time()
+    ttft = None
+    usage = None
+    timings = None
+    finish_reason = None
+    parts = []
+    try:
+        response = post(url, headers=headers, json=data, timeout=TIMEOUTS['generation'], stream=True)
+        with response:
+            if response.status_code != 200:
+                return completion_result(False, error=f"Error {response.status_code}: {response.text}", status=response.status_code)
+
+            for line in response.iter_lines(decode_unicode=True):
+                delta, done, event = parse_sse_line(line)
+                if done:
+                    break
+                if event and event.get('usage'):
+                    usage = event['usage']
+                if event and event.get('timings'):
+                    timings = event['timings']
+                if event and (event.get('choices') or [{}])[0].get('finish_reason'):
+                    finish_reason = event['choices'][0]['finish_reason']
+                if not delta:
+                    continue
+                if ttft is None:
+                    ttft = time.time() - started
+                parts.append(delta)
+                abort_error = on_text(delta) if on_text else None
+                if abort_error:
+                    # Cerrar la respuesta cancela la generacion en el servidor
+                    return completion_result(False, ''.join(parts), f"Stream abortado: {abort_error}", ttft=ttft, aborted=True)
+    except requests.Timeout as e:
+        return completion_result(False, ''.join(parts), f"Exception: {e}", ttft=ttft, timeout=True)
     except Exception as e:
-        return f"Exception: {e}"
+        return completion_result(False, ''.join(parts), f"Exception: {e}", ttft=ttft)
+
+    prefill = prefill_from_response({'usage': usage, 'timings': timings})
+    result = completion_result(True, ''.join(parts), usage=usage, ttft=ttft, prefill=prefill, finish_reason=finish_reason)
+    return continue_completion(url, slot, agent_name, prompt, mode, session, max_tokens, result, on_text)
+
+def warm_prompt_cache(agent_name, prefix, url, slot, mode="default", session=None):
+    """
+    Precalienta la cache de prompt de un slot con el system prompt y un prefijo
+    comun (1 token de salida). Devuelve True si el servidor respondio 200.
+    """
+    url, headers, data = build_request(agent_name, prefix, mode, url, slot, max_tokens=1)
+    post = session.post if session is not None else requests.post
+    try:
+        response = post(url, headers=headers, json=data, timeout=TIMEOUTS['generation'])
+        return response.status_code == 200
+    except Exception:
+        return False
+
+@profiled('save')
+def finish_attempt(response, output, writer=None):
+    """Guarda la respuesta de un intento y construye el resultado de generate_attempt"""
+    attempt = {
+        'success': False,
+        'output': '',
+        'error': response['error'],
+        'ttft': response['ttft'],
+        'content': None,
+        'usage': response['usage'],
+        'timeout': response['timeout'],
+        'aborted': response['aborted'],
+        'prefill': response['prefill'],
+        'continuations': response['continuations'],
+        'finished_at': response['finished_at'],
+        'saved_at': None
+    }
+    if not response['success']:
+        if writer:
+            writer.discard()
+        return attempt
+
+    content = response['content']
+    if output:
+        saved_path = writer.finish(content) if writer else save_output(content, output)
+        if not saved_path:
+            attempt['error'] = f"No se pudo guardar {output}"
+            return attempt
+        attempt['output'] = f"[SAVED] {saved_path}"
+    else:
+        attempt['output'] = content
+
+    attempt.update(success=True, error='', content=content, saved_at=time.time())
+    return attempt
+
+def call_api(agent_name, prompt, mode="default", session=None):
+    result = request_completion(agent_name, prompt, mode, session)
+    return result['content'] if result['success'] else result['error']
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("agent", choices=["qwen", "mimo"])
+    parser.add_argument("agent", choices=list(AGENTS))
     parser.add_argument("prompt")
     parser.add_argument("--mode", choices=["default", "patch"], default="default")
     parser.add_argument("--output", help="Ruta donde guardar el archivo generado")
+    parser.add_argument("--url", help="Endpoint concreto del agente (por defecto se balancea entre sus urls)")
+    parser.add_argument("--max-tokens", type=int, help="Presupuesto de tokens (por defecto el maximo del modo)")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE", help="Agregar la generacion a una cassette")
+    cassette.add_argument("--replay", metavar="CASSETTE", help="Servir la generacion desde una cassette (sin servidor)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Factor de las latencias grabadas (--replay)")
+    parser.add_argument("--cassette-index", type=int, help="Turno de la peticion en la cassette (lo fija el proceso padre)")
     args = parser.parse_args()
 
+    if args.record or args.replay:
+        configure_cassette(args.record or args.replay, 'record' if args.record else 'replay', args.latency_scale)
+
     print(f"--- {args.agent.upper()} ({args.mode.upper()}) ---")
-    res = call_api(args.agent, args.prompt, args.mode)
+    if args.url:
+        # Endpoint elegido por el proceso padre (motor subprocess)
+        result = taped(args.agent, args.prompt, args.mode,
+                       lambda: _request_completion(args.url, None, args.agent, args.prompt, args.mode, None, args.max_tokens),
+                       index=args.cassette_index)
+    else:
+        result = request_completion(args.agent, args.prompt, args.mode, max_tokens=args.max_tokens)
+
+    if not result['success']:
+        # Codigo de salida != 0 para que el batch reintente (y no guardar el error como codigo)
+        print(result['error'], file=sys.stderr)
+        sys.exit(1)
+    res = result['content']
 
     if args.output:
         saved_path = save_output(res, args.output)
+        if not saved_path:
+            print(f"No se pudo guardar {args.output}", file=sys.stderr)
+            sys.exit(1)
+        # Senal de escritura completa para el proceso padre (motor subprocess)
         print(f"\n[SAVED] {saved_path}")
     else:
-        print(res)
\ No newline at end of file
+        print(res)
@@ -1,14 +1,37 @@
 import subprocess
 import argparse
-import json
+import contextlib
+import io
 import os
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import time
-import requests
 
-from config import SCRIPTS, PROJECT_ROOT, LLM_SERVER, TIMEOUTS, GENERATION
-from utils import load_json, save_json, ensure_dir_exists
+from config import (
+    SCRIPTS, PROJECT_ROOT, TIMEOUTS, GENERATION, ENGINE, CACHE, AUTOSCALE, AGENTS, PREFIX_DISPATCH,
+    TOKEN_BUDGET, HEDGING, METRICS, CASSETTE, VALIDATION_CACHE
+)
+from utils import (
+    load_json, save_json, save_output, ensure_dir_exists, StreamingOutput, PYTHON_IN_JS_PATTERNS,
+    NODEJS_API_PATTERNS, COMMONJS_PATTERNS, FILE_TYPES_BY_EXT, scan_content, scan_structure,
+    get_response_cache, configure_response_cache, store_validated_output,
+    configure_concurrency, get_concurrency, get_endpoint_pool, endpoint_stats,
+    plan_prefix_dispatch, summarize_prefill, configure_token_budget, check_agent_health,
+    configure_hedging, get_hedger, leg_path, promote_leg, failed_leg, discard_leg,
+    attempt_timeline, attempt_phases, record_validation, summarize_phases, BatchMetrics, start_metrics_server,
+    configure_profiling, profile_stage, profile_span, profiled, finish_profiling, configure_cassette, get_cassette,
+    get_template_registry, get_validation_cache, configure_validation_cache, content_digest,
+    analyze_python, analyze_python_file, local_modules, pip_name, requirement_line, find_forbidden_imports
+)
+from ask_agent import (
+    build_request, request_completion, stream_completion, get_session, response_cache_key, finish_attempt, warm_prompt_cache,
+    task_max_tokens
+)
+from async_engine import run_batch_async
+from validate_output import validate_structure, generate_report, structure_types
+from update_metrics import update_metrics_from_report
 
 def load_tasks(tasks_file):
     """Carga las tareas desde un archivo JSON"""
@@ -17,18 +40,10 @@ def load_tasks(tasks_file):
         raise FileNotFoundError(f"No se pudo cargar: {tasks_file}")
     return data
 
+@profiled('template')
 def load_template(template_name):
-    """Carga un template de la librería de templates"""
-    templates_path = os.path.join(os.path.dirname(__file__), 'templates.json')
-    templates = load_json(templates_path)
-    if templates is None:
-        return None
-
-    for template in templates:
-        if template['template_name'] == template_name:
-            return template
-
-    return None
+    """Carga un template de la librería de templates (cacheado; se relee si cambia templates.json)"""
+    return get_template_registry().get(template_name)
 
 def normalize_path(base_dir, output_path):
     """Evita duplicación de rutas: base_dir/file.py no se convierte en base_dir/base_dir/file.py"""
@@ -46,20 +61,8 @@ def get_contract_rules(output_file, template):
     if not template or 'contracts' not in template:
         return ""
     
-    # Normalizar ruta
-    output_file = output_file.replace('\\', '/')
-    
     # Buscar en contratos (puede ser nombre completo o solo archivo)
-    contract = None
-    if output_file in template['contracts']:
-        contract = template['contracts'][output_file]
-    else:
-        # Buscar por nombre de archivo solo
-        filename = output_file.split('/')[-1]
-        for key, value in template['contracts'].items():
-            if key.endswith('/' + filename) or key == filename:
-                contract = value
-                break
+    contract = get_template_registry().index_for(template).contracts.for_file(output_file)
     
     if not contract:
         return ""
@@ -81,20 +84,8 @@ def get_example_code(output_file, template):
     if not template or 'examples' not in template:
         return ""
     
-    # Normalizar ruta
-    output_file = output_file.replace('\\', '/')
-    
     # Buscar en ejemplos (puede ser nombre completo o solo archivo)
-    example_code = None
-    if output_file in template['examples']:
-        example_code = template['examples'][output_file]
-    else:
-        # Buscar por nombre de archivo solo
-        filename = output_file.split('/')[-1]
-        for key, value in template['examples'].items():
-            if key.endswith('/' + filename) or key == filename:
-                example_code = value
-                break
+    example_code = get_template_registry().index_for(template).examples.for_file(output_file)
     
     if not example_code:
         return ""
@@ -102,6 +93,7 @@ def get_example_code(output_file, template):
     lines = example_code.split('\n')[:5]  # Máximo 5 líneas
     return f"Ejemplo:\n```\n{'\n'.join(lines)}\n```\n"
 
+@profiled('prompt')
 def generate_enhanced_prompt(prompt, template_name=None, output_file=None):
     """
     Genera prompt optimizado basado en contratos simples.
@@ -114,24 +106,12 @@ def generate_enhanced_prompt(prompt, template_name=None, output_file=None):
     if "Generate ONLY" in prompt or "Generate ONLY" in prompt.upper():
         return prompt
     
-    template = load_template(template_name)
-    if not template or 'contracts' not in template:
+    template = get_template_registry().index(template_name)
+    if not template or not template.contracts:
         return prompt
     
-    # Extraer extensión y tipo de archivo
-    ext = output_file.split('.')[-1].lower()
-    filename = output_file.split('/')[-1]
-    
-    # Buscar contrato para este archivo
-    contract = None
-    if filename in template['contracts']:
-        contract = template['contracts'][filename]
-    else:
-        # Buscar por extensión
-        for key, value in template['contracts'].items():
-            if key.endswith(f'.{ext}'):
-                contract = value
-                break
+    # Buscar contrato para este archivo (nombre exacto o, si no, por extensión)
+    contract = template.contracts.for_prompt(output_file)
     
     if not contract:
         return prompt
@@ -158,49 +138,16 @@ def generate_enhanced_prompt(prompt, template_name=None, output_file=None):
     return prefix + prompt
 
 def extract_python_dependencies(file_path):
-    """Extrae dependencias externas de un archivo Python"""
-    if not os.path.exists(file_path):
+    """Extrae dependencias externas de un archivo Python (paquetes de pip, sin modulos locales)"""
+    analysis = analyze_python_file(file_path)
+    if analysis is None:
         return []
-
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Lista de librerías estándar de Python para filtrar
-        standard_library = {
-            'os', 'sys', 'json', 'time', 'datetime', 're', 'math',
-            'collections', 'itertools', 'functools', 'pathlib', 'random',
-            'subprocess', 'shutil', 'argparse', 'logging', 'typing',
-            'threading', 'multiprocessing', 'queue', 'socket', 'urllib'
-        }
-
-        dependencies = set()
-
-        # Detectar patrones: from X import Y, import X
-        import_patterns = [
-            r'from\s+([a-zA-Z0-9_]+)\s+import',
-            r'import\s+([a-zA-Z0-9_]+)(?:\s+as|$)',
-            r'from\s+([a-zA-Z0-9_]+)\.([a-zA-Z0-9_]+)\s+import'
-        ]
-
-        for pattern in import_patterns:
-            matches = re.findall(pattern, content)
-            for match in matches:
-                if isinstance(match, tuple):
-                    import_name = match[0]
-                else:
-                    import_name = match
-
-                # Filtrar imports relativos y librerías estándar
-                if import_name and import_name not in standard_library and not import_name.startswith('.'):
-                    # Convertir _ a - para nombres de paquetes (ej: flask_cors -> flask-cors)
-                    package_name = import_name.replace('_', '-')
-                    dependencies.add(package_name)
-
-        return sorted(list(dependencies))
-    except Exception as e:
-        print(f"Error extrayendo dependencias de {file_path}: {e}")
+    if analysis['syntax_error']:
+        print(f"Error extrayendo dependencias de {file_path}: sintaxis invalida "
+              f"(linea {analysis['syntax_error']['line']})")
         return []
+    local = set(local_modules(analysis, os.path.dirname(file_path) or '.'))
+    return [pip_name(module) for module in analysis['external'] if module not in local]
 
 def generate_requirements_txt(project_dir, dependencies):
     """Genera archivo requirements.txt con las dependencias detectadas"""
@@ -211,11 +158,8 @@ def generate_requirements_txt(project_dir, dependencies):
         requirements_path = os.path.join(project_dir, 'requirements.txt')
         with open(requirements_path, 'w', encoding='utf-8') as f:
             for dep in dependencies:
-                # Agregar versión mínima para Flask
-                if dep == 'flask':
-                    f.write(f"{dep}>=2.0.0\n")
-                else:
-                    f.write(f"{dep}\n")
+                # Version minima para los paquetes de REQUIREMENT_PINS (flask>=2.0.0)
+                f.write(f"{requirement_line(dep)}\n")
         return True
     except Exception as e:
         print(f"Error generando requirements.txt: {e}")
@@ -223,33 +167,99 @@ def generate_requirements_txt(project_dir, dependencies):
 
 def check_forbidden_imports(file_path, template_name):
     """Verifica si el archivo tiene imports prohibidos según el template"""
-    if not os.path.exists(file_path):
+    template = load_template(template_name)
+    if not template or 'forbidden_imports' not in template:
         return []
 
-    try:
-        template = load_template(template_name)
-        if not template or 'forbidden_imports' not in template:
-            return []
-
-        forbidden_imports = template['forbidden_imports']
-        warnings = []
+    analysis = analyze_python_file(file_path)
+    if analysis is None:
+        return []
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    return [
+        f"Import prohibido detectado: {module} (no permitido en template {template_name})"
+        for _, module in find_forbidden_imports(analysis, template['forbidden_imports'])
+    ]
 
-        for forbidden in forbidden_imports:
-            # Convertir _ a - y viceversa para match
-            patterns = [forbidden, forbidden.replace('-', '_')]
-            for pattern in patterns:
-                if f'from {pattern}' in content or f'import {pattern}' in content:
-                    warnings.append(f"Import prohibido detectado: {pattern} (no permitido en template {template_name})")
-                    break
+def check_content_structure(ext, content):
+    """
+    Checks de contenido de early_validation_check (dependen solo del texto y la extension).
 
-        return warnings
-    except Exception as e:
-        print(f"Error verificando imports prohibidos: {e}")
+    Returns:
+        list: Errores encontrados
+    """
+    errors = []
+    scan = scan_content(content, FILE_TYPES_BY_EXT.get(ext, ext))
+
+    if ext == 'html':
+        if '</html>' not in scan:
+            errors.append("HTML incompleto: falta </html>")
+        if '<body>' not in scan or '</body>' not in scan:
+            errors.append("HTML incompleto: falta <body> o </body>")
+        if '<head>' not in scan or '</head>' not in scan:
+            errors.append("HTML incompleto: falta <head> o </head>")
+
+    elif ext == 'py':
+        if not content.strip():
+            errors.append("Archivo Python vacío")
+        analysis = analyze_python(content)
+        if analysis['syntax_error']:
+            error = analysis['syntax_error']
+            errors.append(f"Error de sintaxis Python: {error['message']} (linea {error['line']})")
+        # Check básico para Flask
+        elif 'flask' not in analysis['external']:
+            errors.append("Falta import de Flask en archivo Python")
+
+    elif ext == 'js':
+        if not content.strip():
+            errors.append("Archivo JavaScript vacío")
+        
+        # Check básico para evitar código Python en JS
+        # Python comment style: # comment at beginning
+        lines = content.strip().split('\n')
+        if lines and lines[0].strip().startswith('#'):
+            errors.append("Archivo JavaScript contiene comentarios estilo Python (#) - debe usar // o /* */")
+        
+        # Check más estricto para contenido Python
+        pattern = scan.first_of(PYTHON_IN_JS_PATTERNS)
+        if pattern:  # Solo reportar el primer patrón Python
+            errors.append(f"Archivo JavaScript contiene código Python: '{pattern}' - debe ser código de navegador")
+        
+        # Check 2: Detectar Node.js/CommonJS patterns
+        if scan.first_of(COMMONJS_PATTERNS):
+            errors.append("JavaScript contiene require() - sintaxis Node.js/CommonJS (debe ser para navegador)")
+        if 'module.exports' in scan:
+            errors.append("JavaScript contiene module.exports - sintaxis Node.js (no funciona en navegador)")
+        
+        # Check 3: Detectar ES Modules (import from)
+        if 'import ' in scan and ' from ' in scan:
+            # Solo validar si es ES Modules real (import con from), no solo import
+            if not scan.count('import ') > 5:  # Permitir múltiples import básicos pero no muchos
+                errors.append("JavaScript contiene 'import ... from' - ES Modules (requiere bundler, usar <script> en HTML)")
+        
+        # Check 4: Detectar server-side patterns
+        pattern = scan.first_of(NODEJS_API_PATTERNS)
+        if pattern:  # Solo reportar el primer error de Node.js
+            errors.append(f"JavaScript contiene '{pattern}' - API de Node.js server-side (no funciona en navegador)")
+
+    # Anidacion, cadenas y comentarios sin cerrar (salida truncada o rota)
+    if content.strip():
+        structure = scan_structure(content, FILE_TYPES_BY_EXT.get(ext))
+        if structure is not None and not structure.ok:
+            errors.append(f"Estructura incompleta o rota: {structure.summary()}")
+
+    return errors
+
+def flask_warnings(analysis):
+    """Avisos de una app Flask sin app o sin rutas (analisis de analyze_python)"""
+    if analysis['syntax_error'] or 'flask' not in analysis['external']:
         return []
+    if not analysis['flask_apps']:
+        return ["No se detecta la app Flask (app = Flask(__name__))"]
+    if not analysis['routes']:
+        return ["La app Flask no define rutas (@app.route)"]
+    return []
 
+@profiled('validation')
 def early_validation_check(output_file, template_name=None):
     """Validación temprana post-generación (sin IA) para detectar errores obvios"""
     if not output_file:
@@ -269,77 +279,22 @@ def early_validation_check(output_file, template_name=None):
         errors.append(f"Archivo demasiado pequeño: {file_size} bytes (mínimo esperado: {GENERATION['min_file_size']})")
         return {'valid': False, 'errors': errors, 'warnings': warnings}
 
-    # Check 3: Estructura básica según extensión
+    # Check 3: Estructura básica según extensión (cacheada por hash de contenido)
     try:
         with open(output_file, 'r', encoding='utf-8') as f:
             content = f.read()
-
-        if output_file.endswith('.html'):
-            if '</html>' not in content:
-                errors.append("HTML incompleto: falta </html>")
-            if '<body>' not in content or '</body>' not in content:
-                errors.append("HTML incompleto: falta <body> o </body>")
-            if '<head>' not in content or '</head>' not in content:
-                errors.append("HTML incompleto: falta <head> o </head>")
-
-        elif output_file.endswith('.py'):
-            if not content.strip():
-                errors.append("Archivo Python vacío")
-            # Check básico para Flask
-            if 'from flask import' not in content:
-                errors.append("Falta import de Flask en archivo Python")
-
-            # Check 4: Verificar imports prohibidos según template
-            if template_name:
-                import_warnings = check_forbidden_imports(output_file, template_name)
-                warnings.extend(import_warnings)
-
-        elif output_file.endswith('.js'):
-            if not content.strip():
-                errors.append("Archivo JavaScript vacío")
-            
-            # Check básico para evitar código Python en JS
-            # Python comment style: # comment at beginning
-            lines = content.strip().split('\n')
-            if lines and lines[0].strip().startswith('#'):
-                errors.append("Archivo JavaScript contiene comentarios estilo Python (#) - debe usar // o /* */")
-            
-            # Check más estricto para contenido Python
-            python_patterns = [
-                'from flask import',
-                'from flask import Flask',
-                'app = Flask(',
-                '@app.route(',
-                'def index(',
-                "render_template('",
-                "if __name__ == '__main__':",
-                'app.run(port=5000',
-                'app.run(port=5000,',
-                'debug=True'
-            ]
-            for pattern in python_patterns:
-                if pattern in content:
-                    errors.append(f"Archivo JavaScript contiene código Python: '{pattern}' - debe ser código de navegador")
-                    break  # Solo reportar el primer patrón Python
-            
-            # Check 2: Detectar Node.js/CommonJS patterns
-            if "require('" in content or "require(\"" in content or "require(`" in content:
-                errors.append("JavaScript contiene require() - sintaxis Node.js/CommonJS (debe ser para navegador)")
-            if 'module.exports' in content:
-                errors.append("JavaScript contiene module.exports - sintaxis Node.js (no funciona en navegador)")
-            
-            # Check 3: Detectar ES Modules (import from)
-            if 'import ' in content and ' from ' in content:
-                # Solo validar si es ES Modules real (import con from), no solo import
-                if not content.count('import ') > 5:  # Permitir múltiples import básicos pero no muchos
-                    errors.append("JavaScript contiene 'import ... from' - ES Modules (requiere bundler, usar <script> en HTML)")
-            
-            # Check 4: Detectar server-side patterns
-            nodejs_patterns = ['fs.', 'path.', 'process.', '__dirname', '__filename']
-            for pattern in nodejs_patterns:
-                if pattern in content:
-                    errors.append(f"JavaScript contiene '{pattern}' - API de Node.js server-side (no funciona en navegador)")
-                    break  # Solo reportar el primer error de Node.js
+        ext = os.path.splitext(output_file)[1].lstrip('.')
+        errors.extend(get_validation_cache().validate(
+            'early', content_digest(content), lambda: check_content_structure(ext, content), ext
+        ))
+
+        if ext == 'py':
+            warnings.extend(flask_warnings(analyze_python(content)))
+
+        # Check 4: Verificar imports prohibidos según template (depende de templates.json, sin cache)
+        if ext == 'py' and template_name:
+            import_warnings = check_forbidden_imports(output_file, template_name)
+            warnings.extend(import_warnings)
     except UnicodeDecodeError:
         errors.append("Error de encoding al leer el archivo")
     except Exception as e:
@@ -355,56 +310,331 @@ def early_validation_check(output_file, template_name=None):
     is_valid = len(errors) == 0
     return {'valid': is_valid, 'errors': errors, 'warnings': warnings}
 
-def execute_task(task, agent="qwen", mode="default", max_retries=3, template_name=None):
-    """Ejecuta una tarea individual con retry automático"""
+def run_attempt(agent, prompt, mode, output, engine="inprocess", stream=False, pin=None, max_tokens=None,
+                queued_at=None):
+    """
+    Ejecuta un intento consultando primero la cache de respuestas.
+
+    Args:
+        queued_at: Momento en que el intento quedo listo para ejecutarse (default: ahora)
+
+    Returns:
+        dict: resultado de generate_attempt + 'cache_key', 'cached' y marcas de tiempo
+              ('queued_at', 'sent_at', 'ended_at')
+    """
+    queued_at = queued_at or time.time()
+    cache_key = response_cache_key(agent, prompt, mode)
+    cached = get_response_cache().get(cache_key) if cache_key else None
+    if cached is not None:
+        saved_path = save_output(cached, output) if output else None
+        if not output or saved_path:
+            return {
+                'success': True,
+                'output': f"[CACHE] {saved_path}" if output else cached,
+                'error': '',
+                'ttft': None,
+                'content': cached,
+                'usage': None,
+                'timeout': False,
+                'aborted': False,
+                'prefill': None,
+                'continuations': 0,
+                'cache_key': cache_key,
+                'cached': True,
+                'queued_at': queued_at,
+                'sent_at': None,
+                'finished_at': None,
+                'saved_at': time.time(),
+                'ended_at': time.time()
+            }
+
+    limiter = get_concurrency()
+    if limiter:
+        limiter.acquire()
+    started = time.time()
+    result = None
+    try:
+        with profile_span('generation', output=output):
+            result = generate_hedged(agent, prompt, mode, output, engine, stream, pin, max_tokens)
+    finally:
+        if limiter:
+            limiter.record_attempt(result, time.time() - started)
+            limiter.release()
+
+    result.update(cache_key=cache_key, cached=False, queued_at=queued_at, sent_at=started, ended_at=time.time())
+    return result
+
+def generate_attempt(agent, prompt, mode, output, engine="inprocess", stream=False, pin=None, max_tokens=None,
+                     cancel=None):
+    """
+    Genera la respuesta de un intento con el motor indicado.
+
+    - inprocess: llama a la API directamente usando la sesion HTTP compartida
+    - subprocess: lanza ask_agent.py en un proceso aislado (el endpoint se
+      elige aqui para que el balanceo vea todas las peticiones en vuelo)
+    - stream (solo inprocess): escribe el archivo a medida que llega y aborta
+      la peticion si aparece codigo de otro lenguaje
+    - pin (no aplica a subprocess): endpoint y slot de llama.cpp fijados por prefijo
+    - max_tokens: presupuesto de la tarea (None: maximo del modo)
+    - cancel (solo stream): threading.Event que aborta la peticion (rama perdedora de un hedge)
+
+    Returns:
+        dict: {'success', 'output', 'error', 'ttft', 'content', 'usage', 'timeout', 'aborted',
+               'prefill', 'continuations'}
+    """
+    if engine == 'subprocess':
+        pool = get_endpoint_pool(agent)
+        url = pool.acquire()
+        cmd = [
+            'python',
+            SCRIPTS['ask_agent'],
+            agent,
+            prompt,
+            '--mode', mode,
+            '--url', url
+        ]
+        if output:
+            cmd.extend(['--output', output])
+        if max_tokens:
+            cmd.extend(['--max-tokens', str(max_tokens)])
+        cassette = get_cassette()
+        if cassette:
+            cmd.extend(cassette.child_args(build_request(agent, prompt, mode)[2]))
+
+        ok = False
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=TIMEOUTS['generation'])
+            ok = result.returncode == 0
+        finally:
+            pool.release(url, ok)
+        saved_at = time.time()
+
+        # El hijo imprime "[SAVED] ruta" despues del rename atomico: esa es la senal de archivo completo
+        saved = re.search(r'^\[SAVED\] (.+)$', result.stdout, re.MULTILINE)
+        success = ok and (not output or saved is not None)
+        error = result.stderr
+        if ok and not success:
+            error = f"ask_agent.py no confirmo la escritura de {output}"
+        return {
+            'success': success,
+            'output': saved.group(0) if saved else result.stdout,
+            'error': error,
+            'ttft': None,
+            'content': None,
+            'usage': None,
+            'timeout': False,
+            'aborted': False,
+            'prefill': None,
+            'continuations': 0,
+            'finished_at': None,
+            'saved_at': saved_at if success and output else None
+        }
+
+    writer = StreamingOutput(output) if stream else None
+    if writer:
+        def on_text(delta):
+            if cancel is not None and cancel.is_set():
+                return "Cancelado: otra rama del hedge gano"
+            return writer.feed(delta)
+        try:
+            response = stream_completion(agent, prompt, mode, session=get_session(), on_text=on_text, pin=pin,
+                                         max_tokens=max_tokens)
+        finally:
+            writer.close()
+    else:
+        response = request_completion(agent, prompt, mode, session=get_session(), pin=pin, max_tokens=max_tokens)
+
+    return finish_attempt(response, output, writer)
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+def get_hedge_executor(workers=None):
+    """Pool de hilos para las ramas de los hedges (se crea en la primera llamada con `workers`)"""
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None and workers:
+            _hedge_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hedge')
+        return _hedge_executor
+
+def generate_hedged(agent, prompt, mode, output, engine="inprocess", stream=False, pin=None, max_tokens=None):
+    """
+    generate_attempt con hedging de peticiones lentas.
+
+    Si la generacion supera el umbral de latencia de su tipo de archivo se lanza
+    un duplicado (otro endpoint del agente o HEDGING['target_agent']). Cada rama
+    escribe en su propio archivo temporal y se publica la primera que pase
+    early_validation_check; la otra se cancela (streaming) o se abandona y su
+    archivo se elimina al terminar.
+
+    Returns:
+        dict: resultado de generate_attempt de la rama publicada
+    """
+    hedger = get_hedger()
+    executor = get_hedge_executor()
+    threshold = hedger.threshold(output) if hedger and executor else None
+    started = time.time()
+    if threshold is None:
+        result = generate_attempt(agent, prompt, mode, output, engine, stream, pin, max_tokens)
+        if hedger and result['success']:
+            hedger.record(output, time.time() - started)
+        return result
+
+    def run_leg(index, leg_agent, leg_pin, cancel):
+        path = leg_path(output, index)
+        try:
+            result = generate_attempt(leg_agent, prompt, mode, path, engine, stream, leg_pin, max_tokens, cancel)
+        except subprocess.TimeoutExpired:
+            result = failed_leg('Timeout exceeded', timeout=True)
+        except Exception as e:
+            result = failed_leg(str(e))
+        if index == 0 and result['success']:
+            hedger.record(output, time.time() - started)
+        return path, result, result['success'] and early_validation_check(path)['valid']
+
+    cancels = {0: threading.Event()}
+    legs = {executor.submit(run_leg, 0, agent, pin, cancels[0]): 0}
+    done, _ = wait(legs, timeout=threshold)
+    if not done:
+        # Rama de respaldo: sin pin para que el pool elija otro endpoint
+        hedger.record_fired()
+        cancels[1] = threading.Event()
+        legs[executor.submit(run_leg, 1, hedger.target_agent or agent, None, cancels[1])] = 1
+
+    finished = {}
+    winner = None
+    pending = set(legs)
+    try:
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[legs[future]] = future.result()
+                if winner is None and finished[legs[future]][2]:
+                    winner = legs[future]
+    except BaseException:
+        for path, _, _ in finished.values():
+            discard_leg(path)
+        raise
+    finally:
+        # Ramas que siguen en vuelo: cancelarlas y borrar su archivo cuando terminen
+        for future in pending:
+            cancels[legs[future]].set()
+            future.add_done_callback(lambda f, path=leg_path(output, legs[future]): discard_leg(path))
+
+    # Sin rama valida se publica la original para que la validacion informe sus errores
+    chosen = winner if winner is not None else (0 if 0 in finished else next(iter(finished)))
+    for index, (path, result, _) in finished.items():
+        if index != chosen:
+            discard_leg(path)
+    path, result, _ = finished[chosen]
+    if os.path.exists(path):
+        promote_leg(path, output)
+    result['output'] = result['output'].replace(path, output)
+
+    if len(legs) > 1:
+        elapsed = time.time() - started
+        outcome = None if winner is None else ('hedge' if winner else 'primary')
+        saved = hedger.expected_saving(output, elapsed) if outcome == 'hedge' else 0.0
+        hedger.record_outcome(outcome, saved)
+    return result
+
+def prepare_prefix_dispatch(tasks, agent, mode, template_name, health):
+    """
+    Agrupa las tareas por prefijo de prompt, fija cada grupo a un slot de
+    llama.cpp y precalienta la cache de cada slot antes del fan-out.
+
+    Args:
+        health: Estado por endpoint (check_agent_health); define los slots de cada servidor
+
+    Returns:
+        tuple: (tareas en orden de despacho, resumen para execution_report.json)
+    """
+    session = get_session()
+    slots = []
+    for url in get_endpoint_pool(agent).urls:
+        if url in health and not health[url]['healthy']:
+            continue
+        count = (PREFIX_DISPATCH['slots'] or (health.get(url) or {}).get('slots_total')
+                 or PREFIX_DISPATCH['default_slots'])
+        slots.extend((url, slot) for slot in range(count))
+
+    prompts = [generate_enhanced_prompt(task.get('prompt', ''), template_name, task.get('output', '')) for task in tasks]
+    ordered, groups = plan_prefix_dispatch(tasks, prompts, slots, PREFIX_DISPATCH['min_prefix_chars'])
+
+    # Un precalentamiento por slot con el prefijo de su grupo mas grande
+    warmed = 0
+    warmups = {}
+    for group in groups:
+        warmups.setdefault((group['pin']['url'], group['pin']['slot']), group['prefix'])
+    # Sin grupos (sin tareas o ningun endpoint sano) no hay nada que precalentar
+    if PREFIX_DISPATCH['warmup'] and warmups:
+        with ThreadPoolExecutor(max_workers=len(warmups)) as executor:
+            futures = [executor.submit(warm_prompt_cache, agent, prefix, url, slot, mode, session)
+                       for (url, slot), prefix in warmups.items()]
+            warmed = sum(1 for future in futures if future.result())
+
+    print(f"Despacho por prefijo: {len(groups)} grupos en {len(slots)} slots ({warmed} precalentados)")
+    summary = {
+        'slots': len(slots),
+        'warmed': warmed,
+        'groups': [{'prefix': g['prefix'][:80], 'url': g['pin']['url'], 'slot': g['pin']['slot'], 'tasks': g['tasks']}
+                   for g in groups],
+    }
+    return ordered, summary
+
+def execute_task(task, agent="qwen", mode="default", max_retries=3, template_name=None, engine="inprocess", stream=False,
+                 queued_at=None):
+    """Ejecuta una tarea individual con retry automático (queued_at: momento de encolado en el batch)"""
     prompt = task.get('prompt', '')
     output = task.get('output', '')
     task_name = task.get('name', 'unnamed')
+    pin = task.get('pin')
+    max_tokens = task_max_tokens(mode, output, template_name, task_name)
 
     # Mejorar prompt si se especifica un template
     enhanced_prompt = generate_enhanced_prompt(prompt, template_name, output)
-
-    cmd = [
-        'python',
-        SCRIPTS['ask_agent'],
-        agent,
-        enhanced_prompt,
-        '--mode', mode
-    ]
-
-    if output:
-        cmd.extend(['--output', output])
+    current_prompt = enhanced_prompt
 
     attempts = []
     for attempt in range(1, max_retries + 1):
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=TIMEOUTS['generation'])
+            result = run_attempt(agent, current_prompt, mode, output, engine, stream, pin, max_tokens,
+                                 queued_at if attempt == 1 else None)
 
             attempt_result = {
                 'attempt': attempt,
-                'success': result.returncode == 0,
-                'output': result.stdout,
-                'error': result.stderr
+                'success': result['success'],
+                'output': result['output'],
+                'error': result['error']
             }
+            if result['ttft'] is not None:
+                attempt_result['ttft'] = result['ttft']
+            if result['prefill']:
+                attempt_result['prefill'] = result['prefill']
+            usage = result['usage'] or {}
+            if usage.get('prompt_tokens'):
+                attempt_result['prompt_tokens'] = usage['prompt_tokens']
+            if usage.get('completion_tokens'):
+                attempt_result['completion_tokens'] = usage['completion_tokens']
+            if result['continuations']:
+                attempt_result['continuations'] = result['continuations']
+            if result['cached']:
+                attempt_result['cached'] = True
+            attempt_result['timeline'] = attempt_timeline(result)
+            attempt_result['phases'] = attempt_phases(attempt_result['timeline'])
             attempts.append(attempt_result)
 
-            if result.returncode == 0:
+            if result['success']:
                 # Early validation check (solo si hay archivo de salida)
                 if output:
+                    validation_started = time.time()
                     early_check = early_validation_check(output)
+                    record_validation(attempt_result, validation_started, time.time())
                     if not early_check['valid']:
                         # Early validation failed - si hay mas intentos, reintentar. Si no, reportar error.
                         if attempt < max_retries:
                             error_info = f"\n\nPREVIOUS ERROR (Intento {attempt}): Early validation failed - {'; '.join(early_check['errors'])}"
-                            cmd = [
-                                'python',
-                                SCRIPTS['ask_agent'],
-                                agent,
-                                enhanced_prompt + error_info,
-                                '--mode', mode
-                            ]
-                            if output:
-                                cmd.extend(['--output', output])
+                            current_prompt = enhanced_prompt + error_info
                             continue  # Continuar al siguiente intento
                         else:
                             # No hay mas intentos, reportar error
@@ -412,19 +642,23 @@ def execute_task(task, agent="qwen", mode="default", max_retries=3, template_nam
                             return {
                                 'name': task_name,
                                 'success': False,
-                                'output': result.stdout,
+                                'output': result['output'],
                                 'error': error_msg,
+                                'target': output,
                                 'file_saved': output,
                                 'attempts': attempts,
                                 'total_attempts': attempt
                             }
 
-                # Si llegamos aqui, todo esta bien (subprocess exitoso y validacion pasada)
+                # Si llegamos aqui, todo esta bien (generacion exitosa y validacion pasada)
+                if not result['cached']:
+                    store_validated_output(result['cache_key'], result['content'], output)
                 return {
                     'name': task_name,
                     'success': True,
-                    'output': result.stdout,
+                    'output': result['output'],
                     'error': '',
+                    'target': output,
                     'file_saved': output if output else None,
                     'attempts': attempts,
                     'total_attempts': attempt
@@ -432,16 +666,8 @@ def execute_task(task, agent="qwen", mode="default", max_retries=3, template_nam
             else:
                 # Si falló y hay más intentos, agregar información de error al prompt
                 if attempt < max_retries:
-                    error_info = f"\n\nPREVIOUS ERROR (Intento {attempt}): {result.stderr[:200]}"
-                    cmd = [
-                        'python',
-                        SCRIPTS['ask_agent'],
-                        agent,
-                        enhanced_prompt + error_info,
-                        '--mode', mode
-                    ]
-                    if output:
-                        cmd.extend(['--output', output])
+                    error_info = f"\n\nPREVIOUS ERROR (Intento {attempt}): {result['error'][:200]}"
+                    current_prompt = enhanced_prompt + error_info
 
         except subprocess.TimeoutExpired:
             attempts.append({
@@ -463,6 +689,7 @@ def execute_task(task, agent="qwen", mode="default", max_retries=3, template_nam
         'success': False,
         'output': '',
         'error': f'Failed after {max_retries} attempts',
+        'target': output,
         'file_saved': None,
         'attempts': attempts,
         'total_attempts': max_retries
@@ -508,19 +735,14 @@ def validate_output(project_path, template_type="flask"):
 
             print(f"  [OK] Todos los archivos del template existen")
         
-        # Ejecutar validación específica del template
+        # Ejecutar validación específica del template (en este proceso, misma cache de validaciones)
+        if template_type not in structure_types():
+            return {
+                'success': False,
+                'error': f"Tipo de validación desconocido: {template_type} (válidos: {', '.join(structure_types())})"
+            }
         try:
-            report_path = os.path.join(project_path, 'validation_report.json')
-            result = subprocess.run(
-                ['python', SCRIPTS['validate_output'], '--path', project_path, '--type', template_type, '--output', report_path],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=TIMEOUTS['subprocess']
-            )
-
-            validation_output = result.stdout
+            validation_data = validate_structure(project_path, template_type)
         except Exception as e:
             print(f"  [ERROR] Error ejecutando validación: {str(e)}")
             return {
@@ -528,20 +750,9 @@ def validate_output(project_path, template_type="flask"):
                 'error': f"Error ejecutando validación: {str(e)}"
             }
 
-        # Parsear si existe el reporte JSON
-        if os.path.exists(report_path):
-            try:
-                with open(report_path, 'r', encoding='utf-8') as f:
-                    validation_data = json.load(f)
-                return validation_data
-            except Exception as e:
-                print(f"  [ERROR] Error leyendo reporte de validación: {str(e)}")
-
-        # Si no hay reporte JSON, extraer del output
-        return {
-            'success': result.returncode == 0,
-            'output': validation_output
-        }
+        # validation_report.json en el proyecto, como lo dejaba validate_output.py --output
+        generate_report(validation_data, os.path.join(project_path, 'validation_report.json'))
+        return validation_data
     except Exception as e:
         return {
             'success': False,
@@ -570,22 +781,6 @@ def test_generation(project_path, port=5000):
             'error': str(e)
         }
 
-def check_qwen_health():
-    """Verifica que el servidor LLM esté corriendo antes de iniciar"""
-    try:
-        response = requests.post(
-            f"{LLM_SERVER['url']}{LLM_SERVER['endpoint']}",
-            json={
-                "model": LLM_SERVER['model'],
-                "messages": [{"role": "user", "content": "test"}],
-                "max_tokens": 5
-            },
-            timeout=TIMEOUTS['health_check']
-        )
-        return response.status_code == 200
-    except Exception:
-        return False
-
 def create_directory_structure(base_dir):
     """Crea la estructura de carpetas necesaria"""
     if not base_dir:
@@ -595,28 +790,36 @@ def create_directory_structure(base_dir):
             ensure_dir_exists(os.path.join(base_dir, 'templates')) and
             ensure_dir_exists(os.path.join(base_dir, 'static')))
 
-def update_metrics_execution(execution_report_path, metrics_file='metrics.json'):
-    """Actualiza metrics.json automáticamente después de cada ejecución"""
+def update_metrics_execution(report_data, metrics_file='metrics.json'):
+    """Actualiza metrics.json automáticamente después de cada ejecución (con el reporte en memoria)"""
     try:
-        result = subprocess.run(
-            ['python', SCRIPTS['update_metrics'],
-             '--execution-report', execution_report_path,
-             '--metrics-file', metrics_file],
-            capture_output=True,
-            text=True,
-            timeout=TIMEOUTS['subprocess']
-        )
-        if result.returncode == 0:
+        # El detalle que imprime update_metrics solo interesa al usarlo por CLI
+        with contextlib.redirect_stdout(io.StringIO()):
+            updated = update_metrics_from_report(metrics_file, report_data)
+        if updated:
             print("Métricas actualizadas automáticamente")
         else:
             print("No se pudieron actualizar las métricas automáticamente")
     except Exception as e:
         print(f"ADVERTENCIA: Error actualizando métricas: {e}")
 
+def print_task_result(task, result):
+    """Imprime el estado de una tarea completada y devuelve el resultado"""
+    task_name = task.get('name', 'unnamed')[:50]
+    if result['success']:
+        retries_msg = f" ({result['total_attempts']} intentos)" if result['total_attempts'] > 1 else ""
+        print(f"[OK] {task_name}{retries_msg}")
+        if result['file_saved']:
+            print(f"  Archivo guardado: {result['file_saved']}")
+    elif 'total_attempts' in result:
+        print(f"[ERROR] {task_name}: {result['error'][:100]}")
+        print(f"  Intentos: {result['total_attempts']}")
+    return result
+
 def main():
     parser = argparse.ArgumentParser(description='Ejecuta multiples tareas en paralelo usando workers con retry y validacion')
     parser.add_argument('--tasks', required=True, help='Archivo JSON con las tareas a ejecutar')
-    parser.add_argument('--agent', default='qwen', choices=['qwen', 'mimo'], help='Agente a usar')
+    parser.add_argument('--agent', default='qwen', choices=list(AGENTS), help='Agente a usar')
     parser.add_argument('--mode', default='default', choices=['default', 'patch'], help='Modo de ejecucion')
     parser.add_argument('--output-dir', help='Directorio base para archivos de salida (opcional)')
     parser.add_argument('--template', help='Template a usar para mejorar prompts (flask, cyberpunk, etc.)')
@@ -624,19 +827,76 @@ def main():
     parser.add_argument('--test', action='store_true', help='Ejecutar pruebas automaticas post-generacion')
     parser.add_argument('--max-retries', type=int, default=3, help='Maximo de intentos por tarea')
     parser.add_argument('--metrics-file', default='metrics.json', help='Archivo de métricas a actualizar')
+    parser.add_argument('--engine', default=ENGINE['default'], choices=['inprocess', 'subprocess', 'async'],
+                        help='Motor de generacion: inprocess (pool HTTP compartido), subprocess (aislado) o async (corrutinas)')
+    parser.add_argument('--concurrency', type=int, help='Peticiones simultaneas por backend (motor async)')
+    parser.add_argument('--workers', type=int, help='Concurrencia fija (desactiva el autoescalado)')
+    parser.add_argument('--no-cache', action='store_true', help='Desactivar la cache de respuestas')
+    parser.add_argument('--refresh', action='store_true', help='Ignorar respuestas cacheadas (se regeneran y se guardan)')
+    parser.add_argument('--no-validation-cache', action='store_true',
+                        help='Revalidar siempre (sin la cache de validaciones por hash de contenido)')
+    parser.add_argument('--no-budget', action='store_true',
+                        help='Pedir siempre el max_tokens del modo (sin presupuesto aprendido de ejecuciones anteriores)')
+    parser.add_argument('--prefix-dispatch', action='store_true', default=PREFIX_DISPATCH['enabled'],
+                        help='Agrupar tareas por prefijo comun y fijarlas a slots de llama.cpp (reutiliza el prefill)')
+    parser.add_argument('--hedge', action='store_true', default=HEDGING['enabled'],
+                        help='Duplicar en otro endpoint/agente las generaciones que superan el percentil de latencia')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Servir metricas Prometheus/OpenMetrics en http://127.0.0.1:PUERTO/metrics durante el batch')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Perfilar el proceso: pstats y tracemalloc por etapa + trace.json (Chrome trace_event)')
+    parser.add_argument('--hedge-agent', choices=list(AGENTS.keys()),
+                        help='Agente para los duplicados del hedge (por defecto: otro endpoint del mismo agente)')
+    parser.add_argument('--stream', action='store_true', default=ENGINE['stream'],
+                        help='Generacion en streaming (SSE): escribe archivos incrementalmente y aborta salidas erroneas')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='CASSETTE',
+                                help='Grabar cada peticion y respuesta (con tiempos) en una cassette JSONL')
+    cassette_group.add_argument('--replay', metavar='CASSETTE',
+                                help='Servir las respuestas desde una cassette grabada, sin servidor LLM')
+    parser.add_argument('--latency-scale', type=float, default=CASSETTE['latency_scale'],
+                        help='Factor de las latencias grabadas con --replay (0: sin esperas)')
 
     args = parser.parse_args()
 
+    # Perfilado por etapa (se escribe tambien si el batch termina antes de tiempo)
+    if configure_profiling(args.profile, 'ask_agent_batch_v2'):
+        atexit.register(finish_profiling)
+    profile_stage('preflight')
+
     # === PRE-FLIGHT CHECKS ===
     print("Realizando pre-flight checks...")
-    
-    # 1. Verificar Phi-3 está corriendo
-    if not check_qwen_health():
-        print(f"ERROR: El servidor LLM no esta corriendo en {LLM_SERVER['url']}")
+
+    # Cassette: grabar la corrida o reproducir una grabada (sin servidor)
+    cassette = None
+    if args.record or args.replay:
+        try:
+            cassette = configure_cassette(args.record or args.replay, 'record' if args.record else 'replay',
+                                          args.latency_scale, fresh=True)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return
+
+    # 1. Verificar que el servidor LLM esta corriendo (/health, /v1/models y slots, con cache TTL)
+    if cassette and cassette.replaying:
+        health = {}
+        print(f"   OK: Reproduciendo {cassette.size} generaciones de {args.replay} (latencias x{args.latency_scale})")
+    else:
+        health = check_agent_health(args.agent)
+    for url, entry in health.items():
+        slots = f", {entry['slots_idle']}/{entry['slots_total']} slots libres" if entry['slots_total'] else ''
+        source = ' (cache)' if entry['cached'] else ''
+        print(f"   {'OK' if entry['healthy'] else 'CAIDO'}: {url} [{entry['status']}{slots}]{source}")
+    if health and not any(entry['healthy'] for entry in health.values()):
+        print(f"ERROR: El servidor LLM de '{args.agent}' no esta disponible")
         print("   Solucion: Inicia el servidor LLM primero")
         return
 
-    print("   OK: Phi-3-mini esta operativo")
+    # Endpoints caidos empiezan expulsados del balanceo (se reprueban periodicamente)
+    endpoint_pool = get_endpoint_pool(args.agent)
+    for url, entry in health.items():
+        if not entry['healthy']:
+            endpoint_pool.mark_unhealthy(url)
     
     # 2. Verificar archivo de tareas existe
     if not os.path.exists(args.tasks):
@@ -663,7 +923,18 @@ def main():
     print("Pre-flight checks completados\n")
 
     # Cargar tareas
+    profile_stage('load')
     tasks = load_tasks(args.tasks)
+    # Con cassette la cache se desactiva: cada generacion debe grabarse o reproducirse
+    response_cache = configure_response_cache(enabled=CACHE['enabled'] and not args.no_cache and not cassette,
+                                              refresh=args.refresh)
+    validation_cache = configure_validation_cache(enabled=VALIDATION_CACHE['enabled'] and not args.no_validation_cache)
+
+    # Presupuesto de max_tokens aprendido de execution_report.json anteriores
+    history_dirs = list(TOKEN_BUDGET['history_dirs'])
+    if args.output_dir:
+        history_dirs.append(os.path.dirname(os.path.abspath(args.output_dir)))
+    token_budget = configure_token_budget(history_dirs, enabled=TOKEN_BUDGET['enabled'] and not args.no_budget)
 
     # Si se especifica output-dir, normalizar rutas para evitar duplicación
     if args.output_dir:
@@ -682,86 +953,117 @@ def main():
     results = []
     start_time = time.time()
 
-    # Calcular workers óptimos basado en número de tareas
+    # Balanceo entre las instancias del agente (menos peticiones en vuelo)
+    endpoints = endpoint_pool.urls
+    if len(endpoints) > 1:
+        print(f"Endpoints: {len(endpoints)} instancias de {args.agent}")
+
+    # Concurrencia adaptativa (AIMD): arranca baja y sube mientras mejore el throughput
     num_tasks = len(tasks)
-    if num_tasks <= 4:
-        workers = num_tasks  # 1:1 mapping para tareas pequeñas
-    elif num_tasks <= 8:
-        workers = 4  # Max 4 workers para tareas medianas
+    if args.engine == 'async':
+        max_concurrency = args.concurrency or ENGINE['async_concurrency']
     else:
-        workers = min(4 + (num_tasks // 4), 8)  # Escalar hasta 8 para proyectos grandes
+        max_concurrency = AUTOSCALE['max']
+    max_concurrency = max(1, min(max_concurrency * len(endpoints), num_tasks))
 
-    print(f"Workers: {workers} (optimizado para {num_tasks} tareas)")
+    if args.workers:
+        limiter = configure_concurrency(args.workers, args.workers, args.workers, adaptive=False)
+        print(f"Workers: {args.workers} (fijo)")
+    else:
+        # Arrancar con tantas peticiones como slots libres informan los servidores
+        idle_slots = sum(entry['slots_idle'] or 0 for entry in health.values() if entry['healthy'])
+        initial = max(AUTOSCALE['initial'], idle_slots)
+        limiter = configure_concurrency(min(initial, max_concurrency), AUTOSCALE['min'],
+                                        max_concurrency, adaptive=AUTOSCALE['enabled'])
+        print(f"Concurrencia adaptativa: inicial {limiter.initial}, rango {limiter.minimum}-{limiter.maximum} ({num_tasks} tareas)")
+    workers = limiter.maximum
+
+    print(f"Engine: {args.engine}{' (streaming)' if args.stream else ''}")
+    if args.stream and args.engine == 'subprocess':
+        print("ADVERTENCIA: --stream no aplica al motor subprocess, se ignora")
+        args.stream = False
     print("-" * 60)
 
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_task = {
-            executor.submit(execute_task, task, args.agent, args.mode, args.max_retries, args.template): task
-            for task in tasks
-        }
+    # Hedging: cada tarea puede tener dos ramas en vuelo (original + duplicado)
+    hedger = configure_hedging(args.hedge, args.hedge_agent)
+    if hedger:
+        if len(endpoints) < 2 and not hedger.target_agent:
+            print(f"ADVERTENCIA: --hedge con un solo endpoint de {args.agent}: el duplicado ira al mismo servidor")
+        if args.engine != 'async':
+            get_hedge_executor(2 * workers)
+        print(f"Hedging: p{hedger.pct} por tipo de archivo -> {hedger.target_agent or args.agent}")
+
+    # Metricas en vivo para un Prometheus local
+    batch_metrics = BatchMetrics(len(tasks), METRICS['buckets'])
+    metrics_server = None
+    if args.metrics_port:
+        try:
+            metrics_server = start_metrics_server(batch_metrics, args.metrics_port, METRICS['host'])
+            print(f"Metricas: http://{METRICS['host']}:{args.metrics_port}/metrics")
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo abrir el puerto de metricas {args.metrics_port}: {e}")
+
+    def on_task_done(task, result):
+        batch_metrics.observe_task(task, result)
+        results.append(print_task_result(task, result))
+
+    # Pool de conexiones keep-alive dimensionado a los workers
+    if args.engine == 'inprocess':
+        get_session(2 * workers if hedger else workers)
+
+    # Despacho por prefijo: grupos fijados a slots y cache de prompt precalentada
+    prefix_dispatch = None
+    if args.prefix_dispatch:
+        if args.engine == 'subprocess':
+            print("ADVERTENCIA: --prefix-dispatch no aplica al motor subprocess, se ignora")
+        elif args.replay:
+            print("ADVERTENCIA: --prefix-dispatch no aplica a --replay (no hay servidor), se ignora")
+        else:
+            tasks, prefix_dispatch = prepare_prefix_dispatch(tasks, args.agent, args.mode, args.template, health)
 
-        # Esperar a que TODOS los futures se completen antes de continuar
-        for future in as_completed(future_to_task):
-            task = future_to_task[future]
-            task_name = task.get('name', 'unnamed')[:50]
-            try:
-                result = future.result(timeout=TIMEOUTS['generation'])
-                results.append(result)
-
-                if result['success']:
-                    retries_msg = f" ({result['total_attempts']} intentos)" if result['total_attempts'] > 1 else ""
-                    print(f"[OK] {task_name}{retries_msg}")
-                    if result['file_saved']:
-                        print(f"  Archivo guardado: {result['file_saved']}")
-                else:
-                    print(f"[ERROR] {task_name}: {result['error'][:100]}")
-                    print(f"  Intentos: {result['total_attempts']}")
-            except Exception as exc:
-                print(f"[CRITICAL] {task_name} genero excepcion: {exc}")
-                results.append({
-                    'name': task_name,
-                    'success': False,
-                    'output': '',
-                    'error': str(exc),
-                    'file_saved': None
-                })
+    profile_stage('generation')
+    if args.engine == 'async':
+        run_batch_async(tasks, args.agent, args.mode, args.max_retries, args.template, workers,
+                        generate_enhanced_prompt, early_validation_check, stream=args.stream,
+                        on_result=on_task_done)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='worker') as executor:
+            future_to_task = {
+                executor.submit(execute_task, task, args.agent, args.mode, args.max_retries, args.template, args.engine, args.stream,
+                                time.time()): task
+                for task in tasks
+            }
+
+            # Esperar a que TODOS los futures se completen antes de continuar
+            for future in as_completed(future_to_task):
+                task = future_to_task[future]
+                try:
+                    result = future.result(timeout=TIMEOUTS['generation'])
+                except Exception as exc:
+                    print(f"[CRITICAL] {task.get('name', 'unnamed')[:50]} genero excepcion: {exc}")
+                    result = {
+                        'name': task.get('name', 'unnamed')[:50],
+                        'success': False,
+                        'output': '',
+                        'error': str(exc),
+                        'target': task.get('output', ''),
+                        'file_saved': None
+                    }
+                on_task_done(task, result)
 
     elapsed_time = time.time() - start_time
+    if metrics_server:
+        metrics_server.shutdown()
 
     # Verificar que todos los tasks se completaron
     if len(results) != len(tasks):
         print(f"\n[WARNING] ADVERTENCIA: Solo se completaron {len(results)}/{len(tasks)} tareas")
 
-    # Esperar a que todos los archivos se escriban completamente (sin delay artificial)
-    print("\n[SYNC] Verificando que todos los archivos estén escritos en disco...")
-    max_wait_time = 5.0  # Máximo 5 segundos esperando
-    check_interval = 0.1  # Verificar cada 100ms
-    waited = 0
-
-    while waited < max_wait_time:
-        all_files_ready = True
-        for result in results:
-            if result['success'] and result['file_saved']:
-                file_path = result['file_saved']
-                if not os.path.exists(file_path):
-                    all_files_ready = False
-                    break
-                # Verificar que el archivo tenga contenido (> 0 bytes)
-                if os.path.getsize(file_path) == 0:
-                    all_files_ready = False
-                    break
-
-        if all_files_ready:
-            print("[SYNC] Todos los archivos están listos")
-            break
-
-        time.sleep(check_interval)
-        waited += check_interval
-
-    if waited >= max_wait_time:
-        print(f"[WARNING] Algunos archivos no están listos después de {max_wait_time}s")
+    # No hace falta esperar al disco: cada resultado exitoso llega despues de que su
+    # archivo se publico con escritura atomica (save_output o la senal [SAVED] del hijo)
 
     # Validación post-generación
+    profile_stage('validation')
     validation_result = None
     if args.validate and args.output_dir:
         print("\n" + "=" * 60)
@@ -780,6 +1082,7 @@ def main():
         print(f"Pruebas: {'PASADAS' if test_result.get('success') else 'FALLIDAS'}")
 
     # Resumen
+    profile_stage('report')
     successful = sum(1 for r in results if r['success'])
     total_attempts = sum(r.get('total_attempts', 1) for r in results)
 
@@ -788,6 +1091,55 @@ def main():
     print(f"Tiempo total: {elapsed_time:.2f} segundos")
     print(f"Total intentos: {total_attempts} (avg: {total_attempts/len(results):.1f} por tarea)")
 
+    concurrency_report = limiter.report()
+    if concurrency_report['adaptive']:
+        print(f"Concurrencia: final {concurrency_report['final']}, pico en vuelo {concurrency_report['peak_in_flight']}")
+
+    cache_stats = response_cache.stats()
+    if cache_stats['enabled']:
+        print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['stores']} guardadas")
+    if validation_cache.enabled:
+        print(f"Cache de validaciones: {validation_cache.hits} hits, {validation_cache.misses} misses")
+
+    # Time-to-first-token (solo en modo streaming)
+    ttfts = [a['ttft'] for r in results for a in r.get('attempts', []) if a.get('ttft') is not None]
+    aborted_attempts = sum(1 for r in results for a in r.get('attempts', []) if a.get('error', '').startswith('Stream abortado'))
+    if ttfts:
+        print(f"TTFT promedio: {sum(ttfts) / len(ttfts):.2f} segundos ({aborted_attempts} intentos abortados)")
+
+    # Presupuesto de tokens y continuaciones por respuestas cortadas
+    continuations = sum(a.get('continuations', 0) for r in results for a in r.get('attempts', []))
+    budget_stats = token_budget.stats() if token_budget else None
+    if budget_stats:
+        budget_stats['continuations'] = continuations
+        print(f"Presupuesto de tokens: {budget_stats['reports_loaded']} reportes historicos, {continuations} continuaciones")
+
+    # Prefill: tokens de prompt evaluados vs. reutilizados de la cache del servidor
+    prefill = summarize_prefill(results)
+    prefill['dispatch'] = prefix_dispatch
+    if prefill['requests']:
+        print(f"Prefill: {prefill['prompt_tokens_evaluated']} tokens evaluados, "
+              f"{prefill['prompt_tokens_cached']} reutilizados de cache ({prefill['cached_ratio']:.0%})")
+
+    # Tiempo por fase (cola, prefill, decode, guardado, validacion, reintentos) por tipo de archivo
+    phases_by_type = summarize_phases(results)
+    for file_type, phases in phases_by_type.items():
+        shown = [f"{name} {phases[name]['p50']:.2f}/{phases[name]['p95']:.2f}s"
+                 for name in ('queue', 'ttft', 'generation', 'validation', 'task') if phases.get(name)]
+        if shown:
+            print(f"Fases {file_type} (p50/p95): {', '.join(shown)}")
+
+    cassette_stats = cassette.stats() if cassette else None
+    if cassette_stats and cassette.replaying:
+        print(f"Cassette: {cassette_stats['served']} generaciones reproducidas, {cassette_stats['misses']} sin grabar")
+    elif cassette_stats:
+        print(f"Cassette: {cassette_stats['entries']} generaciones grabadas en {args.record}")
+
+    hedge_stats = hedger.stats() if hedger else None
+    if hedge_stats:
+        print(f"Hedging: {hedge_stats['fired']} duplicados, {hedge_stats['hedge_wins']} ganados por el duplicado, "
+              f"~{hedge_stats['saved_seconds_estimate']:.1f} s ahorrados (estimado)")
+
     # Guardar reporte extendido
     report_file = os.path.join(args.output_dir or '.', 'execution_report.json')
 
@@ -809,19 +1161,33 @@ def main():
         'results': enhanced_results,
         'validation': validation_result,
         'testing': test_result,
+        'cache': cache_stats,
+        'validation_cache': validation_cache.stats(),
+        'concurrency': concurrency_report,
+        'endpoints': endpoint_stats(),
+        'health': health,
+        'prefill': prefill,
+        'token_budget': budget_stats,
+        'hedging': hedge_stats,
+        'cassette': cassette_stats,
         'summary': {
             'successful': successful,
             'total': len(results),
             'elapsed_time': elapsed_time,
             'total_attempts': total_attempts,
-            'avg_time_per_task': elapsed_time / len(results) if results else 0
+            'avg_time_per_task': elapsed_time / len(results) if results else 0,
+            'avg_ttft': sum(ttfts) / len(ttfts) if ttfts else None,
+            'aborted_attempts': aborted_attempts,
+            'phases_by_type': phases_by_type
         },
         'execution_info': {
             'workers_used': workers if 'workers' in locals() else 4,
             'template': args.template,
             'agent': args.agent,
             'mode': args.mode,
-            'max_retries': args.max_retries
+            'max_retries': args.max_retries,
+            'engine': args.engine,
+            'stream': args.stream
         }
     }
 
@@ -832,7 +1198,13 @@ def main():
     if successful > 0:
         print("\n" + "=" * 60)
         print("Actualizando métricas automáticamente...")
-        update_metrics_execution(report_file, args.metrics_file)
+        profile_stage('metrics')
+        update_metrics_execution(report_data, args.metrics_file)
+
+    profile_stages = finish_profiling()
+    if profile_stages:
+        stages = ', '.join(f"{stage['name']} {stage['seconds']:.2f}s" for stage in profile_stages)
+        print(f"Perfil: {args.profile} ({stages})")
 
 if __name__ == '__main__':
     main()
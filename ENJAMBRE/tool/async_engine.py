@@ -0,0 +1,483 @@
+"""
+Motor asyncio para ask_agent_batch_v2.
+
+Peticiones HTTP, reintentos, validacion temprana y escritura de archivos
+corren como corrutinas en un solo proceso. La concurrencia se limita con
+un semaforo por backend (cada URL del agente), lo que permite mantener
+cientos de tareas en vuelo sin un hilo o subproceso por tarea. Con varias
+URLs, cada peticion va al endpoint con menos peticiones en vuelo.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from config import TIMEOUTS, GENERATION
+from utils import (
+    save_output, StreamingOutput, get_response_cache, store_validated_output, get_concurrency,
+    get_endpoint_pool, prefill_from_response, get_hedger, leg_path, promote_leg, failed_leg, discard_leg,
+    attempt_timeline, attempt_phases, record_validation, get_cassette
+)
+from utils.async_http import AsyncHTTPClient
+from ask_agent import (
+    build_request, parse_sse_line, response_cache_key, completion_result, finish_attempt, endpoint_ok,
+    continuation_messages, continuation_text, sum_counts, task_max_tokens
+)
+
+
+class AsyncBatchEngine:
+    """
+    Ejecuta tareas de generacion como corrutinas.
+
+    Args:
+        agent: Nombre del agente en AGENTS
+        mode: 'default' o 'patch'
+        max_retries: Intentos maximos por tarea
+        template_name: Template para mejorar prompts (opcional)
+        concurrency: Peticiones simultaneas maximas por backend
+        enhance_prompt: Funcion (prompt, template_name, output) -> prompt
+        early_check: Funcion (output_file) -> {'valid', 'errors', 'warnings'}
+        stream: Usar streaming SSE con escritura incremental y aborto temprano
+    """
+
+    def __init__(self, agent, mode, max_retries, template_name, concurrency,
+                 enhance_prompt, early_check, stream=False):
+        self.agent = agent
+        self.mode = mode
+        self.max_retries = max_retries
+        self.template_name = template_name
+        self.concurrency = concurrency
+        self.enhance_prompt = enhance_prompt
+        self.early_check = early_check
+        self.stream = stream
+        self.client = None
+        self.semaphores = {}
+
+    def _semaphore(self, url):
+        """Un semaforo por backend"""
+        if url not in self.semaphores:
+            self.semaphores[url] = asyncio.Semaphore(self.concurrency)
+        return self.semaphores[url]
+
+    async def routed(self, completion, *args, pin=None, agent=None):
+        """Version async de ask_agent.routed (agent: None = agente del motor)"""
+        agent = agent or self.agent
+        pool = get_endpoint_pool(agent)
+        if pool is None:
+            return completion_result(False, error=f"Error: Agente '{agent}' no encontrado")
+        url = pool.acquire(prefer=pin['url'] if pin else None)
+        slot = pin['slot'] if pin and pin['url'] == url else None
+        result = None
+        try:
+            result = await completion(url, slot, agent, *args)
+        finally:
+            pool.release(url, result is not None and endpoint_ok(result))
+        return result
+
+    async def taped(self, agent, prompt, live, on_text=None):
+        """Version async de ask_agent.taped (live: funcion que devuelve la corrutina de la peticion real)"""
+        cassette = get_cassette()
+        if cassette is None:
+            return await live()
+        payload = build_request(agent or self.agent, prompt, self.mode)[2]
+        if cassette.replaying:
+            return await cassette.replay_async(payload, on_text)
+        started = time.time()
+        result = await live()
+        cassette.record(payload, result, started, stream=on_text is not None)
+        return result
+
+    async def request_completion(self, prompt, pin=None, max_tokens=None, agent=None):
+        """Version async de ask_agent.request_completion"""
+        return await self.taped(agent, prompt,
+                                lambda: self.routed(self._request_completion, prompt, max_tokens, pin=pin, agent=agent))
+
+    async def _post(self, url, headers, data):
+        """POST no streaming. Devuelve (status, cuerpo en bytes)"""
+        async with self._semaphore(url):
+            response = await self.client.post_json(url, headers, data)
+            return response.status, await response.read()
+
+    async def _request_completion(self, url, slot, agent, prompt, max_tokens=None):
+        url, headers, data = build_request(agent, prompt, self.mode, url, slot, max_tokens)
+
+        try:
+            status, body = await self._post(url, headers, data)
+        except Exception as e:
+            return completion_result(False, error=f"Exception: {e}")
+
+        if status != 200:
+            return completion_result(False, error=f"Error {status}: {body.decode('utf-8', 'replace')}", status=status)
+        try:
+            parsed = json.loads(body)
+            choice = parsed['choices'][0]
+            result = completion_result(True, choice['message']['content'], usage=parsed.get('usage'),
+                                       prefill=prefill_from_response(parsed), finish_reason=choice.get('finish_reason'))
+        except Exception as e:
+            return completion_result(False, error=f"Exception: {e}")
+        return await self.continue_completion(url, slot, agent, prompt, max_tokens, result)
+
+    async def continue_completion(self, url, slot, agent, prompt, max_tokens, result, on_text=None):
+        """Version async de ask_agent.continue_completion"""
+        while result['finish_reason'] == 'length' and result['continuations'] < GENERATION['max_continuations']:
+            url, headers, data = build_request(agent, prompt, self.mode, url, slot, max_tokens,
+                                               continuation_messages(result['content']))
+            try:
+                status, body = await self._post(url, headers, data)
+                if status != 200:
+                    break
+                parsed = json.loads(body)
+                choice = parsed['choices'][0]
+            except Exception:
+                break
+
+            more = continuation_text(result['content'], choice['message']['content'] or '')
+            result.update(
+                content=result['content'] + more,
+                finish_reason=choice.get('finish_reason'),
+                continuations=result['continuations'] + 1,
+                usage=sum_counts(result['usage'], parsed.get('usage')),
+                prefill=sum_counts(result['prefill'], prefill_from_response(parsed)),
+            )
+            abort_error = on_text(more) if on_text and more else None
+            if abort_error:
+                result.update(success=False, error=f"Stream abortado: {abort_error}", aborted=True)
+                break
+        result['finished_at'] = time.time()
+        return result
+
+    async def stream_completion(self, prompt, on_text, pin=None, max_tokens=None, agent=None):
+        """Version async de ask_agent.stream_completion"""
+        return await self.taped(agent, prompt,
+                                lambda: self.routed(self._stream_completion, prompt, on_text, max_tokens, pin=pin,
+                                                    agent=agent),
+                                on_text)
+
+    async def _stream_completion(self, url, slot, agent, prompt, on_text, max_tokens=None):
+        url, headers, data = build_request(agent, prompt, self.mode, url, slot, max_tokens)
+        data['stream'] = True
+
+        ttft = None
+        usage = None
+        timings = None
+        finish_reason = None
+        parts = []
+        async with self._semaphore(url):
+            started = time.time()
+            response = None
+            try:
+                response = await self.client.post_json(url, headers, data)
+                if response.status != 200:
+                    body = await response.read()
+                    return completion_result(False, error=f"Error {response.status}: {body.decode('utf-8', 'replace')}",
+                                             status=response.status)
+
+                async for line in response.iter_lines():
+                    delta, done, event = parse_sse_line(line.decode('utf-8', 'replace'))
+                    if event and event.get('usage'):
+                        usage = event['usage']
+                    if event and event.get('timings'):
+                        timings = event['timings']
+                    if event and (event.get('choices') or [{}])[0].get('finish_reason'):
+                        finish_reason = event['choices'][0]['finish_reason']
+                    if done or not delta:
+                        continue
+                    if ttft is None:
+                        ttft = time.time() - started
+                    parts.append(delta)
+                    abort_error = on_text(delta)
+                    if abort_error:
+                        return completion_result(False, ''.join(parts), f"Stream abortado: {abort_error}", ttft=ttft, aborted=True)
+                else:
+                    response = None
+            except Exception as e:
+                return completion_result(False, ''.join(parts), f"Exception: {e}", ttft=ttft)
+            finally:
+                if response is not None:
+                    # Salida anticipada (error o cancelacion): descartar la conexion
+                    response.close()
+
+        prefill = prefill_from_response({'usage': usage, 'timings': timings})
+        result = completion_result(True, ''.join(parts), usage=usage, ttft=ttft, prefill=prefill, finish_reason=finish_reason)
+        return await self.continue_completion(url, slot, agent, prompt, max_tokens, result, on_text)
+
+    async def run_attempt(self, prompt, output, pin=None, max_tokens=None):
+        """Intento con consulta previa a la cache de respuestas (ver run_attempt sincrono)"""
+        loop = asyncio.get_running_loop()
+        queued_at = time.time()
+        cache_key = response_cache_key(self.agent, prompt, self.mode)
+        cached = get_response_cache().get(cache_key) if cache_key else None
+        if cached is not None:
+            saved_path = await loop.run_in_executor(None, save_output, cached, output) if output else None
+            if not output or saved_path:
+                return {
+                    'success': True,
+                    'output': f"[CACHE] {saved_path}" if output else cached,
+                    'error': '',
+                    'ttft': None,
+                    'content': cached,
+                    'usage': None,
+                    'timeout': False,
+                    'aborted': False,
+                    'prefill': None,
+                    'continuations': 0,
+                    'cache_key': cache_key,
+                    'cached': True,
+                    'queued_at': queued_at,
+                    'sent_at': None,
+                    'finished_at': None,
+                    'saved_at': time.time(),
+                    'ended_at': time.time()
+                }
+
+        limiter = get_concurrency()
+        if limiter:
+            await limiter.async_acquire()
+        started = time.time()
+        result = None
+        try:
+            result = await self.generate_hedged(prompt, output, pin, max_tokens)
+        finally:
+            if limiter:
+                limiter.record_attempt(result, time.time() - started)
+                await limiter.async_release()
+
+        result.update(cache_key=cache_key, cached=False, queued_at=queued_at, sent_at=started, ended_at=time.time())
+        return result
+
+    async def generate_attempt(self, prompt, output, pin=None, max_tokens=None, agent=None):
+        """Equivalente async de ask_agent_batch_v2.generate_attempt (motor inprocess)"""
+        loop = asyncio.get_running_loop()
+
+        writer = StreamingOutput(output) if self.stream else None
+        if writer:
+            try:
+                response = await asyncio.wait_for(self.stream_completion(prompt, writer.feed, pin, max_tokens, agent),
+                                                  TIMEOUTS['generation'])
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # Sin respuesta no pasa por finish_attempt: eliminar el .part aqui
+                writer.discard()
+                raise
+            finally:
+                writer.close()
+        else:
+            response = await asyncio.wait_for(self.request_completion(prompt, pin, max_tokens, agent),
+                                              TIMEOUTS['generation'])
+
+        return await loop.run_in_executor(None, finish_attempt, response, output, writer)
+
+    async def generate_hedged(self, prompt, output, pin=None, max_tokens=None):
+        """
+        Equivalente async de ask_agent_batch_v2.generate_hedged.
+        La rama perdedora se cancela (task.cancel cierra su conexion) y su archivo se elimina.
+        """
+        loop = asyncio.get_running_loop()
+        hedger = get_hedger()
+        threshold = hedger.threshold(output) if hedger else None
+        started = time.time()
+        if threshold is None:
+            result = await self.generate_attempt(prompt, output, pin, max_tokens)
+            if hedger and result['success']:
+                hedger.record(output, time.time() - started)
+            return result
+
+        async def run_leg(index, agent, leg_pin):
+            path = leg_path(output, index)
+            try:
+                result = await self.generate_attempt(prompt, path, leg_pin, max_tokens, agent)
+            except asyncio.CancelledError:
+                await loop.run_in_executor(None, discard_leg, path)
+                raise
+            except asyncio.TimeoutError:
+                result = failed_leg('Timeout exceeded', timeout=True)
+            except Exception as e:
+                result = failed_leg(str(e))
+            if index == 0 and result['success']:
+                hedger.record(output, time.time() - started)
+            valid = result['success'] and (await loop.run_in_executor(None, self.early_check, path))['valid']
+            return path, result, valid
+
+        legs = {asyncio.ensure_future(run_leg(0, self.agent, pin)): 0}
+        done, _ = await asyncio.wait(legs, timeout=threshold)
+        if not done:
+            # Rama de respaldo: sin pin para que el pool elija otro endpoint
+            hedger.record_fired()
+            legs[asyncio.ensure_future(run_leg(1, hedger.target_agent or self.agent, None))] = 1
+
+        finished = {}
+        winner = None
+        pending = set(legs)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    finished[legs[task]] = task.result()
+                    if winner is None and finished[legs[task]][2]:
+                        winner = legs[task]
+        except BaseException:
+            for path, _, _ in finished.values():
+                await loop.run_in_executor(None, discard_leg, path)
+            raise
+        finally:
+            # Ramas en vuelo (tambien si esta corrutina se cancela o falla): cancelarlas;
+            # run_leg elimina el archivo de la rama cancelada
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+        # Sin rama valida se publica la original para que la validacion informe sus errores
+        chosen = winner if winner is not None else (0 if 0 in finished else next(iter(finished)))
+        for index, (path, result, _) in finished.items():
+            if index != chosen:
+                await loop.run_in_executor(None, discard_leg, path)
+        path, result, _ = finished[chosen]
+        if os.path.exists(path):
+            await loop.run_in_executor(None, promote_leg, path, output)
+        result['output'] = result['output'].replace(path, output)
+
+        if len(legs) > 1:
+            elapsed = time.time() - started
+            outcome = None if winner is None else ('hedge' if winner else 'primary')
+            saved = hedger.expected_saving(output, elapsed) if outcome == 'hedge' else 0.0
+            hedger.record_outcome(outcome, saved)
+        return result
+
+    async def execute_task(self, task):
+        """Ejecuta una tarea con retry automatico (mismo resultado que execute_task)"""
+        prompt = task.get('prompt', '')
+        output = task.get('output', '')
+        task_name = task.get('name', 'unnamed')
+        pin = task.get('pin')
+        max_tokens = task_max_tokens(self.mode, output, self.template_name, task_name)
+        max_retries = self.max_retries
+        loop = asyncio.get_running_loop()
+
+        enhanced_prompt = self.enhance_prompt(prompt, self.template_name, output)
+        current_prompt = enhanced_prompt
+
+        attempts = []
+        for attempt in range(1, max_retries + 1):
+            try:
+                result = await self.run_attempt(current_prompt, output, pin, max_tokens)
+                attempt_result = {
+                    'attempt': attempt,
+                    'success': result['success'],
+                    'output': result['output'],
+                    'error': result['error']
+                }
+                if result['ttft'] is not None:
+                    attempt_result['ttft'] = result['ttft']
+                if result['prefill']:
+                    attempt_result['prefill'] = result['prefill']
+                usage = result['usage'] or {}
+                if usage.get('prompt_tokens'):
+                    attempt_result['prompt_tokens'] = usage['prompt_tokens']
+                if usage.get('completion_tokens'):
+                    attempt_result['completion_tokens'] = usage['completion_tokens']
+                if result['continuations']:
+                    attempt_result['continuations'] = result['continuations']
+                if result['cached']:
+                    attempt_result['cached'] = True
+                attempt_result['timeline'] = attempt_timeline(result)
+                attempt_result['phases'] = attempt_phases(attempt_result['timeline'])
+                attempts.append(attempt_result)
+
+                if result['success']:
+                    if output:
+                        validation_started = time.time()
+                        early_check = await loop.run_in_executor(None, self.early_check, output)
+                        record_validation(attempt_result, validation_started, time.time())
+                        if not early_check['valid']:
+                            if attempt < max_retries:
+                                error_info = f"\n\nPREVIOUS ERROR (Intento {attempt}): Early validation failed - {'; '.join(early_check['errors'])}"
+                                current_prompt = enhanced_prompt + error_info
+                                continue
+                            return {
+                                'name': task_name,
+                                'success': False,
+                                'output': result['output'],
+                                'error': "Early validation failed: " + "; ".join(early_check['errors']),
+                                'target': output,
+                                'file_saved': output,
+                                'attempts': attempts,
+                                'total_attempts': attempt
+                            }
+
+                    if not result['cached']:
+                        await loop.run_in_executor(None, store_validated_output, result['cache_key'], result['content'], output)
+                    return {
+                        'name': task_name,
+                        'success': True,
+                        'output': result['output'],
+                        'error': '',
+                        'target': output,
+                        'file_saved': output if output else None,
+                        'attempts': attempts,
+                        'total_attempts': attempt
+                    }
+                elif attempt < max_retries:
+                    error_info = f"\n\nPREVIOUS ERROR (Intento {attempt}): {result['error'][:200]}"
+                    current_prompt = enhanced_prompt + error_info
+
+            except asyncio.TimeoutError:
+                attempts.append({'attempt': attempt, 'success': False, 'output': '', 'error': 'Timeout exceeded'})
+            except Exception as e:
+                attempts.append({'attempt': attempt, 'success': False, 'output': '', 'error': str(e)})
+
+        return {
+            'name': task_name,
+            'success': False,
+            'output': '',
+            'error': f'Failed after {max_retries} attempts',
+            'target': output,
+            'file_saved': None,
+            'attempts': attempts,
+            'total_attempts': max_retries
+        }
+
+    async def run(self, tasks, on_result=None):
+        """
+        Ejecuta todas las tareas y devuelve los resultados en orden de finalizacion.
+
+        Args:
+            tasks: Lista de tareas
+            on_result: Callback (task, result) invocado al completar cada tarea
+        """
+        self.client = AsyncHTTPClient(max_idle_per_host=self.concurrency)
+        results = []
+
+        async def run_one(task):
+            try:
+                result = await self.execute_task(task)
+            except Exception as exc:
+                print(f"[CRITICAL] {task.get('name', 'unnamed')[:50]} genero excepcion: {exc}")
+                result = {
+                    'name': task.get('name', 'unnamed')[:50],
+                    'success': False,
+                    'output': '',
+                    'error': str(exc),
+                    'target': task.get('output', ''),
+                    'file_saved': None
+                }
+            return task, result
+
+        try:
+            for finished in asyncio.as_completed([run_one(task) for task in tasks]):
+                task, result = await finished
+                results.append(result)
+                if on_result:
+                    on_result(task, result)
+        finally:
+            self.client.close()
+
+        return results
+
+
+def run_batch_async(tasks, agent, mode, max_retries, template_name, concurrency,
+                    enhance_prompt, early_check, stream=False, on_result=None):
+    """Punto de entrada sincrono para el motor async"""
+    engine = AsyncBatchEngine(agent, mode, max_retries, template_name, concurrency,
+                              enhance_prompt, early_check, stream)
+    return asyncio.run(engine.run(tasks, on_result))
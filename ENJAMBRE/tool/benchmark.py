@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark del orquestador contra un servidor LLM simulado.
+
+Levanta mock_llm_server en este proceso, ejecuta ask_agent_batch_v2.py (y
+opcionalmente modular_generator.py) como subproceso con N tareas sinteticas
+por cada configuracion de motor, y mide el lado Python del pipeline:
+tareas/s, makespan, CPU y RSS maximo del orquestador (os.wait4 del hijo).
+Con un servidor rapido el resultado depende del orquestador y no del modelo.
+
+Uso:
+    python benchmark.py --tasks 1,10,100,1000 --engines inprocess,async,async+stream
+    python benchmark.py --baseline benchmark_base.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from config import SCRIPTS, TOOL_DIR
+from utils import load_json, save_json
+from mock_llm_server import MockLLMServer
+
+# Tareas sinteticas: un tipo de archivo por turno (salidas validas para early_validation_check)
+TASK_KINDS = [
+    ('static/style_{i}.css', 'Generate ONLY CSS code (no other languages). Styles for panel {i}'),
+    ('static/script_{i}.js', 'Generate ONLY JavaScript code (no other languages). Animation loop {i}'),
+    ('templates/page_{i}.html', 'Generate ONLY HTML code (no other languages). Page {i}'),
+    ('app_{i}.py', 'Generate ONLY Python code (no other languages). Flask app {i}'),
+]
+
+# Metricas comparadas contra --baseline: (clave, True si mayor es mejor)
+REGRESSION_KEYS = [('tasks_per_sec', True), ('cpu_ms_per_task', False), ('max_rss_mb', False)]
+
+
+def synthetic_tasks(count, nonce):
+    """Tareas con prompts unicos por corrida (el nonce evita aciertos de cache)"""
+    tasks = []
+    for i in range(count):
+        output, prompt = TASK_KINDS[i % len(TASK_KINDS)]
+        tasks.append({
+            'name': f"bench-{i}",
+            'prompt': f"{prompt.format(i=i)} [{nonce}]",
+            'output': output.format(i=i),
+        })
+    return tasks
+
+
+def synthetic_modules(count, nonce):
+    """modules.json de `count` modulos CSS para modular_generator"""
+    return {
+        'output_file': 'style.css',
+        'file_type': 'css',
+        'modules': [
+            {'name': f"CSS-{i}", 'prompt': f"Generate ONLY CSS: section {i} [{nonce}]", 'order': i + 1}
+            for i in range(count)
+        ],
+    }
+
+
+def run_measured(cmd, cwd, env, log_path):
+    """
+    Ejecuta un subproceso y mide su uso de recursos.
+
+    Returns:
+        dict: {'exit_code', 'wall', 'cpu_user', 'cpu_system', 'max_rss_mb'}
+    """
+    with open(log_path, 'w', encoding='utf-8') as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 devuelve el rusage de este hijo (incluye a sus propios hijos ya esperados)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        'exit_code': process.returncode,
+        'wall': round(wall, 4),
+        'cpu_user': round(usage.ru_utime, 4),
+        'cpu_system': round(usage.ru_stime, 4),
+        'max_rss_mb': round(usage.ru_maxrss / 1024, 2),  # ru_maxrss en KiB (Linux)
+    }
+
+
+def bench_batch(engine, stream, count, workers, work_dir, env):
+    """Una corrida de ask_agent_batch_v2.py"""
+    tasks_file = os.path.join(work_dir, 'tasks.json')
+    save_json(tasks_file, synthetic_tasks(count, uuid.uuid4().hex[:12]))
+    cmd = [
+        sys.executable, SCRIPTS['ask_agent_batch'],
+        '--tasks', tasks_file,
+        '--output-dir', os.path.join(work_dir, 'out'),
+        '--engine', engine,
+        '--no-cache',
+        '--max-retries', '2',
+        '--metrics-file', os.path.join(work_dir, 'metrics.json'),
+    ]
+    if stream:
+        cmd.append('--stream')
+    if workers:
+        cmd.extend(['--workers', str(workers)])
+
+    measured = run_measured(cmd, work_dir, env, os.path.join(work_dir, 'batch.log'))
+    report = load_json(os.path.join(work_dir, 'out', 'execution_report.json')) or {}
+    summary = report.get('summary') or {}
+    return measured, summary.get('successful', 0), summary.get('elapsed_time')
+
+
+def bench_modular(count, work_dir, env):
+    """
+    Una corrida de modular_generator.py.
+
+    Su batch corre con cwd=PROJECT_ROOT (execution_report.json y metrics.json
+    del repo); se lanza con PROJECT_ROOT apuntando a la carpeta temporal.
+    """
+    modules_file = os.path.join(work_dir, 'modules.json')
+    save_json(modules_file, synthetic_modules(count, uuid.uuid4().hex[:12]))
+    bootstrap = (
+        "import sys; sys.path.insert(0, sys.argv[1]); import modular_generator; "
+        "modular_generator.PROJECT_ROOT = sys.argv[2]; sys.argv = sys.argv[2:]; modular_generator.main()"
+    )
+    cmd = [sys.executable, '-c', bootstrap, TOOL_DIR, work_dir,
+           '--modules', modules_file, '--output-dir', os.path.join(work_dir, 'out')]
+
+    measured = run_measured(cmd, work_dir, env, os.path.join(work_dir, 'modular.log'))
+    report = load_json(os.path.join(work_dir, 'execution_report.json')) or {}
+    summary = report.get('summary') or {}
+    return measured, summary.get('successful', 0), summary.get('elapsed_time')
+
+
+def compare(runs, baseline, tolerance):
+    """
+    Compara contra un benchmark anterior (misma configuracion y numero de tareas).
+
+    Returns:
+        list: Regresiones [{'run', 'metric', 'baseline', 'current', 'change'}]
+    """
+    def key(run):
+        return (run['target'], run['engine'], run['stream'], run['tasks'])
+
+    previous = {key(run): run for run in baseline.get('runs', [])}
+    regressions = []
+    for run in runs:
+        base = previous.get(key(run))
+        if not base:
+            continue
+        for metric, higher_is_better in REGRESSION_KEYS:
+            old, new = base.get(metric), run.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append({'run': '/'.join(str(k) for k in key(run)), 'metric': metric,
+                                    'baseline': old, 'current': new, 'change': round(change, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del orquestador contra un servidor LLM simulado')
+    parser.add_argument('--tasks', default='1,10,100', help='Numeros de tareas separados por coma (1 a 1000)')
+    parser.add_argument('--engines', default='inprocess,subprocess,async,inprocess+stream,async+stream',
+                        help='Configuraciones de motor (motor[+stream]) separadas por coma')
+    parser.add_argument('--modular', action='store_true', help='Incluir modular_generator.py')
+    parser.add_argument('--workers', type=int, help='Concurrencia fija (por defecto el autoescalado)')
+    parser.add_argument('--latency', default='fixed:0.05', help='Latencia del servidor simulado (ver mock_llm_server.py)')
+    parser.add_argument('--tps', type=float, default=2000, help='Tokens/s del servidor simulado')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de HTTP 500')
+    parser.add_argument('--slots', type=int, default=8, help='Slots del servidor simulado')
+    parser.add_argument('--completion-tokens', type=int, default=200, help='Tokens por respuesta')
+    parser.add_argument('--output', default='benchmark_results.json', help='Resultados (JSON)')
+    parser.add_argument('--baseline', help='Resultados anteriores para detectar regresiones')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Variacion relativa tolerada frente a --baseline')
+    parser.add_argument('--keep', action='store_true', help='Conservar las carpetas temporales')
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.tasks.split(',')]
+    if any(n < 1 or n > 1000 for n in counts):
+        parser.error('--tasks: cada valor debe estar entre 1 y 1000')
+    configs = []
+    for spec in args.engines.split(','):
+        engine, _, flag = spec.strip().partition('+')
+        if engine not in ('inprocess', 'subprocess', 'async') or flag not in ('', 'stream'):
+            parser.error(f"--engines: configuracion invalida '{spec}'")
+        configs.append((engine, flag == 'stream'))
+
+    server = MockLLMServer(latency=args.latency, tokens_per_sec=args.tps, error_rate=args.error_rate,
+                           slots=args.slots, completion_tokens=args.completion_tokens).start()
+    env = dict(os.environ, ENJAMBRE_URLS_QWEN=server.url)
+    print(f"Servidor simulado: {server.url} {json.dumps(server.config())}")
+
+    plan = [('batch', engine, stream, count) for engine, stream in configs for count in counts]
+    if args.modular:
+        plan += [('modular', 'inprocess', False, count) for count in counts]
+
+    runs = []
+    print(f"{'objetivo':<8} {'motor':<18} {'tareas':>6} {'ok':>6} {'makespan':>9} {'tareas/s':>9} "
+          f"{'CPU s':>7} {'ms/tarea':>9} {'RSS MB':>7}")
+    try:
+        for target, engine, stream, count in plan:
+            work_dir = tempfile.mkdtemp(prefix='enjambre_bench_')
+            server.reset_stats()
+            try:
+                if target == 'batch':
+                    measured, successful, makespan = bench_batch(engine, stream, count, args.workers, work_dir, env)
+                else:
+                    measured, successful, makespan = bench_modular(count, work_dir, env)
+            finally:
+                if not args.keep:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+
+            makespan = makespan if makespan is not None else measured['wall']
+            cpu = measured['cpu_user'] + measured['cpu_system']
+            run = {
+                'target': target,
+                'engine': engine,
+                'stream': stream,
+                'tasks': count,
+                'successful': successful,
+                'makespan': round(makespan, 4),
+                'tasks_per_sec': round(count / makespan, 3) if makespan else None,
+                'cpu_seconds': round(cpu, 4),
+                'cpu_ms_per_task': round(cpu * 1000 / count, 3),
+                **measured,
+                'server': server.stats(),
+            }
+            if args.keep:
+                run['work_dir'] = work_dir
+            runs.append(run)
+            label = engine + ('+stream' if stream else '')
+            print(f"{target:<8} {label:<18} {count:>6} {successful:>6} {run['makespan']:>9.3f} "
+                  f"{run['tasks_per_sec'] or 0:>9.2f} {cpu:>7.2f} {run['cpu_ms_per_task']:>9.2f} "
+                  f"{run['max_rss_mb']:>7.1f}")
+    finally:
+        server.stop()
+
+    results = {
+        'benchmark': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'workers': args.workers,
+        },
+        'server': server.config(),
+        'runs': runs,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        baseline = load_json(args.baseline)
+        if baseline is None:
+            print(f"ADVERTENCIA: No se pudo leer la linea base: {args.baseline}")
+        else:
+            regressions = compare(runs, baseline, args.tolerance)
+            results['regressions'] = regressions
+            for item in regressions:
+                print(f"[REGRESION] {item['run']} {item['metric']}: {item['baseline']} -> {item['current']} "
+                      f"({item['change']:+.0%})")
+            if regressions:
+                exit_code = 1
+            else:
+                print(f"Sin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%})")
+
+    save_json(args.output, results)
+    print(f"Resultados: {args.output}")
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
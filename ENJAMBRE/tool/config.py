@@ -24,15 +24,102 @@ GENERATION = {
     'max_tokens_default': 4096,   # Tokens para modo default
     'max_tokens_patch': 1024,     # Tokens para modo patch
     'max_retries': 3,             # Intentos maximos por tarea
+    'max_continuations': 2,       # Continuaciones si una respuesta se corta por max_tokens
     'max_workers': 8,             # Workers maximos en paralelo
     'min_file_size': 50,          # Tamano minimo de archivo valido (bytes)
     'min_combined_size': 100,     # Tamano minimo de archivo combinado (bytes)
 }
 
+# === MOTOR DE EJECUCION ===
+ENGINE = {
+    'default': 'inprocess',       # inprocess (pool HTTP compartido) | subprocess (aislado) | async
+    'pool_size': 8,               # Conexiones keep-alive por host (se ajusta a los workers)
+    'async_concurrency': 64,      # Peticiones simultaneas por endpoint en el motor async
+    'stream': False,              # Generacion SSE con escritura incremental y aborto temprano
+}
+
+# === CONCURRENCIA ADAPTATIVA (AIMD) ===
+AUTOSCALE = {
+    'enabled': True,              # Ajustar concurrencia segun latencia y throughput
+    'initial': 4,                 # Peticiones en vuelo al arrancar
+    'min': 1,                     # Minimo tras reducir por errores/latencia
+    'max': 32,                    # Maximo por endpoint (hilos en motores inprocess/subprocess)
+}
+
+# === BALANCEO ENTRE ENDPOINTS ===
+ENDPOINTS = {
+    'max_failures': 3,            # Errores consecutivos antes de expulsar un endpoint
+    'reprobe_interval': 15,       # Segundos hasta volver a probar un endpoint expulsado
+}
+
+# === DESPACHO POR PREFIJO (cache de prompt de llama.cpp) ===
+PREFIX_DISPATCH = {
+    'enabled': False,             # Agrupar tareas por prefijo y fijar cada grupo a un slot (--prefix-dispatch)
+    'min_prefix_chars': 32,       # Prefijo comun minimo (caracteres) para agrupar prompts
+    'slots': None,                # Slots por servidor (None: consultar /props o /slots)
+    'default_slots': 1,           # Si el servidor no informa sus slots
+    'warmup': True,               # Precalentar cada slot con system prompt + prefijo antes del fan-out
+}
+
+# === PRESUPUESTO DINAMICO DE TOKENS ===
+TOKEN_BUDGET = {
+    'enabled': True,              # max_tokens por tarea segun salidas anteriores
+    'history_dirs': [os.path.join(PROJECT_ROOT, 'tests')],  # Donde buscar execution_report.json (+ padre de --output-dir)
+    'percentile': 99,             # Percentil de tamano de salida a cubrir
+    'margin': 1.25,               # Holgura sobre el percentil
+    'min_tokens': 256,            # Presupuesto minimo
+    'min_samples': 5,             # Muestras minimas por grupo (tarea/template/extension)
+    'chars_per_token': 3.5,       # Estimacion para reportes sin usage (bytes del archivo)
+}
+
+# === HEDGING DE PETICIONES LENTAS ===
+HEDGING = {
+    'enabled': False,             # Duplicar generaciones que superan el percentil de latencia (--hedge)
+    'percentile': 95,             # Percentil de latencia por tipo de archivo que dispara el duplicado
+    'min_samples': 10,            # Generaciones del tipo necesarias antes de duplicar
+    'min_delay': 2.0,             # Umbral minimo en segundos
+    'target_agent': None,         # Agente del duplicado (None: otro endpoint del mismo agente)
+}
+
+# === METRICAS EN VIVO (Prometheus/OpenMetrics) ===
+METRICS = {
+    'host': '127.0.0.1',          # Interfaz del exportador (--metrics-port)
+    'buckets': (0.5, 1, 2, 5, 10, 30, 60, 120, 300),  # Limites (s) de los histogramas de latencia
+}
+
+# === CASSETTES (grabacion/reproduccion de respuestas) ===
+CASSETTE = {
+    'latency_scale': 1.0,         # Factor de las latencias grabadas al reproducir (--latency-scale, 0: sin esperas)
+    'chunk_chars': 64,            # Caracteres por evento al reproducir una generacion en streaming
+}
+
+# === HEALTH CHECKS ===
+HEALTH = {
+    'cache_file': os.path.join(PROJECT_ROOT, '.cache', 'health.json'),
+    'ttl': 10,                    # Segundos que se reutiliza un endpoint sano entre invocaciones
+    'ttl_failure': 2,             # Segundos que se reutiliza un endpoint caido
+}
+
+# === CACHE DE RESPUESTAS ===
+CACHE = {
+    'enabled': True,                                        # Cache de respuestas validadas
+    'dir': os.path.join(PROJECT_ROOT, '.cache', 'responses'),
+    'max_bytes': 64 * 1024 * 1024,                          # Limite en disco (LRU)
+}
+
+# === CACHE DE VALIDACIONES ===
+VALIDATION_CACHE = {
+    'enabled': True,                                        # Reutilizar resultados por hash de contenido
+    'dir': os.path.join(PROJECT_ROOT, '.cache', 'validation'),
+    'max_bytes': 16 * 1024 * 1024,                          # Limite en disco (LRU)
+}
+
 # === AGENTES LLM ===
 AGENTS = {
     'qwen': {
         'url': 'http://127.0.0.1:8080/v1/chat/completions',
+        # Varias instancias llama.cpp: 'urls' reparte las peticiones entre todas
+        # 'urls': ['http://127.0.0.1:8080/v1/chat/completions', 'http://127.0.0.1:8081/v1/chat/completions'],
         'key': 'no-needed',
         'model': 'qwen-local',
     },
@@ -43,15 +130,25 @@ AGENTS = {
     },
 }
 
+# URLs de un agente desde el entorno (servidores alternativos, benchmark.py):
+# ENJAMBRE_URLS_QWEN="http://127.0.0.1:8099/v1/chat/completions,http://127.0.0.1:8100/v1/chat/completions"
+for _name, _agent in AGENTS.items():
+    _env_urls = os.environ.get(f"ENJAMBRE_URLS_{_name.upper()}")
+    if _env_urls:
+        _agent['urls'] = [url.strip() for url in _env_urls.split(',') if url.strip()]
+
 # Rutas a scripts
 SCRIPTS = {
     'ask_agent': os.path.join(TOOL_DIR, 'ask_agent.py'),
     'ask_agent_batch': os.path.join(TOOL_DIR, 'ask_agent_batch_v2.py'),
     'validate_output': os.path.join(TOOL_DIR, 'validate_output.py'),
     'validate_media': os.path.join(TOOL_DIR, 'validate_media.py'),
+    'validate_tree': os.path.join(TOOL_DIR, 'validate_tree.py'),
     'update_metrics': os.path.join(TOOL_DIR, 'update_metrics.py'),
     'generate_project': os.path.join(TOOL_DIR, 'generate_project.py'),
     'modular_generator': os.path.join(TOOL_DIR, 'modular_generator.py'),
+    'mock_llm_server': os.path.join(TOOL_DIR, 'mock_llm_server.py'),
+    'benchmark': os.path.join(TOOL_DIR, 'benchmark.py'),
 }
 
 # Rutas a archivos de configuracion
@@ -6,10 +6,12 @@ Generador de proyectos usando sistema enjambre con prompts optimizados
 import os
 import sys
 import json
+import atexit
 import subprocess
 
 from config import SCRIPTS, CONFIG_FILES, PROJECT_ROOT
-from utils import load_json, save_json, ensure_dir_exists
+from utils import load_json, save_json, ensure_dir_exists, configure_profiling, profile_stage, finish_profiling
+from validate_media import validate_project as validate_media_project, print_report
 
 def load_prompt_library():
     """Carga la librería de prompts"""
@@ -72,8 +74,8 @@ def create_tasks_file(project_name, prompt_type='basic'):
 
     return tasks
 
-def run_swarm(project_name, tasks_file, use_template='flask-simple'):
-    """Ejecuta el sistema enjambre"""
+def run_swarm(project_name, tasks_file, use_template='flask-simple', profile_dir=None):
+    """Ejecuta el sistema enjambre (profile_dir: perfilar tambien el batch en profile_dir/batch)"""
 
     print(f"\nGenerando proyecto '{project_name}' con {len(tasks_file)} tareas...")
 
@@ -85,6 +87,8 @@ def run_swarm(project_name, tasks_file, use_template='flask-simple'):
         '--validate',
         '--max-retries', '2'
     ]
+    if profile_dir:
+        cmd.extend(['--profile', os.path.join(os.path.abspath(profile_dir), 'batch')])
 
     result = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
     
@@ -100,23 +104,28 @@ def validate_project(project_name):
 
     print(f"\nValidando proyecto '{project_name}'...")
 
-    cmd = [
-        sys.executable, SCRIPTS['validate_media'],
-        project_name
-    ]
-
-    result = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    # En este proceso: misma cache de validaciones, sin arrancar otro interprete
+    result = validate_media_project(os.path.join(PROJECT_ROOT, project_name))
+    print_report(result)
     
-    print(result.stdout)
-    
-    return result.returncode == 0
+    return result['success']
 
 def main():
+    # --profile DIR: pstats/tracemalloc por etapa + trace.json (el batch en DIR/batch)
+    profile_dir = None
+    if '--profile' in sys.argv:
+        index = sys.argv.index('--profile')
+        profile_dir = sys.argv[index + 1] if index + 1 < len(sys.argv) else None
+        del sys.argv[index:index + 2]
+
     if len(sys.argv) < 2:
-        print("Uso: python generate_project.py <project_name> [basic|full]")
+        print("Uso: python generate_project.py <project_name> [basic|full] [--profile DIR]")
         print("  basic: prompts directos (más rápido)")
         print("  full: prompts con prefijos (más robusto)")
         sys.exit(1)
+
+    if configure_profiling(profile_dir, 'generate_project'):
+        atexit.register(finish_profiling)
     
     project_name = sys.argv[1]
     prompt_type = sys.argv[2] if len(sys.argv) > 2 else 'basic'
@@ -126,17 +135,20 @@ def main():
     ensure_dir_exists(f'{project_name}/static')
     
     # Crear tasks.json
+    profile_stage('tasks')
     print(f"\n1. Creando tasks.json ({prompt_type})...")
     tasks = create_tasks_file(project_name, prompt_type)
     print(f"   {len(tasks)} tareas creadas")
     
     # Ejecutar enjambre
+    profile_stage('swarm')
     print(f"\n2. Ejecutando sistema enjambre...")
-    if not run_swarm(project_name, f'{project_name}/tasks.json', 'flask-simple'):
+    if not run_swarm(project_name, f'{project_name}/tasks.json', 'flask-simple', profile_dir):
         print("   ❌ Falló la generación")
         return
     
     # Validar
+    profile_stage('validation')
     print(f"\n3. Validando resultados...")
     if not validate_project(project_name):
         print("   WARNING: Algunas validaciones fallaron")
@@ -144,6 +156,7 @@ def main():
         print("   OK: Validacion exitosa")
     
     # Resumen
+    profile_stage('summary')
     print("\n" + "="*60)
     print("RESUMEN")
     print("="*60)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Servidor simulado compatible con OpenAI (/v1/chat/completions) para benchmarks.
+
+Imita lo que el orquestador ve de llama.cpp sin cargar un modelo:
+- latencia hasta el primer token con distribucion configurable
+- decodificacion a N tokens/s (respuesta completa o streaming SSE)
+- slots: peticiones por encima del numero de slots esperan en cola
+- tasa de errores (HTTP 500)
+- /health, /v1/models y /slots para los pre-flight checks
+
+Uso:
+    python mock_llm_server.py --port 8099 --latency lognormal:0.5:0.4 --tps 40 --slots 4
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Codigo base por tipo de archivo (pasa early_validation_check); se rellena hasta el tamano pedido
+CODE = {
+    'py': ("from flask import Flask, render_template\n"
+           "app = Flask(__name__, static_folder='static', template_folder='templates')\n\n"
+           "@app.route('/')\ndef index():\n    return render_template('index.html')\n", "# {n}\n"),
+    'html': ("<!DOCTYPE html>\n<html lang='en'>\n<head>\n<link rel='stylesheet' href='/static/style.css'>\n</head>\n"
+             "<body>\n<canvas id='c'></canvas>\n", "<p>{n}</p>\n"),
+    'css': ("body { margin: 0; background: #000; }\ncanvas { width: 100%; height: 100vh; }\n", ".c{n} {{ color: #fff; }}\n"),
+    'js': ("const canvas = document.getElementById('c');\nconst particles = [];\n"
+           "function draw() { requestAnimationFrame(draw); }\ndraw();\n", "// {n}\n"),
+}
+HTML_END = "<script src='/static/script.js'></script>\n</body>\n</html>\n"
+
+
+def parse_latency(spec):
+    """
+    Distribucion de latencia hasta el primer token.
+
+    Args:
+        spec: 'fixed:S', 'uniform:MIN:MAX' o 'lognormal:MEDIANA:SIGMA' (segundos)
+
+    Returns:
+        callable: () -> segundos
+    """
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == 'fixed' and len(values) == 1:
+        return lambda: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Latencia invalida: {spec} (fixed:S, uniform:MIN:MAX, lognormal:MEDIANA:SIGMA)")
+
+
+def detect_kind(prompt):
+    """Tipo de archivo que pide un prompt (mismo criterio que los prefijos de generate_enhanced_prompt)"""
+    if re.search(r'\bPython\b|from flask|Flask', prompt):
+        return 'py'
+    if 'HTML' in prompt or '<!DOCTYPE' in prompt:
+        return 'html'
+    if 'CSS' in prompt:
+        return 'css'
+    return 'js'
+
+
+def synthetic_code(kind, tokens):
+    """Bloque de codigo de aproximadamente `tokens` tokens (4 caracteres por token)"""
+    head, filler = CODE[kind]
+    tail = HTML_END if kind == 'html' else ''
+    lines = [head]
+    size = len(head) + len(tail)
+    n = 0
+    while size < tokens * 4:
+        line = filler.format(n=n)
+        lines.append(line)
+        size += len(line)
+        n += 1
+    return '```\n' + ''.join(lines) + tail + '```'
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """Ignora las conexiones que el cliente cierra (keep-alive al terminar el proceso)"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockLLMServer:
+    """
+    Servidor simulado en un hilo daemon.
+
+    Args:
+        host: Interfaz
+        port: Puerto (0 = libre)
+        latency: Especificacion de parse_latency
+        tokens_per_sec: Velocidad de decodificacion simulada
+        error_rate: Probabilidad de responder HTTP 500
+        slots: Peticiones atendidas en paralelo
+        completion_tokens: Tamano de cada respuesta
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0.05', tokens_per_sec=2000, error_rate=0.0,
+                 slots=4, completion_tokens=200):
+        self.latency_spec = latency
+        self.latency = parse_latency(latency)
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.slots = slots
+        self.completion_tokens = completion_tokens
+        self.requests = 0
+        self.errors = 0
+        self.busy = 0
+        self.peak_busy = 0
+        self._slots = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self._server = _QuietHTTPServer((host, port), self._handler())
+        self.host, self.port = self._server.server_address[:2]
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/v1/chat/completions"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='mock-llm', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        """Contadores de la ejecucion (para el reporte del benchmark)"""
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors, 'peak_busy': self.peak_busy}
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = self.errors = self.peak_busy = 0
+
+    def config(self):
+        return {
+            'latency': self.latency_spec,
+            'tokens_per_sec': self.tokens_per_sec,
+            'error_rate': self.error_rate,
+            'slots': self.slots,
+            'completion_tokens': self.completion_tokens,
+        }
+
+    def _enter(self):
+        with self._lock:
+            self.busy += 1
+            self.peak_busy = max(self.peak_busy, self.busy)
+
+    def _leave(self):
+        with self._lock:
+            self.busy -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                with server._lock:
+                    busy = server.busy
+                if path == '/health':
+                    self._json(200, {'status': 'ok', 'slots_idle': max(0, server.slots - busy),
+                                     'slots_processing': min(busy, server.slots)})
+                elif path == '/v1/models':
+                    self._json(200, {'object': 'list', 'data': [{'id': 'mock', 'object': 'model'}]})
+                elif path == '/slots':
+                    self._json(200, [{'id': i, 'is_processing': i < busy} for i in range(server.slots)])
+                else:
+                    self._json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                    failed = random.random() < server.error_rate
+                    if failed:
+                        server.errors += 1
+                if failed:
+                    self._json(500, {'error': {'message': 'simulated server error'}})
+                    return
+
+                messages = request.get('messages') or [{}]
+                prompt = messages[1]['content'] if len(messages) > 1 else messages[0].get('content', '')
+                code = synthetic_code(detect_kind(prompt), server.completion_tokens)
+                if len(messages) > 2:
+                    # Continuacion: devolver lo que falta despues de lo ya generado
+                    code = '```\n' + code[len(messages[-2]['content']):]
+                limit = (request.get('max_tokens') or server.completion_tokens * 2) * 4
+                finish_reason = 'length' if len(code) > limit else 'stop'
+                code = code[:limit]
+                usage = {'prompt_tokens': sum(len(m.get('content', '')) for m in messages) // 4,
+                         'completion_tokens': len(code) // 4}
+
+                with server._slots:
+                    server._enter()
+                    try:
+                        time.sleep(server.latency())
+                        if request.get('stream'):
+                            self._stream(code, usage, finish_reason)
+                        else:
+                            time.sleep(usage['completion_tokens'] / server.tokens_per_sec)
+                            self._json(200, {'choices': [{'message': {'role': 'assistant', 'content': code},
+                                                          'finish_reason': finish_reason}], 'usage': usage})
+                    finally:
+                        server._leave()
+
+            def _stream(self, code, usage, finish_reason):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                step = 32
+                for i in range(0, len(code), step):
+                    event = {'choices': [{'delta': {'content': code[i:i + step]}, 'finish_reason': None}]}
+                    self._chunk(f"data: {json.dumps(event)}\n\n")
+                    self.wfile.flush()
+                    time.sleep(step / 4 / server.tokens_per_sec)
+                event = {'choices': [{'delta': {}, 'finish_reason': finish_reason}], 'usage': usage}
+                self._chunk(f"data: {json.dumps(event)}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b'0\r\n\r\n')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor simulado compatible con OpenAI para benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', default='fixed:0.05', help='fixed:S | uniform:MIN:MAX | lognormal:MEDIANA:SIGMA')
+    parser.add_argument('--tps', type=float, default=2000, help='Tokens por segundo de decodificacion')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de HTTP 500')
+    parser.add_argument('--slots', type=int, default=4, help='Peticiones en paralelo')
+    parser.add_argument('--completion-tokens', type=int, default=200, help='Tokens por respuesta')
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.tps, args.error_rate, args.slots,
+                           args.completion_tokens)
+    print(f"Mock LLM en {server.url} ({json.dumps(server.config())})")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ Genera modulos en paralelo, combina y valida.
 """
 
 import argparse
+import atexit
 import json
 import os
 import subprocess
@@ -17,16 +18,25 @@ from utils import (
     load_json,
     save_json,
     ensure_dir_exists,
-    validate_file_language
+    validate_file_language,
+    scan_content,
+    scan_structure,
+    configure_profiling,
+    profile_stage,
+    finish_profiling
 )
 
 
 class ModularGenerator:
-    def __init__(self, modules_file, output_dir=None, keep_temp=False, dry_run=False):
+    def __init__(self, modules_file, output_dir=None, keep_temp=False, dry_run=False, metrics_port=None,
+                 profile_dir=None, cassette_args=None):
         self.modules_file = modules_file
         self.output_dir = output_dir or '.'
         self.keep_temp = keep_temp
         self.dry_run = dry_run
+        self.metrics_port = metrics_port
+        self.profile_dir = profile_dir
+        self.cassette_args = cassette_args or []
         self.temp_dir = None
         self.temp_files = []
         self.results = []
@@ -95,6 +105,11 @@ class ModularGenerator:
             '--tasks', tasks_file,
             '--max-retries', '2'
         ]
+        if self.metrics_port:
+            cmd.extend(['--metrics-port', str(self.metrics_port)])
+        if self.profile_dir:
+            cmd.extend(['--profile', os.path.join(os.path.abspath(self.profile_dir), 'batch')])
+        cmd.extend(self.cassette_args)
 
         result = subprocess.run(
             cmd,
@@ -185,16 +200,14 @@ class ModularGenerator:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        # Verificar brackets balanceados
-        open_brackets = content.count('{') + content.count('(') + content.count('[')
-        close_brackets = content.count('}') + content.count(')') + content.count(']')
-
-        if abs(open_brackets - close_brackets) > 2:
-            return {'valid': False, 'error': 'Brackets desbalanceados'}
+        # Verificar anidacion real (ignora brackets en cadenas, regex y comentarios)
+        structure = scan_structure(content, file_type)
+        if structure is not None and not structure.ok:
+            return {'valid': False, 'error': f"Brackets desbalanceados: {structure.summary()}"}
 
         # Verificar keywords
         keywords = EXPECTED_KEYWORDS.get(file_type, [])
-        found = sum(1 for kw in keywords if kw in content)
+        found = len(scan_content(content, file_type).group('expected'))
 
         return {
             'valid': True,
@@ -232,6 +245,7 @@ class ModularGenerator:
     def run(self):
         """Ejecuta flujo completo"""
         # 1. Cargar modulos
+        profile_stage('load')
         print(f"[LOAD] {self.modules_file}")
         config = self.load_modules()
         print(f"       {len(config['modules'])} modulos para {config['output_file']}")
@@ -247,10 +261,12 @@ class ModularGenerator:
         print(f"[TEMP] {self.temp_dir}")
 
         # 3. Generar tasks.json
+        profile_stage('tasks')
         tasks_file = self.generate_tasks_json(config)
         print(f"[TASKS] {len(config['modules'])} tareas generadas")
 
         # 4. Ejecutar batch
+        profile_stage('generation')
         print("[GEN] Ejecutando generacion en paralelo...")
         batch_result = self.execute_batch(tasks_file)
 
@@ -260,6 +276,7 @@ class ModularGenerator:
             return {'success': False, 'error': 'Batch failed'}
 
         # 5. Verificar resultados de cada modulo
+        profile_stage('check')
         all_ok = True
         for i, module in enumerate(config['modules']):
             temp_file = self.temp_files[i]
@@ -279,6 +296,7 @@ class ModularGenerator:
             return {'success': False, 'error': 'Some modules failed', 'results': self.results}
 
         # 6. Combinar modulos
+        profile_stage('combine')
         print(f"[COMBINE] {len(config['modules'])} modulos -> {config['output_file']}")
         combine_result = self.combine_modules(config)
 
@@ -291,6 +309,7 @@ class ModularGenerator:
             print(f"[WARN] {combine_result['duplicates']} bloques duplicados detectados")
 
         # 7. Validar archivo combinado
+        profile_stage('validation')
         validation = self.validate_combined(combine_result['output_file'], config['file_type'])
         print(f"[VALIDATE] Keywords: {validation.get('keywords_found', 0)}/{validation.get('keywords_expected', 0)}, "
               f"Size: {validation.get('size', 0)} bytes")
@@ -299,6 +318,7 @@ class ModularGenerator:
             print(f"[ERROR] Validacion fallo: {validation['error']}")
 
         # 8. Limpiar temporales
+        profile_stage('cleanup')
         deleted = self.cleanup()
         print(f"[CLEAN] {deleted} archivos temporales eliminados")
 
@@ -321,16 +341,37 @@ def main():
     parser.add_argument('--output-dir', default='.', help='Directorio de salida')
     parser.add_argument('--keep-temp', action='store_true', help='Mantener archivos temporales')
     parser.add_argument('--dry-run', action='store_true', help='Mostrar que haria sin ejecutar')
+    parser.add_argument('--metrics-port', type=int, help='Puerto de metricas Prometheus/OpenMetrics del batch')
+    parser.add_argument('--profile', metavar='DIR', help='Perfilar por etapa (pstats, tracemalloc, trace.json); el batch en DIR/batch')
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='CASSETTE', help='Grabar las respuestas del modelo en una cassette')
+    cassette.add_argument('--replay', metavar='CASSETTE', help='Reproducir una cassette grabada (sin servidor LLM)')
+    parser.add_argument('--latency-scale', type=float, help='Factor de las latencias grabadas (--replay)')
 
     args = parser.parse_args()
 
+    # El batch corre con cwd=PROJECT_ROOT: la cassette se pasa con ruta absoluta
+    cassette_args = []
+    if args.record:
+        cassette_args = ['--record', os.path.abspath(args.record)]
+    elif args.replay:
+        cassette_args = ['--replay', os.path.abspath(args.replay)]
+        if args.latency_scale is not None:
+            cassette_args.extend(['--latency-scale', str(args.latency_scale)])
+
     generator = ModularGenerator(
         modules_file=args.modules,
         output_dir=args.output_dir,
         keep_temp=args.keep_temp,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        metrics_port=args.metrics_port,
+        profile_dir=args.profile,
+        cassette_args=cassette_args
     )
 
+    if configure_profiling(args.profile, 'modular_generator'):
+        atexit.register(finish_profiling)
+
     try:
         result = generator.run()
         if result.get('success'):
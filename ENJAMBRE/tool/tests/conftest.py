@@ -0,0 +1,62 @@
+"""
+Configuracion comun de los tests de tool/.
+
+Uso (desde ENJAMBRE/tool):
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if TOOL_DIR not in sys.path:
+    sys.path.insert(0, TOOL_DIR)
+
+# Proyectos generados de ejemplo (ENJAMBRE/tests), solo lectura
+FIXTURES_DIR = os.path.join(os.path.dirname(TOOL_DIR), 'tests')
+
+
+def fixture_files(*extensions):
+    """Archivos de FIXTURES_DIR con alguna de las extensiones, ordenados"""
+    found = []
+    for dirpath, _, filenames in os.walk(FIXTURES_DIR):
+        for filename in filenames:
+            if filename.rsplit('.', 1)[-1] in extensions:
+                found.append(os.path.join(dirpath, filename))
+    return sorted(found)
+
+
+def fixture_projects():
+    """Proyectos de FIXTURES_DIR (carpetas con app.py o templates/)"""
+    return sorted(
+        os.path.join(FIXTURES_DIR, name) for name in os.listdir(FIXTURES_DIR)
+        if os.path.isfile(os.path.join(FIXTURES_DIR, name, 'app.py'))
+        or os.path.isdir(os.path.join(FIXTURES_DIR, name, 'templates'))
+    )
+
+
+@pytest.fixture(autouse=True)
+def validation_cache(tmp_path, monkeypatch):
+    """Cache de validaciones aislada en un directorio temporal por test"""
+    import config
+    from utils import validation_cache as module
+
+    monkeypatch.setitem(config.VALIDATION_CACHE, 'dir', str(tmp_path / 'validation-cache'))
+    monkeypatch.setattr(module, '_validation_cache', None)
+    yield module.get_validation_cache()
+    monkeypatch.setattr(module, '_validation_cache', None)
+
+
+def write_project(root, files):
+    """Crea un proyecto {ruta relativa: texto} (None = carpeta vacia)"""
+    for rel, text in files.items():
+        path = os.path.join(root, rel)
+        if text is None:
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return str(root)
@@ -0,0 +1,48 @@
+"""Streaming del motor async (AsyncBatchEngine.generate_attempt): el .part no queda en disco"""
+
+import asyncio
+import os
+
+import pytest
+
+import async_engine
+from async_engine import AsyncBatchEngine
+
+
+def streaming_engine(monkeypatch, seconds):
+    """Motor en streaming cuyo stream_completion escribe un trozo y espera `seconds`"""
+    monkeypatch.setitem(async_engine.TIMEOUTS, 'generation', 0.2)
+    engine = AsyncBatchEngine('qwen', 'default', 1, None, 1, None, None, stream=True)
+
+    async def stream_completion(prompt, on_text, pin=None, max_tokens=None, agent=None):
+        on_text("```javascript\ndocument.getElementById('x');\n")
+        await asyncio.sleep(seconds)
+
+    engine.stream_completion = stream_completion
+    return engine
+
+
+def test_stream_timeout_discards_part(monkeypatch, tmp_path):
+    output = str(tmp_path / 'app.js')
+    engine = streaming_engine(monkeypatch, 5)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(engine.generate_attempt('prompt', output))
+    assert not os.path.exists(f"{output}.part")
+    assert not os.path.exists(output)
+
+
+def test_stream_cancel_discards_part(monkeypatch, tmp_path):
+    output = str(tmp_path / 'app.js')
+    engine = streaming_engine(monkeypatch, 5)
+    monkeypatch.setitem(async_engine.TIMEOUTS, 'generation', 10)
+
+    async def main():
+        task = asyncio.ensure_future(engine.generate_attempt('prompt', output))
+        await asyncio.sleep(0.05)
+        assert os.path.exists(f"{output}.part")
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert not os.path.exists(f"{output}.part")
@@ -0,0 +1,133 @@
+"""Limitador AIMD (utils/concurrency.py) con reloj simulado"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils import AdaptiveConcurrency
+from utils import concurrency as concurrency_module
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(concurrency_module, 'time', clock)
+    return clock
+
+
+def window(limiter, clock, seconds, latency=1.0, tokens=100):
+    """Completa una ventana de `limit` respuestas en `seconds` segundos"""
+    clock.now += seconds
+    for _ in range(limiter.limit):
+        limiter.record(latency, tokens)
+
+
+def test_throughput_increase_is_additive(clock):
+    limiter = AdaptiveConcurrency(2, minimum=1, maximum=8)
+    window(limiter, clock, 1.0)
+    assert limiter.limit == 3
+    # 3 x 100 tokens en 1 s > 2 x 100 tokens en 1 s
+    window(limiter, clock, 1.0)
+    assert limiter.limit == 4
+    # Mismo throughput (no mejora >= 5%): el limite se mantiene
+    window(limiter, clock, 4 / 3 * 1.0)
+    assert limiter.limit == 4
+    assert [entry['reason'] for entry in limiter.history] == ['start', 'throughput_up', 'throughput_up']
+
+
+def test_latency_spike_is_multiplicative(clock):
+    limiter = AdaptiveConcurrency(4, minimum=1, maximum=8)
+    window(limiter, clock, 1.0, latency=1.0)
+    assert limiter.limit == 5
+    window(limiter, clock, 1.0, latency=2.5)
+    assert limiter.limit == 2
+    assert limiter.history[-1]['reason'] == 'latency_spike'
+
+
+def test_timeout_backs_off_once_per_window(clock):
+    limiter = AdaptiveConcurrency(8, minimum=1, maximum=8)
+    limiter.record(30, timeout=True)
+    limiter.record(30, timeout=True)
+    limiter.record(1, ok=False)
+    assert limiter.limit == 4
+    assert [entry['reason'] for entry in limiter.history] == ['start', 'timeout']
+    # Tras una ventana completa vuelve a poder reducir
+    window(limiter, clock, 1.0)
+    limiter.record(1, ok=False)
+    assert limiter.history[-1]['reason'] == 'error'
+
+
+def test_limits_are_clamped(clock):
+    limiter = AdaptiveConcurrency(1, minimum=1, maximum=2)
+    for _ in range(5):
+        window(limiter, clock, 1.0, tokens=limiter.limit * 1000)
+    assert limiter.limit == 2
+    for _ in range(5):
+        limiter.record(1, timeout=True)
+        window(limiter, clock, 1.0)
+    assert limiter.limit >= 1
+    assert AdaptiveConcurrency(20, minimum=1, maximum=8).limit == 8
+
+
+def test_non_adaptive_keeps_limit(clock):
+    limiter = AdaptiveConcurrency(3, adaptive=False)
+    limiter.record(1, timeout=True)
+    window(limiter, clock, 1.0)
+    assert limiter.limit == 3
+    assert limiter.report()['history'] == [limiter.history[0]]
+
+
+def test_aborted_stream_is_not_an_error(clock):
+    limiter = AdaptiveConcurrency(4)
+    limiter.record_attempt({'success': False, 'aborted': True, 'timeout': False, 'usage': None}, 1.0)
+    assert limiter.limit == 4
+    limiter.record_attempt(None, 30)
+    assert limiter.limit == 2
+
+
+def test_thread_gate_respects_limit():
+    limiter = AdaptiveConcurrency(2, adaptive=False)
+    release = threading.Event()
+    entered = []
+
+    def worker():
+        limiter.acquire()
+        entered.append(1)
+        release.wait(5)
+        limiter.release()
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while len(entered) < 2:
+        time.sleep(0.001)
+    assert limiter.in_flight == 2
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(entered) == 5 and limiter.peak_in_flight == 2 and limiter.in_flight == 0
+
+
+def test_async_gate_respects_limit():
+    limiter = AdaptiveConcurrency(3, adaptive=False)
+
+    async def worker():
+        await limiter.async_acquire()
+        await asyncio.sleep(0.01)
+        await limiter.async_release()
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(10)))
+
+    asyncio.run(main())
+    assert limiter.peak_in_flight == 3 and limiter.in_flight == 0
@@ -0,0 +1,226 @@
+"""
+Hedging (generate_hedged de async_engine y ask_agent_batch_v2): la rama que
+termina con timeout o excepcion no deja huerfana a la otra, la perdedora se
+cancela y ningun archivo de rama queda en disco.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ask_agent_batch_v2 as batch
+import async_engine
+from async_engine import AsyncBatchEngine
+from utils import Hedger, leg_path
+
+HEDGE_DELAY = 0.05
+
+
+@pytest.fixture
+def hedger():
+    hedger = Hedger(pct=50, min_samples=1, min_delay=HEDGE_DELAY)
+    hedger.record('index.js', HEDGE_DELAY)
+    return hedger
+
+
+def saved(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return {'success': True, 'output': f"[SAVED] {path}", 'error': '', 'timeout': False, 'aborted': False}
+
+
+def early_check(path):
+    return {'valid': os.path.exists(path), 'errors': [], 'warnings': []}
+
+
+def leftovers(output):
+    return [path for leg in (0, 1) for path in (leg_path(output, leg), f"{leg_path(output, leg)}.part")
+            if os.path.exists(path)]
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+# --- Motor async ---
+
+def run_async_hedged(monkeypatch, hedger, output, legs):
+    """Ejecuta AsyncBatchEngine.generate_hedged con legs[indice](path) como generate_attempt"""
+    monkeypatch.setattr(async_engine, 'get_hedger', lambda: hedger)
+    engine = AsyncBatchEngine('qwen', 'default', 1, None, 1, None, early_check)
+
+    async def generate_attempt(prompt, path, pin=None, max_tokens=None, agent=None):
+        return await legs[0 if path == leg_path(output, 0) else 1](path)
+
+    engine.generate_attempt = generate_attempt
+    return asyncio.run(engine.generate_hedged('prompt', output))
+
+
+def test_async_primary_timeout_waits_for_hedge(monkeypatch, hedger, tmp_path):
+    output = str(tmp_path / 'index.js')
+
+    async def primary(path):
+        saved(f"{path}.part", 'parcial')
+        await asyncio.sleep(0.15)
+        raise asyncio.TimeoutError()
+
+    async def hedge(path):
+        await asyncio.sleep(0.3)
+        return saved(path, 'hedge')
+
+    result = run_async_hedged(monkeypatch, hedger, output, [primary, hedge])
+    assert result['success']
+    assert result['output'] == f"[SAVED] {output}"
+    assert read(output) == 'hedge'
+    assert leftovers(output) == []
+    assert hedger.stats()['hedge_wins'] == 1
+
+
+def test_async_losing_leg_is_cancelled(monkeypatch, hedger, tmp_path):
+    output = str(tmp_path / 'index.js')
+    cancelled = []
+
+    async def primary(path):
+        saved(f"{path}.part", 'parcial')
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(path)
+            raise
+
+    async def hedge(path):
+        await asyncio.sleep(0.1)
+        return saved(path, 'hedge')
+
+    started = time.time()
+    result = run_async_hedged(monkeypatch, hedger, output, [primary, hedge])
+    assert time.time() - started < 2
+    assert result['success'] and read(output) == 'hedge'
+    assert cancelled == [leg_path(output, 0)]
+    assert leftovers(output) == []
+
+
+def test_async_both_legs_fail(monkeypatch, hedger, tmp_path):
+    output = str(tmp_path / 'index.js')
+
+    async def primary(path):
+        await asyncio.sleep(0.1)
+        raise asyncio.TimeoutError()
+
+    async def hedge(path):
+        await asyncio.sleep(0.05)
+        raise ConnectionError('conexion rechazada')
+
+    result = run_async_hedged(monkeypatch, hedger, output, [primary, hedge])
+    assert not result['success']
+    assert result['timeout'] and result['error'] == 'Timeout exceeded'
+    assert not os.path.exists(output)
+    assert leftovers(output) == []
+    assert hedger.stats()['no_winner'] == 1
+
+
+def test_async_outer_cancel_cancels_both_legs(monkeypatch, hedger, tmp_path):
+    output = str(tmp_path / 'index.js')
+    monkeypatch.setattr(async_engine, 'get_hedger', lambda: hedger)
+    engine = AsyncBatchEngine('qwen', 'default', 1, None, 1, None, early_check)
+    cancelled = []
+
+    async def generate_attempt(prompt, path, pin=None, max_tokens=None, agent=None):
+        saved(f"{path}.part", 'parcial')
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(path)
+            raise
+
+    engine.generate_attempt = generate_attempt
+
+    async def main():
+        task = asyncio.ensure_future(engine.generate_hedged('prompt', output))
+        await asyncio.sleep(HEDGE_DELAY * 3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert sorted(cancelled) == sorted([leg_path(output, 0), leg_path(output, 1)])
+    assert leftovers(output) == []
+
+
+# --- Motor de hilos ---
+
+@pytest.fixture
+def hedge_executor(monkeypatch, hedger):
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(batch, 'get_hedger', lambda: hedger)
+    monkeypatch.setattr(batch, 'get_hedge_executor', lambda workers=None: executor)
+    monkeypatch.setattr(batch, 'early_validation_check', early_check)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def run_sync_hedged(monkeypatch, output, legs):
+    def generate_attempt(agent, prompt, mode, path, engine="inprocess", stream=False, pin=None, max_tokens=None,
+                         cancel=None):
+        return legs[0 if path == leg_path(output, 0) else 1](path, cancel)
+
+    monkeypatch.setattr(batch, 'generate_attempt', generate_attempt)
+    return batch.generate_hedged('qwen', 'prompt', 'default', output)
+
+
+def test_sync_primary_exception_waits_for_hedge(monkeypatch, hedger, hedge_executor, tmp_path):
+    output = str(tmp_path / 'index.js')
+
+    def primary(path, cancel):
+        time.sleep(0.15)
+        raise ConnectionError('conexion rechazada')
+
+    def hedge(path, cancel):
+        time.sleep(0.3)
+        return saved(path, 'hedge')
+
+    result = run_sync_hedged(monkeypatch, output, [primary, hedge])
+    assert result['success'] and read(output) == 'hedge'
+    assert leftovers(output) == []
+    assert hedger.stats()['hedge_wins'] == 1
+
+
+def test_sync_losing_leg_is_cancelled(monkeypatch, hedger, hedge_executor, tmp_path):
+    output = str(tmp_path / 'index.js')
+    stopped = threading.Event()
+
+    def primary(path, cancel):
+        saved(f"{path}.part", 'parcial')
+        if cancel.wait(5):
+            stopped.set()
+        return {'success': False, 'output': '', 'error': 'Cancelado', 'timeout': False, 'aborted': True}
+
+    def hedge(path, cancel):
+        time.sleep(0.1)
+        return saved(path, 'hedge')
+
+    result = run_sync_hedged(monkeypatch, output, [primary, hedge])
+    assert result['success'] and read(output) == 'hedge'
+    hedge_executor.shutdown(wait=True)
+    assert stopped.is_set()
+    assert leftovers(output) == []
+
+
+def test_sync_both_legs_fail(monkeypatch, hedger, hedge_executor, tmp_path):
+    output = str(tmp_path / 'index.js')
+
+    def primary(path, cancel):
+        time.sleep(0.1)
+        raise batch.subprocess.TimeoutExpired('ask_agent', 1)
+
+    def hedge(path, cancel):
+        raise RuntimeError('sin respuesta')
+
+    result = run_sync_hedged(monkeypatch, output, [primary, hedge])
+    assert not result['success'] and result['timeout']
+    assert leftovers(output) == []
@@ -0,0 +1,81 @@
+"""Despacho por prefijo (utils/prefix_dispatch.py y prepare_prefix_dispatch)"""
+
+from collections import Counter
+
+import ask_agent_batch_v2 as batch
+from utils import group_by_prefix, plan_prefix_dispatch
+
+JS_PREFIX = "Generate ONLY JavaScript code for the browser (no Python/HTML/CSS/explanations). Code: "
+CSS_PREFIX = "Generate ONLY CSS code (no HTML/JS/Python/explanations). Code: "
+
+
+def make_tasks(prompts):
+    return [{'name': f"t{i}", 'prompt': prompt} for i, prompt in enumerate(prompts)]
+
+
+def test_group_by_prefix():
+    prompts = [JS_PREFIX + 'a', CSS_PREFIX + 'b', JS_PREFIX + 'c', 'corto']
+    groups = group_by_prefix(prompts, min_prefix=32)
+    assert sorted(sorted(g['indices']) for g in groups) == [[0, 2], [1], [3]]
+    assert next(g for g in groups if 0 in g['indices'])['prefix'] == JS_PREFIX
+
+
+def test_large_group_is_split_across_slots():
+    prompts = [JS_PREFIX + f"tarea {i}" for i in range(10)] + [CSS_PREFIX + f"tarea {i}" for i in range(2)]
+    tasks = make_tasks(prompts)
+    slots = [('http://a', 0), ('http://a', 1), ('http://b', 0), ('http://b', 1)]
+    ordered, plan = plan_prefix_dispatch(tasks, prompts, slots)
+
+    per_slot = Counter((t['pin']['url'], t['pin']['slot']) for t in ordered)
+    assert set(per_slot) == set(slots)
+    # ceil(12 / 4) = 3 tareas como maximo por slot
+    assert max(per_slot.values()) == 3
+    assert sum(entry['tasks'] for entry in plan) == len(tasks)
+    # Los primeros despachos reparten un slot distinto cada uno
+    assert len({(t['pin']['url'], t['pin']['slot']) for t in ordered[:4]}) == 4
+    # Las tareas JS siguen compartiendo el prefijo de su grupo en todos sus slots
+    assert all(entry['prefix'].startswith(JS_PREFIX) or entry['prefix'].startswith(CSS_PREFIX) for entry in plan)
+
+
+def test_small_groups_keep_one_slot_each():
+    prompts = [JS_PREFIX + 'a', JS_PREFIX + 'b', CSS_PREFIX + 'c', CSS_PREFIX + 'd']
+    tasks = make_tasks(prompts)
+    ordered, plan = plan_prefix_dispatch(tasks, prompts, [('u', 0), ('u', 1)])
+    assert len(plan) == 2
+    js_slots = {task['pin']['slot'] for task in tasks[:2]}
+    css_slots = {task['pin']['slot'] for task in tasks[2:]}
+    assert len(js_slots) == 1 and len(css_slots) == 1 and js_slots != css_slots
+
+
+def test_no_slots_or_tasks():
+    tasks = make_tasks(['x'])
+    assert plan_prefix_dispatch(tasks, ['x'], []) == (tasks, [])
+    assert plan_prefix_dispatch([], [], [('u', 0)]) == ([], [])
+
+
+def test_prepare_without_healthy_endpoints_skips_warmup(monkeypatch):
+    warmed = []
+    monkeypatch.setattr(batch, 'warm_prompt_cache', lambda *args: warmed.append(args) or True)
+    urls = batch.get_endpoint_pool('qwen').urls
+    health = {url: {'healthy': False} for url in urls}
+    tasks = [{'name': 't', 'prompt': 'x', 'output': 'a.js'}]
+
+    ordered, summary = batch.prepare_prefix_dispatch(tasks, 'qwen', 'default', None, health)
+    assert ordered == tasks
+    assert summary == {'slots': 0, 'warmed': 0, 'groups': []}
+    assert warmed == []
+
+
+def test_prepare_warms_each_used_slot(monkeypatch):
+    warmed = []
+    monkeypatch.setattr(batch, 'warm_prompt_cache',
+                        lambda agent, prefix, url, slot, mode, session: warmed.append((url, slot)) or True)
+    monkeypatch.setitem(batch.PREFIX_DISPATCH, 'slots', 2)
+    monkeypatch.setitem(batch.PREFIX_DISPATCH, 'warmup', True)
+    url = batch.get_endpoint_pool('qwen').urls[0]
+    tasks = [{'name': f"t{i}", 'prompt': f"tarea {i}", 'output': f"static/m{i}.js"} for i in range(6)]
+
+    ordered, summary = batch.prepare_prefix_dispatch(tasks, 'qwen', 'default', None, {url: {'healthy': True}})
+    assert len(ordered) == 6
+    assert sorted(warmed) == sorted({(g['url'], g['slot']) for g in summary['groups']})
+    assert summary['warmed'] == len(warmed)
@@ -0,0 +1,168 @@
+"""
+structure_checks de templates.json (utils/rule_plan.py) contra los checks
+escritos a mano que reemplazan (validate_output.check_structure anterior).
+"""
+
+import pytest
+
+from conftest import fixture_projects, write_project
+from utils import NODEJS_API_PATTERNS, ProjectSnapshot, compile_rules, get_template_registry
+import validate_output
+
+LEGACY_TYPES = ['flask', 'react', 'cyberpunk', 'flask-fullstack']
+
+
+def legacy_validations(snapshot, template_type):
+    """Checks de validate_output.check_structure antes de templates.json (referencia)"""
+    contains = snapshot.contains
+    if template_type == "flask":
+        return [
+            ("app.py exists", snapshot.exists("app.py")),
+            ("templates/ exists", snapshot.exists("templates")),
+            ("static/ exists", snapshot.exists("static")),
+            ("render_template in app.py", contains("app.py", "render_template")),
+            ("Flask app initialized", contains("app.py", "Flask(__name__")),
+        ]
+    if template_type == "react":
+        return [
+            ("package.json exists", snapshot.exists("package.json")),
+            ("src/ exists", snapshot.exists("src")),
+            ("public/ exists", snapshot.exists("public")),
+        ]
+    if template_type == "cyberpunk":
+        return [
+            ("matrix-bg ID in HTML", contains("templates/index.html", 'id="matrix-bg"')),
+            ("terminal-container class", contains("templates/index.html", 'class="terminal-container"')),
+            ("access-panel ID", contains("templates/index.html", 'id="access-panel"')),
+            ("canvas in script.js", contains("static/script.js", "getElementById('matrix-bg')")),
+            ("green color #0f0", contains("static/style.css", "#0f0")),
+        ]
+
+    html, js = "templates/index.html", "static/script.js"
+    validations = [
+        ("app.py exists", snapshot.exists("app.py")),
+        ("templates/ exists", snapshot.exists("templates")),
+        ("static/ exists", snapshot.exists("static")),
+        ("templates/index.html exists", snapshot.exists(html)),
+        ("static/style.css exists", snapshot.exists("static/style.css")),
+        ("static/script.js exists", snapshot.exists(js)),
+        ("HTML link /static/style.css", contains(html, "href") and contains(html, "/static/style.css")),
+        ("HTML link /static/script.js", contains(html, "src") and contains(html, "/static/script.js")),
+        ("JS getElementById", contains(js, "getElementById")),
+    ]
+    if not contains(html, "chart.js"):
+        validations.append(("JS addEventListener", contains(js, "addEventListener")))
+    scan = snapshot.scan(js)
+    if scan is not None:
+        if "require(" in scan:
+            validations.append(("JS NO require()", False))
+        if "module.exports" in scan:
+            validations.append(("JS NO module.exports", False))
+        if 'import ' in scan and ' from ' in scan and scan.count('import ') > 3:
+            validations.append(("JS NO ES Modules", False))
+        api = scan.first_of(NODEJS_API_PATTERNS)
+        if api:
+            validations.append((f"JS NO {api}", False))
+    validations.append(("Flask with explicit folders",
+                        contains("app.py", "static_folder='static'") and contains("app.py", "template_folder='templates'")))
+    return validations
+
+
+def legacy_result(project, template_type):
+    validations = legacy_validations(ProjectSnapshot(project), template_type)
+    results = {name: status for name, status in validations}
+    passed = sum(1 for status in results.values() if status)
+    return {"passed": passed, "total": len(validations), "validations": results, "success": passed == len(validations)}
+
+
+SYNTHETIC = {
+    'nodejs': {
+        'app.py': "from flask import Flask\napp = Flask(__name__)\n",
+        'templates/index.html': '<script src="/static/script.js"></script> href chart.js',
+        'static/script.js': "const fs = require('fs'); module.exports = 1; import a from 'x'; import b from 'y';"
+                            "import c from 'z'; import d from 'w'; process.env; getElementById",
+    },
+    'three-imports': {
+        'app.py': "render_template Flask(__name__ static_folder='static' template_folder='templates'",
+        'templates/index.html': 'x',
+        'static/script.js': "import a from 'x'; import b from 'y'; import c from 'z'; __dirname",
+    },
+    'complete': {
+        'app.py': "from flask import Flask, render_template\n"
+                  "app = Flask(__name__, static_folder='static', template_folder='templates')\n",
+        'templates/index.html': '<link href="/static/style.css"><script src="/static/script.js"></script>',
+        'static/style.css': 'body { color: #0f0; }',
+        'static/script.js': "document.getElementById('matrix-bg').addEventListener('click', f);",
+    },
+    'react': {'package.json': '{}', 'src': None, 'public': None},
+    'empty': {'notes.txt': 'nada'},
+}
+
+
+def projects(tmp_path):
+    synthetic = [write_project(tmp_path / name, files) for name, files in SYNTHETIC.items()]
+    return fixture_projects() + synthetic
+
+
+def test_legacy_types_declared():
+    assert get_template_registry().structure_types() == LEGACY_TYPES
+
+
+@pytest.mark.parametrize('template_type', LEGACY_TYPES)
+def test_plan_matches_legacy_checks(tmp_path, template_type):
+    for project in projects(tmp_path):
+        expected = legacy_result(project, template_type)
+        result = validate_output.check_structure(project, template_type)
+        assert result == expected, project
+        # Mismo orden de checks en el reporte
+        assert list(result['validations']) == list(expected['validations']), project
+
+
+def test_flask_fullstack_forbidden_checks(tmp_path):
+    project = write_project(tmp_path / 'nodejs', SYNTHETIC['nodejs'])
+    validations = validate_output.check_structure(project, 'flask-fullstack')['validations']
+    for name in ("JS NO require()", "JS NO module.exports", "JS NO ES Modules", "JS NO process."):
+        assert validations[name] is False
+    # chart.js en el HTML: addEventListener no es obligatorio
+    assert "JS addEventListener" not in validations
+
+
+def test_plan_reads_each_file_once(tmp_path):
+    project = write_project(tmp_path / 'complete', SYNTHETIC['complete'])
+    snapshot = ProjectSnapshot(project)
+    get_template_registry().index('flask-fullstack').check_plan.run(snapshot)
+    assert snapshot.reads == 4
+
+
+def test_unknown_type_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        validate_output.validate_structure(str(tmp_path), 'flask-basic')
+
+
+def test_rule_kinds(tmp_path):
+    project = write_project(tmp_path / 'p', {'app.py': "@app.route('/')\nimport os\n"})
+    plan = compile_rules([
+        {"name": "route", "file": "app.py", "regex": r"@app\.route\(['\"]/['\"]"},
+        {"name": "missing", "file": "nope.py", "exists": True},
+        {"name": "NO {match}", "file": "app.py", "forbid": ["import sys", "import os"]},
+        {"name": "skipped", "file": "app.py", "contains": "x", "when": {"file": "nope.py", "exists": True}},
+    ])
+    assert plan.run(ProjectSnapshot(project)) == [("route", True), ("missing", False), ("NO import os", False)]
+    assert plan.paths == ['app.py', 'nope.py']
+
+
+@pytest.mark.parametrize('rule', [
+    {"name": "two kinds", "file": "a", "exists": True, "contains": "x"},
+    {"name": "no file", "exists": True},
+    {"file": "a", "exists": True},
+    {"name": "bad set", "file": "a", "forbid_set": "nope"},
+])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        compile_rules([rule])
+
+
+def test_plan_digest_changes_with_rules():
+    a = compile_rules([{"name": "x", "file": "a", "exists": True}])
+    b = compile_rules([{"name": "x", "file": "a", "contains": "y"}])
+    assert a.digest != b.digest
@@ -0,0 +1,99 @@
+"""Tokenizador estructural (utils/structure.py): un solo feed vs. feed por chunks"""
+
+import random
+
+import pytest
+
+from conftest import fixture_files
+from utils import scan_structure, structure_tokenizer
+
+SOURCES = fixture_files('js', 'css', 'html')
+
+CASES = [
+    ("const s = '{'; const r = /[}]/g; let t = `a ${ {x: 1}.x } b`; // }\n/* { */ f(a / b / c);", 'js', True),
+    ("if (x) { return /}/.test(y) }", 'js', True),
+    ("x = a / 2 / b; y = (c) / d", 'js', True),
+    ("function f() { const a = [1, 2", 'js', False),
+    ("const s = 'abc", 'js', False),
+    ("let t = `abc ${x", 'js', False),
+    ("}", 'js', False),
+    ("f([1, 2)", 'js', False),
+    ("a { background: url('x}.png') }", 'css', True),
+    ("a { color: red; } /* x", 'css', False),
+    ("<html><head><style>a{}</style><script>if (a < b) { x = '</div>' }</script></head>"
+     "<body><!-- c --></body></html>", 'html', True),
+    ("<html><body><script>function f() {", 'html', False),
+    ("<html><body><div class=\"x", 'html', False),
+]
+
+
+def file_type(path):
+    return path.rsplit('.', 1)[-1]
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def feed_chunks(content, language, sizes):
+    tokenizer = structure_tokenizer(language)
+    position = 0
+    for size in sizes:
+        tokenizer.feed(content[position:position + size])
+        position += size
+    tokenizer.feed(content[position:], final=True)
+    return tokenizer.finish()
+
+
+@pytest.mark.parametrize('content, language, ok', CASES)
+def test_cases(content, language, ok):
+    report = scan_structure(content, language)
+    assert report.ok is ok, report.summary()
+
+
+@pytest.mark.parametrize('content, language, ok', CASES)
+def test_cases_every_split_point(content, language, ok):
+    whole = scan_structure(content, language).to_dict()
+    for split in range(len(content) + 1):
+        assert feed_chunks(content, language, [split]).to_dict() == whole, split
+
+
+def test_fixtures_found():
+    assert SOURCES, "ENJAMBRE/tests no tiene archivos js/css/html"
+
+
+@pytest.mark.parametrize('path', SOURCES)
+def test_fixture_is_well_formed(path):
+    report = scan_structure(read(path), file_type(path))
+    assert report.ok, report.summary()
+    assert report.lines == read(path).count('\n') + 1
+
+
+@pytest.mark.parametrize('path', SOURCES)
+def test_fixture_chunked_equals_whole(path):
+    content = read(path)
+    whole = scan_structure(content, file_type(path)).to_dict()
+    rng = random.Random(path)
+    for _ in range(5):
+        sizes = [rng.randint(1, 40) for _ in range(len(content) // 20 + 1)]
+        assert feed_chunks(content, file_type(path), sizes).to_dict() == whole
+
+
+@pytest.mark.parametrize('path', SOURCES)
+def test_fixture_truncation_chunked_equals_whole(path):
+    content = read(path)
+    truncated = content[:len(content) * 2 // 3]
+    whole = scan_structure(truncated, file_type(path)).to_dict()
+    assert feed_chunks(truncated, file_type(path), [7] * (len(truncated) // 7)).to_dict() == whole
+
+
+def test_unknown_type_has_no_tokenizer():
+    assert structure_tokenizer('python') is None
+    assert scan_structure('def f(:', 'python') is None
+
+
+def test_error_reports_line():
+    report = scan_structure("a {\n  color: red;\n}}\n", 'css')
+    assert not report.ok
+    assert "linea 3" in report.summary()
@@ -0,0 +1,43 @@
+"""Validacion de arboles de proyectos (validate_tree.py): solo lectura"""
+
+import os
+import shutil
+
+import pytest
+
+from conftest import FIXTURES_DIR
+import validate_tree
+
+
+def tree_bytes(root):
+    """{ruta relativa: bytes} de todos los archivos bajo root"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'tree'
+    shutil.copytree(FIXTURES_DIR, root)
+    return str(root)
+
+
+def test_finds_fixture_projects(tree):
+    projects = validate_tree.find_projects(tree)
+    assert projects
+    assert all(os.path.isdir(project) for project in projects)
+
+
+@pytest.mark.parametrize('template_type', ['flask', 'flask-fullstack'])
+def test_tree_validation_does_not_modify_files(tree, template_type):
+    before = tree_bytes(FIXTURES_DIR)
+    projects = validate_tree.find_projects(tree)
+    results = list(validate_tree.run_validation(projects, template_type, validate_tree.CHECKS, workers=1))
+    assert [result['project'] for result in results] == projects
+    assert all('error' not in result for result in results)
+    assert tree_bytes(tree) == before
@@ -0,0 +1,158 @@
+"""
+Cache de validaciones (utils/validation_cache.py): claves, invalidacion por
+RULES_VERSION y resultados cacheados de early_validation_check y analyze_python.
+"""
+
+import ask_agent_batch_v2 as batch
+from utils import (
+    ValidationCache, analyze_python, configure_validation_cache, content_digest, find_forbidden_imports,
+    python_requirements,
+)
+from utils import python_analysis, validators
+
+FLASK_APP = (
+    "import os\n"
+    "from flask import Flask, render_template\n"
+    "from flask_cors import CORS\n"
+    "import yaml\n"
+    "app = Flask(__name__)\n"
+    "\n"
+    "@app.route('/')\n"
+    "def index():\n"
+    "    return render_template('index.html')\n"
+    "\n"
+    "@app.post('/api/items')\n"
+    "def create():\n"
+    "    return {}\n"
+    "\n"
+    "if __name__ == '__main__':\n"
+    "    app.run(debug=True)\n"
+)
+
+
+class Counter:
+    """compute() que cuenta sus llamadas"""
+
+    def __init__(self, result):
+        self.calls = 0
+        self.result = result
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+def test_key_depends_on_every_component(tmp_path):
+    cache = ValidationCache(str(tmp_path), 1 << 20, 'r1')
+    key = cache.make_key('early', 'abc', 'js', None)
+    variants = [
+        cache.make_key('file_language', 'abc', 'js', None),
+        cache.make_key('early', 'abd', 'js', None),
+        cache.make_key('early', 'abc', 'css', None),
+        cache.make_key('early', 'abc', 'js', [3, 12]),
+        ValidationCache(str(tmp_path), 1 << 20, 'r2').make_key('early', 'abc', 'js', None),
+    ]
+    assert key == cache.make_key('early', 'abc', 'js', None)
+    assert len(set(variants + [key])) == len(variants) + 1
+
+
+def test_validate_hits_cache_across_instances(tmp_path):
+    compute = Counter(['error', ('tupla', 1)])
+    first = ValidationCache(str(tmp_path), 1 << 20, 'r1')
+    assert first.validate('early', 'abc', compute, 'js') == compute.result
+    assert first.validate('early', 'abc', compute, 'js') == ['error', ['tupla', 1]]
+    # Otro proceso (otra instancia) con las mismas reglas reutiliza el resultado en disco
+    assert ValidationCache(str(tmp_path), 1 << 20, 'r1').validate('early', 'abc', compute, 'js')
+    assert compute.calls == 1
+    # Reglas nuevas: se vuelve a validar
+    ValidationCache(str(tmp_path), 1 << 20, 'r2').validate('early', 'abc', compute, 'js')
+    assert compute.calls == 2
+
+
+def test_no_digest_or_disabled_is_not_cached(tmp_path):
+    compute = Counter([])
+    cache = ValidationCache(str(tmp_path), 1 << 20, 'r1')
+    cache.validate('early', None, compute)
+    cache.validate('early', None, compute)
+    cache.enabled = False
+    cache.validate('early', 'abc', compute)
+    cache.validate('early', 'abc', compute)
+    assert compute.calls == 4
+
+
+def test_rules_version_tracks_rules_version_constant(monkeypatch):
+    current = validators.rules_version()
+    assert current == validators.rules_version()
+    monkeypatch.setattr(validators, 'RULES_VERSION', validators.RULES_VERSION + 1)
+    assert validators.rules_version() != current
+
+
+def test_rules_version_tracks_pattern_tables(monkeypatch):
+    current = validators.rules_version()
+    monkeypatch.setattr(validators, 'NODEJS_API_PATTERNS', validators.NODEJS_API_PATTERNS + ['Deno.'])
+    assert validators.rules_version() != current
+
+
+def test_process_cache_uses_rules_version(validation_cache):
+    assert validation_cache.rules == validators.rules_version()
+
+
+def test_early_check_is_cached(monkeypatch, tmp_path, validation_cache):
+    path = tmp_path / 'script.js'
+    path.write_text("const fs = require('fs');\n" + "document.getElementById('x');\n" * 5, encoding='utf-8')
+    calls = []
+    check = batch.check_content_structure
+    monkeypatch.setattr(batch, 'check_content_structure', lambda ext, content: calls.append(ext) or check(ext, content))
+
+    first = batch.early_validation_check(str(path))
+    second = batch.early_validation_check(str(path))
+    assert not first['valid'] and first == second
+    assert any('require()' in error for error in first['errors'])
+    assert calls == ['js']
+    assert validation_cache.stats()['hits'] >= 1
+
+    configure_validation_cache(enabled=False)
+    batch.early_validation_check(str(path))
+    assert calls == ['js', 'js']
+
+
+def test_analyze_python_flask_app():
+    analysis = analyze_python(FLASK_APP)
+    assert analysis['syntax_error'] is None
+    assert analysis['stdlib'] == ['os']
+    assert analysis['external'] == ['flask', 'flask_cors', 'yaml']
+    assert analysis['requirements'] == ['flask>=2.0.0', 'flask-cors', 'pyyaml']
+    assert analysis['flask_apps'] == ['app'] and analysis['runs_app']
+    assert [(route['path'], route['function']) for route in analysis['routes']] == [
+        ('/', 'index'), ('/api/items', 'create')]
+    assert batch.flask_warnings(analysis) == []
+
+
+def test_analyze_python_syntax_error():
+    analysis = analyze_python("from flask import Flask\ndef f(:\n    pass\n")
+    assert analysis['syntax_error']['line'] == 2
+    assert analysis['imports'] == []
+    assert any('sintaxis Python' in error for error in batch.check_content_structure('py', "def f(:\n"))
+
+
+def test_analyze_python_is_cached_by_content(monkeypatch):
+    content = FLASK_APP + "# variante\n"
+    calls = []
+    analyze = python_analysis._analyze
+    monkeypatch.setattr(python_analysis, '_analyze', lambda text: calls.append(1) or analyze(text))
+    monkeypatch.setattr(python_analysis, '_analyses', python_analysis.OrderedDict())
+
+    first = analyze_python(content)
+    # Sin la cache en memoria sigue saliendo de la cache en disco
+    python_analysis._analyses.clear()
+    assert analyze_python(content) == first
+    assert calls == [1]
+    assert content_digest(content) in python_analysis._analyses
+
+
+def test_local_modules_and_forbidden_imports(tmp_path):
+    (tmp_path / 'models.py').write_text('', encoding='utf-8')
+    analysis = analyze_python("import flask\nimport models\nfrom flask_sqlalchemy import SQLAlchemy\n")
+    assert python_requirements(analysis, str(tmp_path)) == ['flask>=2.0.0', 'flask-sqlalchemy']
+    assert find_forbidden_imports(analysis, ['flask-sqlalchemy', 'requests']) == [
+        ('flask-sqlalchemy', 'flask_sqlalchemy')]
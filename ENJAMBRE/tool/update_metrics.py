@@ -94,6 +94,26 @@ def analyze_execution_report(report):
 def update_metrics(metrics_file, execution_report_file):
     """Actualiza metrics.json con datos de execution_report.json."""
     
+    # Cargar execution report
+    execution_report = load_json(execution_report_file)
+    if not execution_report:
+        print(f"ERROR: No se pudo cargar {execution_report_file}")
+        return False
+    
+    return update_metrics_from_report(metrics_file, execution_report)
+
+def update_metrics_from_report(metrics_file, execution_report):
+    """
+    Actualiza metrics.json con un execution report ya cargado en memoria.
+
+    Args:
+        metrics_file: Ruta a metrics.json
+        execution_report: Dict con la estructura de execution_report.json
+
+    Returns:
+        bool: True si se guardaron las metricas
+    """
+    
     # Cargar métricas actuales
     metrics = load_json(metrics_file)
     if not metrics:
@@ -117,10 +137,8 @@ def update_metrics(metrics_file, execution_report_file):
             "execution_history": []
         }
     
-    # Cargar execution report
-    execution_report = load_json(execution_report_file)
     if not execution_report:
-        print(f"ERROR: No se pudo cargar {execution_report_file}")
+        print("ERROR: Execution report vacio")
         return False
     
     # Analizar reporte
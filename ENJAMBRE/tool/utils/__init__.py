@@ -8,21 +8,161 @@ from .file_ops import (
     save_json,
     save_output,
     ensure_dir_exists,
+    write_atomic,
 )
 
 from .validators import (
     WRONG_LANG_PATTERNS,
     EXPECTED_KEYWORDS,
     REQUIRED_KEYWORDS,
+    PYTHON_IN_JS_PATTERNS,
+    STREAM_ABORT_PATTERNS,
+    FILE_TYPES_BY_EXT,
+    NODEJS_API_PATTERNS,
+    COMMONJS_PATTERNS,
+    HTML_STRUCTURE_PATTERNS,
     check_file_content,
+    check_partial_output,
     validate_file_language,
     detect_wrong_language,
     validate_required_keywords,
+    get_scanner,
+    scan_content,
+    scan_file,
+    rules_version,
+)
+
+from .pattern_scan import (
+    PatternScanner,
+    ScanResult,
 )
 
 from .code_extract import (
     extract_code_from_markdown,
     MARKDOWN_CODE_PATTERN,
+    StreamingCodeExtractor,
+)
+
+from .streaming import StreamingOutput
+
+from .response_cache import (
+    ResponseCache,
+    get_response_cache,
+    configure_response_cache,
+    store_validated_output,
+)
+
+from .endpoints import (
+    EndpointPool,
+    agent_urls,
+    get_endpoint_pool,
+    endpoint_stats,
+)
+
+from .prefix_dispatch import (
+    group_by_prefix,
+    plan_prefix_dispatch,
+    prefill_from_response,
+    summarize_prefill,
+)
+
+from .token_budget import (
+    TokenBudget,
+    get_token_budget,
+    configure_token_budget,
+)
+
+from .health import (
+    probe_endpoint,
+    HealthCache,
+    check_agent_health,
+)
+
+from .hedging import (
+    Hedger,
+    leg_path,
+    promote_leg,
+    failed_leg,
+    discard_leg,
+    configure_hedging,
+    get_hedger,
+)
+
+from .timing import (
+    attempt_timeline,
+    attempt_phases,
+    record_validation,
+    summarize_phases,
+)
+
+from .metrics_exporter import (
+    BatchMetrics,
+    start_metrics_server,
+)
+
+from .profiling import (
+    Profiler,
+    configure_profiling,
+    get_profiler,
+    profile_stage,
+    profile_span,
+    profiled,
+    finish_profiling,
+)
+
+from .templates import (
+    PathIndex,
+    TemplateIndex,
+    TemplateRegistry,
+    get_template_registry,
+)
+
+from .cassette import (
+    Cassette,
+    configure_cassette,
+    get_cassette,
+)
+
+from .validation_cache import (
+    ValidationCache,
+    get_validation_cache,
+    configure_validation_cache,
+    content_digest,
+    file_digest,
+)
+
+from .snapshot import ProjectSnapshot
+
+from .structure import (
+    StructureReport,
+    CodeTokenizer,
+    HtmlTokenizer,
+    structure_tokenizer,
+    scan_structure
+)
+
+from .python_analysis import (
+    STDLIB_MODULES,
+    analyze_python,
+    analyze_python_file,
+    python_requirements,
+    local_modules,
+    find_forbidden_imports,
+    pip_name,
+    requirement_line
+)
+
+from .rule_plan import (
+    PATTERN_SETS,
+    CompiledRule,
+    RulePlan,
+    compile_rules
+)
+
+from .concurrency import (
+    AdaptiveConcurrency,
+    configure_concurrency,
+    get_concurrency,
 )
 
 __all__ = [
@@ -31,15 +171,121 @@ __all__ = [
     'save_json',
     'save_output',
     'ensure_dir_exists',
+    'write_atomic',
     # validators
     'WRONG_LANG_PATTERNS',
     'EXPECTED_KEYWORDS',
     'REQUIRED_KEYWORDS',
+    'PYTHON_IN_JS_PATTERNS',
+    'STREAM_ABORT_PATTERNS',
+    'FILE_TYPES_BY_EXT',
+    'NODEJS_API_PATTERNS',
+    'COMMONJS_PATTERNS',
+    'HTML_STRUCTURE_PATTERNS',
     'check_file_content',
+    'check_partial_output',
     'validate_file_language',
     'detect_wrong_language',
     'validate_required_keywords',
+    'get_scanner',
+    'scan_content',
+    'scan_file',
+    'rules_version',
+    # pattern_scan
+    'PatternScanner',
+    'ScanResult',
     # code_extract
     'extract_code_from_markdown',
     'MARKDOWN_CODE_PATTERN',
+    'StreamingCodeExtractor',
+    # streaming
+    'StreamingOutput',
+    # response_cache
+    'ResponseCache',
+    'get_response_cache',
+    'configure_response_cache',
+    'store_validated_output',
+    # endpoints
+    'EndpointPool',
+    'agent_urls',
+    'get_endpoint_pool',
+    'endpoint_stats',
+    # prefix_dispatch
+    'group_by_prefix',
+    'plan_prefix_dispatch',
+    'prefill_from_response',
+    'summarize_prefill',
+    # token_budget
+    'TokenBudget',
+    'get_token_budget',
+    'configure_token_budget',
+    # health
+    'probe_endpoint',
+    'HealthCache',
+    'check_agent_health',
+    # hedging
+    'Hedger',
+    'leg_path',
+    'promote_leg',
+    'failed_leg',
+    'discard_leg',
+    'configure_hedging',
+    'get_hedger',
+    # timing
+    'attempt_timeline',
+    'attempt_phases',
+    'record_validation',
+    'summarize_phases',
+    # metrics_exporter
+    'BatchMetrics',
+    'start_metrics_server',
+    # profiling
+    'Profiler',
+    'configure_profiling',
+    'get_profiler',
+    'profile_stage',
+    'profile_span',
+    'profiled',
+    'finish_profiling',
+    # templates
+    'PathIndex',
+    'TemplateIndex',
+    'TemplateRegistry',
+    'get_template_registry',
+    # cassette
+    'Cassette',
+    'configure_cassette',
+    'get_cassette',
+    # validation_cache
+    'ValidationCache',
+    'get_validation_cache',
+    'configure_validation_cache',
+    'content_digest',
+    'file_digest',
+    # snapshot
+    'ProjectSnapshot',
+    # structure
+    'StructureReport',
+    'CodeTokenizer',
+    'HtmlTokenizer',
+    'structure_tokenizer',
+    'scan_structure',
+    # python_analysis
+    'STDLIB_MODULES',
+    'analyze_python',
+    'analyze_python_file',
+    'python_requirements',
+    'local_modules',
+    'find_forbidden_imports',
+    'pip_name',
+    'requirement_line',
+    # rule_plan
+    'PATTERN_SETS',
+    'CompiledRule',
+    'RulePlan',
+    'compile_rules',
+    # concurrency
+    'AdaptiveConcurrency',
+    'configure_concurrency',
+    'get_concurrency',
 ]
@@ -0,0 +1,218 @@
+"""
+Cliente HTTP/1.1 minimo sobre asyncio (solo libreria estandar).
+Mantiene conexiones keep-alive por host para el motor async.
+"""
+
+import asyncio
+import json
+import ssl
+from urllib.parse import urlsplit
+
+
+class HTTPResponse:
+    """
+    Respuesta HTTP leida desde un stream asyncio.
+
+    El cuerpo se consume con read(), iter_chunks() o iter_lines().
+    Al terminar de leerlo, la conexion vuelve al pool del cliente.
+    """
+
+    def __init__(self, client, key, reader, writer, status, headers, method):
+        self.status = status
+        self.headers = headers
+        self._client = client
+        self._key = key
+        self._reader = reader
+        self._writer = writer
+        self._done = method == 'HEAD' or status in (204, 304) or 100 <= status < 200
+        self._keep_alive = headers.get('connection', '').lower() != 'close'
+        self._chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        length = headers.get('content-length')
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        if not self._chunked and self._remaining is None:
+            # Sin longitud: el cuerpo termina al cerrar la conexion
+            self._keep_alive = False
+        if self._remaining == 0:
+            self._done = True
+            self._release()
+
+    async def iter_chunks(self):
+        """Itera el cuerpo en fragmentos de bytes a medida que llegan"""
+        try:
+            while not self._done:
+                if self._chunked:
+                    size_line = await self._reader.readline()
+                    if not size_line:
+                        raise ConnectionError("Conexion cerrada en medio de la respuesta")
+                    size = int(size_line.split(b';')[0].strip(), 16)
+                    if size == 0:
+                        # Trailers opcionales hasta linea vacia
+                        while (await self._reader.readline()) not in (b'\r\n', b'\n', b''):
+                            pass
+                        self._done = True
+                        break
+                    data = await self._reader.readexactly(size)
+                    await self._reader.readexactly(2)
+                    yield data
+                elif self._remaining is not None:
+                    data = await self._reader.read(min(self._remaining, 65536))
+                    if not data:
+                        raise ConnectionError("Conexion cerrada en medio de la respuesta")
+                    self._remaining -= len(data)
+                    if self._remaining <= 0:
+                        self._done = True
+                    yield data
+                else:
+                    data = await self._reader.read(65536)
+                    if not data:
+                        self._done = True
+                        break
+                    yield data
+        except BaseException:
+            self.close()
+            raise
+        self._release()
+
+    async def iter_lines(self):
+        """Itera el cuerpo linea a linea (sin separador), util para SSE"""
+        buffer = b''
+        async for chunk in self.iter_chunks():
+            buffer += chunk
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                yield line.rstrip(b'\r')
+        if buffer:
+            yield buffer.rstrip(b'\r')
+
+    async def read(self):
+        """Lee el cuerpo completo"""
+        parts = [chunk async for chunk in self.iter_chunks()]
+        return b''.join(parts)
+
+    async def json(self):
+        return json.loads(await self.read())
+
+    def _release(self):
+        if self._writer is None:
+            return
+        if self._done and self._keep_alive:
+            self._client._put_idle(self._key, self._reader, self._writer)
+        else:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    def close(self):
+        """Cierra la conexion sin devolverla al pool (cancela la peticion)"""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        self._done = True
+
+
+class AsyncHTTPClient:
+    """
+    Cliente HTTP/1.1 con pool de conexiones keep-alive por (esquema, host, puerto).
+
+    Args:
+        max_idle_per_host: Conexiones ociosas maximas que se conservan por host
+    """
+
+    def __init__(self, max_idle_per_host=64):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self._ssl_context = None
+
+    def _put_idle(self, key, reader, writer):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_idle_per_host and not writer.is_closing():
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+
+        ssl_context = None
+        if scheme == 'https':
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        reader, writer = await asyncio.open_connection(host, port, ssl=ssl_context, limit=2 ** 20)
+        return reader, writer, False
+
+    async def request(self, method, url, headers=None, body=None):
+        """
+        Envia una peticion y devuelve la respuesta con el cuerpo sin leer.
+
+        Args:
+            method: Metodo HTTP ('GET', 'POST', ...)
+            url: URL absoluta http:// o https://
+            headers: Cabeceras adicionales
+            body: bytes del cuerpo (opcional)
+
+        Returns:
+            HTTPResponse
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: keep-alive"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        # Una conexion reutilizada puede haber sido cerrada por el servidor: reintentar una vez
+        for _ in range(2):
+            reader, writer, reused = await self._connect(key)
+            try:
+                writer.write(head + (body or b''))
+                await writer.drain()
+                status_line = await reader.readline()
+                if not status_line:
+                    raise ConnectionError("Conexion cerrada por el servidor")
+                status = int(status_line.split()[1])
+                response_headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    response_headers[name.strip().lower()] = value.strip()
+            except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            return HTTPResponse(self, key, reader, writer, status, response_headers, method)
+
+        raise ConnectionError(f"No se pudo conectar a {url}")
+
+    async def post_json(self, url, headers, payload):
+        """POST con cuerpo JSON. Devuelve HTTPResponse sin leer"""
+        return await self.request('POST', url, headers, json.dumps(payload).encode('utf-8'))
+
+    async def get(self, url, headers=None):
+        return await self.request('GET', url, headers)
+
+    def close(self):
+        """Cierra todas las conexiones ociosas"""
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
@@ -0,0 +1,269 @@
+"""
+Cassettes: grabacion y reproduccion de respuestas reales del modelo.
+
+En modo record cada generacion (peticion + respuesta final con sus
+continuaciones, TTFT y duracion) se agrega como una linea JSON al archivo.
+En modo replay las generaciones se sirven desde el archivo, sin servidor,
+con las latencias originales o escaladas: permite medir de punta a punta
+los cambios del pipeline (validacion, combinacion, reportes) con salidas
+realistas y de forma determinista.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .file_ops import ensure_dir_exists
+
+# Campos de la respuesta que se graban (mismas claves que completion_result, sin finished_at)
+RESULT_KEYS = ('success', 'content', 'error', 'usage', 'ttft', 'timeout', 'aborted', 'prefill',
+               'finish_reason', 'continuations', 'status')
+
+
+class Cassette:
+    """
+    Archivo de generaciones grabadas (JSONL, una generacion por linea).
+
+    Las lineas se agregan con una sola escritura O_APPEND, asi que varios
+    procesos (motor subprocess) pueden grabar en la misma cassette. Al
+    reproducir, las generaciones de una misma peticion se sirven en el orden
+    en que se enviaron (p.ej. un intento fallido y luego su reintento); si se
+    piden mas veces de las grabadas se repite la ultima.
+
+    Args:
+        path: Archivo de la cassette
+        mode: 'record' o 'replay'
+        latency_scale: Factor de las latencias grabadas al reproducir (0: sin esperas)
+        chunk_chars: Caracteres por evento al reproducir en streaming
+    """
+
+    def __init__(self, path, mode, latency_scale=1.0, chunk_chars=64):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Modo de cassette invalido: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.chunk_chars = chunk_chars
+        self.recorded = 0
+        self.served = 0
+        self.misses = 0
+        self.entries = {}
+        self._next = {}
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    @property
+    def size(self):
+        return sum(len(entries) for entries in self.entries.values())
+
+    @staticmethod
+    def make_key(payload):
+        """
+        Clave de una peticion: modelo y mensajes.
+
+        max_tokens queda fuera porque el presupuesto aprendido (TokenBudget)
+        cambia entre la grabacion y la reproduccion.
+        """
+        material = {'model': payload.get('model'), 'messages': payload.get('messages')}
+        raw = json.dumps(material, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            raise ValueError(f"No se pudo leer la cassette {self.path}: {e}")
+        for entry in sorted(lines, key=lambda e: e.get('started', 0)):
+            self.entries.setdefault(entry['key'], []).append(entry)
+
+    # --- Grabacion ---
+
+    def record(self, payload, result, started, stream=False):
+        """
+        Agrega una generacion a la cassette.
+
+        Args:
+            payload: Cuerpo de la peticion original (build_request)
+            result: Resultado de la generacion (completion_result)
+            started: Momento del envio (epoch)
+            stream: True si se genero en streaming
+        """
+        finished = result.get('finished_at') or time.time()
+        entry = {
+            'key': self.make_key(payload),
+            'request': {key: payload.get(key) for key in ('model', 'messages', 'max_tokens')},
+            'stream': stream,
+            'started': started,
+            'elapsed': round(max(0.0, finished - started), 4),
+            'result': {key: result.get(key) for key in RESULT_KEYS if key in result},
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            ensure_dir_exists(os.path.dirname(os.path.abspath(self.path)))
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self.recorded += 1
+
+    # --- Reproduccion ---
+
+    def reserve(self, payload):
+        """Reserva el turno de la siguiente generacion de una peticion (indice para replay)"""
+        key = self.make_key(payload)
+        with self._lock:
+            index = self._next.get(key, 0)
+            self._next[key] = index + 1
+        return index
+
+    def _take(self, payload, index=None):
+        """Generacion grabada para el turno `index` (None: el siguiente) y contadores"""
+        key = self.make_key(payload)
+        entries = self.entries.get(key)
+        if index is None:
+            index = self.reserve(payload)
+        with self._lock:
+            if not entries:
+                self.misses += 1
+                return key, index, None
+            self.served += 1
+        return key, index, entries[min(index, len(entries) - 1)]
+
+    def _plan(self, entry, stream):
+        """
+        Esperas y texto de una reproduccion.
+
+        Returns:
+            tuple: (espera hasta el primer token, [(pausa, texto)], ttft reproducido)
+        """
+        content = entry['result'].get('content') or ''
+        elapsed = entry['elapsed'] * self.latency_scale
+        ttft = entry['result'].get('ttft')
+        first = min(ttft * self.latency_scale, elapsed) if ttft is not None else elapsed
+        if not stream:
+            return elapsed, [], None
+        chunks = [content[i:i + self.chunk_chars] for i in range(0, len(content), self.chunk_chars)]
+        pause = (elapsed - first) / len(chunks) if chunks else 0.0
+        steps = [(0.0 if i == 0 else pause, chunk) for i, chunk in enumerate(chunks)]
+        return first, steps, round(first, 4) if chunks else None
+
+    def _miss(self, key):
+        return {
+            'success': False, 'content': '', 'error': f"Cassette: sin respuesta grabada para la peticion {key[:12]}",
+            'usage': None, 'ttft': None, 'timeout': False, 'aborted': False, 'prefill': None,
+            'finish_reason': None, 'continuations': 0, 'finished_at': time.time(),
+        }
+
+    @staticmethod
+    def _aborted(result, parts, error, ttft):
+        result.update(success=False, content=''.join(parts), error=f"Stream abortado: {error}", aborted=True,
+                      ttft=ttft, finished_at=time.time())
+        return result
+
+    def replay(self, payload, on_text=None, index=None):
+        """
+        Reproduce la generacion grabada de una peticion.
+
+        Args:
+            payload: Cuerpo de la peticion (build_request)
+            on_text: Callback de streaming (delta) -> None o mensaje de aborto
+            index: Turno reservado por el proceso padre (motor subprocess)
+
+        Returns:
+            dict: mismas claves que completion_result
+        """
+        key, _, entry = self._take(payload, index)
+        if entry is None:
+            return self._miss(key)
+        result = dict(entry['result'])
+        first, steps, ttft = self._plan(entry, on_text is not None)
+        time.sleep(first)
+        parts = []
+        for pause, chunk in steps:
+            time.sleep(pause)
+            parts.append(chunk)
+            abort_error = on_text(chunk)
+            if abort_error:
+                return self._aborted(result, parts, abort_error, ttft)
+        result.update(ttft=ttft, finished_at=time.time())
+        return result
+
+    async def replay_async(self, payload, on_text=None):
+        """Version async de replay (motor async)"""
+        key, _, entry = self._take(payload)
+        if entry is None:
+            return self._miss(key)
+        result = dict(entry['result'])
+        first, steps, ttft = self._plan(entry, on_text is not None)
+        await asyncio.sleep(first)
+        parts = []
+        for pause, chunk in steps:
+            await asyncio.sleep(pause)
+            parts.append(chunk)
+            abort_error = on_text(chunk)
+            if abort_error:
+                return self._aborted(result, parts, abort_error, ttft)
+        result.update(ttft=ttft, finished_at=time.time())
+        return result
+
+    def child_args(self, payload):
+        """Argumentos de ask_agent.py para que un proceso hijo use esta cassette"""
+        if self.replaying:
+            _, index, _ = self._take(payload)
+            return ['--replay', self.path, '--latency-scale', str(self.latency_scale), '--cassette-index', str(index)]
+        return ['--record', self.path]
+
+    def _count_lines(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return sum(1 for line in f if line.strip())
+        except OSError:
+            return 0
+
+    def stats(self):
+        """Contadores para execution_report.json"""
+        return {
+            'mode': self.mode,
+            'path': self.path,
+            'latency_scale': self.latency_scale if self.replaying else None,
+            'entries': self.size if self.replaying else self._count_lines(),
+            'served': self.served,
+            'misses': self.misses,
+            'recorded': self.recorded,
+        }
+
+
+_cassette = None
+
+
+def configure_cassette(path, mode, latency_scale=1.0, fresh=False):
+    """
+    Activa la grabacion o reproduccion del proceso (path None la desactiva).
+
+    Args:
+        fresh: En modo record, empezar la cassette de cero en lugar de agregar
+    """
+    global _cassette
+    if not path:
+        _cassette = None
+        return None
+    from config import CASSETTE
+    if fresh and mode == 'record' and os.path.exists(path):
+        os.remove(path)
+    _cassette = Cassette(path, mode, latency_scale, CASSETTE['chunk_chars'])
+    return _cassette
+
+
+def get_cassette():
+    """Devuelve la cassette del proceso (None si no se configuro)"""
+    return _cassette
@@ -53,3 +53,57 @@ def extract_all_code_blocks(content):
 
     matches = MARKDOWN_CODE_PATTERN.findall(content)
     return matches
+
+
+class StreamingCodeExtractor:
+    """
+    Extrae codigo de una respuesta LLM que llega por fragmentos.
+
+    Trabaja por lineas completas: si la primera linea abre un bloque ```lang,
+    emite solo el contenido del bloque; si no, emite el texto tal cual.
+    Si aparece un bloque despues de texto plano, marca `restarted` para que
+    el consumidor descarte lo emitido (el resultado final siempre se
+    normaliza con extract_code_from_markdown).
+    """
+
+    def __init__(self):
+        self.state = 'start'
+        self.restarted = False
+        self._pending = ''
+
+    def feed(self, chunk):
+        """
+        Procesa un fragmento y devuelve el codigo nuevo disponible.
+
+        Returns:
+            str: Codigo a anexar (puede ser vacio)
+        """
+        self.restarted = False
+        self._pending += chunk
+        emitted = []
+
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            is_fence = line.lstrip().startswith('```')
+
+            if self.state == 'start':
+                if is_fence:
+                    self.state = 'fenced'
+                elif line.strip():
+                    self.state = 'plain'
+                    emitted.append(line + '\n')
+            elif self.state == 'plain':
+                if is_fence:
+                    # Habia texto antes del bloque: descartarlo
+                    self.state = 'fenced'
+                    self.restarted = True
+                    emitted = []
+                else:
+                    emitted.append(line + '\n')
+            elif self.state == 'fenced':
+                if is_fence:
+                    self.state = 'closed'
+                else:
+                    emitted.append(line + '\n')
+
+        return ''.join(emitted)
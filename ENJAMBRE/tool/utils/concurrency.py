@@ -0,0 +1,183 @@
+"""
+Control adaptativo de concurrencia (AIMD) para las peticiones al servidor LLM.
+Sube la concurrencia mientras el throughput mejora y la reduce ante picos
+de latencia, errores o timeouts.
+"""
+
+import asyncio
+import threading
+import time
+
+
+class AdaptiveConcurrency:
+    """
+    Limitador de peticiones en vuelo con incremento aditivo y reduccion multiplicativa.
+
+    Cada ventana de `limit` respuestas se compara el throughput (tokens/s, o
+    peticiones/s si el servidor no reporta tokens) con la ventana anterior:
+    - mejora >= `improvement` -> limit + `increase`
+    - latencia media > `latency_spike` x latencia base -> limit * `decrease`
+    - timeout o error -> limit * `decrease` (como mucho una vez por ventana)
+
+    Args:
+        initial: Concurrencia inicial
+        minimum: Concurrencia minima
+        maximum: Concurrencia maxima
+        adaptive: False fija la concurrencia en `initial`
+    """
+
+    def __init__(self, initial, minimum=1, maximum=8, adaptive=True, increase=1, decrease=0.5,
+                 latency_spike=2.0, improvement=0.05):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.initial = min(max(initial, self.minimum), self.maximum)
+        self.limit = self.initial
+        self.adaptive = adaptive
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_spike = latency_spike
+        self.improvement = improvement
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.history = []
+
+        self._started = time.time()
+        self._window = []
+        self._window_start = self._started
+        self._prev_throughput = None
+        self._base_latency = None
+        self._backed_off = False
+        self._cond = threading.Condition()
+        self._async_cond = None
+        self._record_change('start')
+
+    # --- Compuerta para hilos ---
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self._enter()
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    # --- Compuerta para corrutinas ---
+
+    async def async_acquire(self):
+        if self._async_cond is None:
+            self._async_cond = asyncio.Condition()
+        async with self._async_cond:
+            await self._async_cond.wait_for(lambda: self.in_flight < self.limit)
+            self._enter()
+
+    async def async_release(self):
+        self.in_flight -= 1
+        async with self._async_cond:
+            self._async_cond.notify_all()
+
+    def _enter(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    # --- Control AIMD ---
+
+    def record(self, latency, tokens=0, ok=True, timeout=False):
+        """
+        Registra el resultado de una peticion y ajusta el limite si corresponde.
+
+        Args:
+            latency: Duracion de la peticion en segundos
+            tokens: Tokens generados (0 si no se conocen)
+            ok: False si la peticion fallo
+            timeout: True si la peticion agoto el tiempo
+        """
+        if not self.adaptive:
+            return
+
+        with self._cond:
+            if timeout or not ok:
+                if not self._backed_off:
+                    self._backed_off = True
+                    self._set_limit(self.limit * self.decrease, 'timeout' if timeout else 'error')
+                return
+
+            self._window.append((latency, tokens))
+            if len(self._window) < self.limit:
+                return
+
+            now = time.time()
+            elapsed = max(now - self._window_start, 1e-6)
+            total_tokens = sum(t for _, t in self._window)
+            throughput = (total_tokens if total_tokens else len(self._window)) / elapsed
+            avg_latency = sum(lat for lat, _ in self._window) / len(self._window)
+
+            if self._base_latency is None:
+                self._base_latency = avg_latency
+
+            if avg_latency > self._base_latency * self.latency_spike:
+                self._set_limit(self.limit * self.decrease, 'latency_spike', throughput, avg_latency)
+            elif self._prev_throughput is None or throughput >= self._prev_throughput * (1 + self.improvement):
+                self._set_limit(self.limit + self.increase, 'throughput_up', throughput, avg_latency)
+
+            self._base_latency = min(self._base_latency, avg_latency)
+            self._prev_throughput = throughput
+            self._window = []
+            self._window_start = now
+            self._backed_off = False
+
+    def record_attempt(self, result, latency):
+        """
+        Registra un intento de generacion (dict de generate_attempt).
+        result=None indica una excepcion durante la generacion (timeout).
+        """
+        if result is None:
+            self.record(latency, ok=False, timeout=True)
+            return
+        tokens = (result.get('usage') or {}).get('completion_tokens', 0)
+        # Un aborto de streaming es decision nuestra, no un fallo del servidor
+        self.record(latency, tokens, ok=result['success'] or result['aborted'], timeout=result['timeout'])
+
+    def _set_limit(self, value, reason, throughput=None, latency=None):
+        new_limit = min(max(int(value), self.minimum), self.maximum)
+        if new_limit != self.limit:
+            self.limit = new_limit
+            self._record_change(reason, throughput, latency)
+            self._cond.notify_all()
+
+    def _record_change(self, reason, throughput=None, latency=None):
+        entry = {'t': round(time.time() - self._started, 3), 'limit': self.limit, 'reason': reason}
+        if throughput is not None:
+            entry['throughput'] = round(throughput, 2)
+        if latency is not None:
+            entry['avg_latency'] = round(latency, 3)
+        self.history.append(entry)
+
+    def report(self):
+        """Resumen para execution_report.json"""
+        return {
+            'adaptive': self.adaptive,
+            'initial': self.initial,
+            'min': self.minimum,
+            'max': self.maximum,
+            'final': self.limit,
+            'peak_in_flight': self.peak_in_flight,
+            'history': self.history,
+        }
+
+
+_concurrency = None
+
+
+def configure_concurrency(initial, minimum=1, maximum=8, adaptive=True):
+    """Crea el limitador del proceso"""
+    global _concurrency
+    _concurrency = AdaptiveConcurrency(initial, minimum, maximum, adaptive)
+    return _concurrency
+
+
+def get_concurrency():
+    """Devuelve el limitador del proceso (None si no se configuro)"""
+    return _concurrency
@@ -0,0 +1,168 @@
+"""
+Balanceo de carga entre varias instancias del servidor LLM.
+Cada peticion va al endpoint con menos peticiones en vuelo; los endpoints
+que fallan seguido se expulsan y se vuelven a probar periodicamente.
+"""
+
+import threading
+import time
+
+
+class EndpointPool:
+    """
+    Pool de URLs de un agente con ruteo por menor numero de peticiones en vuelo.
+
+    Un endpoint con `max_failures` errores consecutivos se expulsa durante
+    `reprobe_interval` segundos. Pasado ese tiempo recibe una sola peticion
+    de prueba: si tiene exito vuelve al pool, si falla se expulsa de nuevo.
+    Si todos estan expulsados se usa el que lleva mas tiempo fuera.
+
+    Args:
+        urls: Lista de URLs de chat completions
+        max_failures: Errores consecutivos antes de expulsar
+        reprobe_interval: Segundos hasta volver a probar un endpoint expulsado
+    """
+
+    def __init__(self, urls, max_failures=3, reprobe_interval=15):
+        self.max_failures = max(1, max_failures)
+        self.reprobe_interval = reprobe_interval
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._endpoints = {
+            url: {
+                'in_flight': 0,
+                'requests': 0,
+                'errors': 0,
+                'consecutive_errors': 0,
+                'ejections': 0,
+                'ejected_until': 0.0,
+                'probing': False,
+            }
+            for url in dict.fromkeys(urls)
+        }
+
+    @property
+    def urls(self):
+        return list(self._endpoints)
+
+    def acquire(self, prefer=None):
+        """
+        Elige endpoint para una peticion y la cuenta como en vuelo.
+
+        Args:
+            prefer: URL a usar si esta sana (peticiones fijadas a un slot)
+
+        Returns:
+            str: URL elegida (liberar con release)
+        """
+        with self._lock:
+            now = time.time()
+            # Endpoint expulsado cuyo plazo vencio: mandarle una peticion de prueba
+            for url, state in self._endpoints.items():
+                if state['ejections'] and not state['probing'] and 0 < state['ejected_until'] <= now:
+                    state['probing'] = True
+                    return self._enter(url)
+
+            preferred = self._endpoints.get(prefer)
+            if preferred and preferred['ejected_until'] <= now and not preferred['probing']:
+                return self._enter(prefer)
+
+            # Empates en peticiones en vuelo: rotar el punto de partida (round-robin)
+            urls = list(self._endpoints)
+            self._turn = (self._turn + 1) % len(urls)
+            healthy = [url for url in urls[self._turn:] + urls[:self._turn]
+                       if self._endpoints[url]['ejected_until'] <= now and not self._endpoints[url]['probing']]
+            if healthy:
+                return self._enter(min(healthy, key=lambda u: self._endpoints[u]['in_flight']))
+
+            url = min(self._endpoints, key=lambda u: self._endpoints[u]['ejected_until'])
+            return self._enter(url)
+
+    def _enter(self, url):
+        state = self._endpoints[url]
+        state['in_flight'] += 1
+        state['requests'] += 1
+        return url
+
+    def release(self, url, ok=True):
+        """
+        Registra el fin de una peticion.
+
+        Args:
+            url: URL devuelta por acquire
+            ok: False si el endpoint fallo (error de conexion, 5xx, timeout)
+        """
+        with self._lock:
+            state = self._endpoints.get(url)
+            if state is None:
+                return
+            state['in_flight'] -= 1
+            was_probing = state['probing']
+            state['probing'] = False
+
+            if ok:
+                state['consecutive_errors'] = 0
+                state['ejected_until'] = 0.0
+                return
+
+            state['errors'] += 1
+            state['consecutive_errors'] += 1
+            if was_probing or state['consecutive_errors'] >= self.max_failures:
+                state['ejections'] += 1
+                state['ejected_until'] = time.time() + self.reprobe_interval
+
+    def mark_unhealthy(self, url):
+        """Expulsa un endpoint (p.ej. health check fallido); se reprueba como los demas"""
+        with self._lock:
+            state = self._endpoints.get(url)
+            if state is not None:
+                state['ejections'] += 1
+                state['ejected_until'] = time.time() + self.reprobe_interval
+
+    def stats(self):
+        """Estado por endpoint para execution_report.json"""
+        now = time.time()
+        with self._lock:
+            return {
+                url: {
+                    'requests': state['requests'],
+                    'errors': state['errors'],
+                    'ejections': state['ejections'],
+                    'healthy': state['ejected_until'] <= now,
+                }
+                for url, state in self._endpoints.items()
+            }
+
+
+def agent_urls(agent):
+    """URLs de un agente de AGENTS ('urls' si existe, si no 'url')"""
+    return list(agent.get('urls') or [agent['url']])
+
+
+_endpoint_pools = {}
+_endpoint_pools_lock = threading.Lock()
+
+
+def get_endpoint_pool(agent_name):
+    """
+    Devuelve el pool de endpoints de un agente (creandolo con AGENTS y ENDPOINTS de config).
+
+    Returns:
+        EndpointPool: None si el agente no existe
+    """
+    with _endpoint_pools_lock:
+        if agent_name not in _endpoint_pools:
+            from config import AGENTS, ENDPOINTS
+            agent = AGENTS.get(agent_name)
+            if not agent:
+                return None
+            _endpoint_pools[agent_name] = EndpointPool(
+                agent_urls(agent), ENDPOINTS['max_failures'], ENDPOINTS['reprobe_interval'])
+        return _endpoint_pools[agent_name]
+
+
+def endpoint_stats():
+    """Estado de todos los pools creados en el proceso"""
+    with _endpoint_pools_lock:
+        pools = dict(_endpoint_pools)
+    return {name: pool.stats() for name, pool in pools.items()}
@@ -5,6 +5,7 @@ Centraliza load/save JSON y manejo de directorios.
 
 import json
 import os
+import threading
 
 
 def load_json(filepath):
@@ -31,6 +32,33 @@ def load_json(filepath):
         return None
 
 
+def write_atomic(filepath, text):
+    """
+    Escribe un archivo de texto de forma atomica (temporal + rename).
+
+    Quien lea la ruta ve el contenido anterior o el completo, nunca uno a
+    medio escribir; el retorno de esta funcion es la senal de que el
+    archivo esta listo.
+
+    Args:
+        filepath: Ruta destino
+        text: Contenido
+
+    Raises:
+        OSError: Si no se pudo escribir (el temporal se elimina)
+    """
+    dir_path, name = os.path.split(filepath)
+    tmp_path = os.path.join(dir_path, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, filepath)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 def save_json(filepath, data, indent=2):
     """
     Guarda datos en archivo JSON con formato legible.
@@ -48,8 +76,7 @@ def save_json(filepath, data, indent=2):
         if dir_path:
             ensure_dir_exists(dir_path)
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=indent, ensure_ascii=False)
+        write_atomic(filepath, json.dumps(data, indent=indent, ensure_ascii=False))
         return True
     except Exception as e:
         print(f"Error guardando {filepath}: {e}")
@@ -80,7 +107,8 @@ def ensure_dir_exists(dir_path):
 def save_output(content, output_path):
     """
     Guarda contenido extraido de respuesta LLM en archivo.
-    Extrae codigo de bloques markdown automaticamente.
+    Extrae codigo de bloques markdown automaticamente. La escritura es
+    atomica: al retornar la ruta el archivo ya esta completo en disco.
 
     Args:
         content: Contenido a guardar (puede contener markdown)
@@ -102,8 +130,7 @@ def save_output(content, output_path):
     code_content = extract_code_from_markdown(content)
 
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(code_content)
+        write_atomic(output_path, code_content)
         return output_path
     except Exception as e:
         print(f"Error guardando {output_path}: {e}")
@@ -0,0 +1,166 @@
+"""
+Health checks livianos de los servidores LLM.
+Usa /health, /v1/models y el estado de slots en lugar de una generacion,
+y guarda el resultado en un archivo con TTL para reutilizarlo entre
+invocaciones seguidas (generate_project.py, modular_generator.py).
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .file_ops import load_json, ensure_dir_exists, write_atomic
+from .endpoints import agent_urls
+
+
+def base_url(url):
+    """URL base del servidor a partir de la URL de chat completions"""
+    return url.split('/v1/')[0].rstrip('/')
+
+
+def _get_json(session, url, headers, timeout):
+    """GET que devuelve (status, json|None); status 0 si no hubo respuesta"""
+    try:
+        response = session.get(url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        return 0, None
+    try:
+        return response.status_code, response.json()
+    except ValueError:
+        return response.status_code, None
+
+
+def probe_endpoint(url, session=None, timeout=5, headers=None):
+    """
+    Consulta el estado de un servidor sin generar tokens.
+
+    - /health (llama.cpp): 200 listo, 503 cargando el modelo
+    - /v1/models: respaldo para servidores sin /health (APIs remotas)
+    - /slots, /props o los campos slots_* de /health: slots totales y libres
+
+    Args:
+        url: URL de chat completions del endpoint
+        session: Sesion requests (opcional)
+        timeout: Timeout por consulta
+        headers: Cabeceras (Authorization para APIs remotas)
+
+    Returns:
+        dict: {'healthy', 'status', 'latency', 'slots_total', 'slots_idle', 'checked_at'}
+    """
+    session = session or requests
+    base = base_url(url)
+    started = time.time()
+
+    status_code, health = _get_json(session, f"{base}/health", headers, timeout)
+    if status_code == 200:
+        status = 'ok'
+    elif status_code == 503:
+        status = 'loading'
+    elif status_code == 0:
+        status = 'unreachable'
+    else:
+        models_code, _ = _get_json(session, f"{base}/v1/models", headers, timeout)
+        status = 'ok' if models_code == 200 else f"http_{models_code or status_code}"
+
+    entry = {
+        'healthy': status == 'ok',
+        'status': status,
+        'latency': round(time.time() - started, 3),
+        'slots_total': None,
+        'slots_idle': None,
+        'checked_at': time.time(),
+    }
+    if not entry['healthy'] or status_code != 200:
+        return entry
+
+    slots_code, slots = _get_json(session, f"{base}/slots", headers, timeout)
+    if slots_code == 200 and isinstance(slots, list) and slots:
+        entry['slots_total'] = len(slots)
+        entry['slots_idle'] = sum(1 for slot in slots if not slot.get('is_processing') and slot.get('state', 0) == 0)
+    elif isinstance(health, dict) and 'slots_idle' in health:
+        entry['slots_idle'] = health['slots_idle']
+        entry['slots_total'] = health['slots_idle'] + health.get('slots_processing', 0)
+    else:
+        props_code, props = _get_json(session, f"{base}/props", headers, timeout)
+        if props_code == 200 and isinstance(props, dict) and props.get('total_slots'):
+            entry['slots_total'] = props['total_slots']
+    return entry
+
+
+class HealthCache:
+    """
+    Resultados de health check en un archivo JSON con TTL.
+
+    Args:
+        path: Archivo de cache
+        ttl: Segundos de validez de un endpoint sano
+        ttl_failure: Segundos de validez de un endpoint caido (corto para detectar el arranque)
+    """
+
+    def __init__(self, path, ttl=10, ttl_failure=2):
+        self.path = path
+        self.ttl = ttl
+        self.ttl_failure = ttl_failure
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Entrada vigente de un endpoint o None"""
+        entry = (load_json(self.path) or {}).get(url)
+        if not entry:
+            return None
+        ttl = self.ttl if entry.get('healthy') else self.ttl_failure
+        return entry if time.time() - entry.get('checked_at', 0) <= ttl else None
+
+    def put_many(self, entries):
+        """Guarda varias entradas (escritura atomica)"""
+        with self._lock:
+            data = load_json(self.path) or {}
+            data.update(entries)
+            try:
+                ensure_dir_exists(os.path.dirname(self.path))
+                write_atomic(self.path, json.dumps(data, indent=2))
+            except OSError:
+                pass
+
+
+def check_agent_health(agent_name, force=False, session=None):
+    """
+    Estado de todos los endpoints de un agente (usa la cache si esta vigente).
+
+    Args:
+        agent_name: Nombre del agente en AGENTS
+        force: Ignorar la cache y volver a consultar
+        session: Sesion requests (opcional)
+
+    Returns:
+        dict: {url: entrada de probe_endpoint + 'cached'}; vacio si el agente no existe
+    """
+    from config import AGENTS, HEALTH, TIMEOUTS
+    agent = AGENTS.get(agent_name)
+    if not agent:
+        return {}
+
+    cache = HealthCache(HEALTH['cache_file'], HEALTH['ttl'], HEALTH['ttl_failure'])
+    headers = {"Authorization": f"Bearer {agent['key']}"}
+    results = {}
+    pending = []
+    for url in agent_urls(agent):
+        entry = None if force else cache.get(url)
+        if entry:
+            results[url] = dict(entry, cached=True)
+        else:
+            pending.append(url)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            probes = dict(zip(pending, executor.map(
+                lambda url: probe_endpoint(url, session, TIMEOUTS['health_check'], headers), pending)))
+        cache.put_many(probes)
+        for url, entry in probes.items():
+            results[url] = dict(entry, cached=False)
+
+    return results
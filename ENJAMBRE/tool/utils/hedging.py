@@ -0,0 +1,155 @@
+"""
+Hedging de peticiones: si una generacion supera la latencia habitual de su
+tipo de archivo, se lanza un duplicado a otro endpoint o agente y se usa
+la primera respuesta que pase la validacion temprana.
+"""
+
+import os
+import threading
+from collections import deque
+
+from .token_budget import percentile
+
+
+def leg_path(output, leg):
+    """Ruta temporal de una rama del hedge (conserva la extension para validar)"""
+    dir_path, name = os.path.split(output)
+    return os.path.join(dir_path, f".leg{leg}.{name}")
+
+
+def promote_leg(path, output):
+    """Publica el archivo de la rama ganadora en la ruta final (rename atomico)"""
+    os.replace(path, output)
+    return output
+
+
+def failed_leg(error, timeout=False):
+    """Resultado de generate_attempt para una rama que termino con una excepcion"""
+    return {'success': False, 'output': '', 'error': error, 'ttft': None, 'content': None,
+            'usage': None, 'timeout': timeout, 'aborted': False, 'prefill': None, 'continuations': 0,
+            'finished_at': None, 'saved_at': None}
+
+
+def discard_leg(path):
+    """Elimina el archivo de una rama descartada (y su parcial de streaming)"""
+    for leftover in (path, f"{path}.part"):
+        try:
+            os.remove(leftover)
+        except OSError:
+            pass
+
+
+class Hedger:
+    """
+    Decide cuando duplicar una peticion y acumula estadisticas.
+
+    El umbral por tipo de archivo es el percentil `pct` de las latencias
+    observadas en la ejecucion (al menos `min_delay` segundos) y solo se
+    activa con `min_samples` muestras del tipo.
+
+    Args:
+        pct: Percentil de latencia que dispara el duplicado
+        min_samples: Muestras minimas por tipo de archivo
+        min_delay: Umbral minimo en segundos
+        target_agent: Agente del duplicado (None = mismo agente, otro endpoint)
+        window: Latencias recientes que se conservan por tipo
+    """
+
+    def __init__(self, pct=95, min_samples=10, min_delay=2.0, target_agent=None, window=200):
+        self.pct = pct
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.target_agent = target_agent
+        self.window = window
+        self.latencies = {}
+        self.fired = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.no_winner = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _type(output):
+        return os.path.splitext(output or '')[1].lstrip('.').lower()
+
+    def record(self, output, latency):
+        """Registra la latencia de una generacion exitosa"""
+        with self._lock:
+            self.latencies.setdefault(self._type(output), deque(maxlen=self.window)).append(latency)
+
+    def threshold(self, output):
+        """Segundos tras los que se duplica la peticion (None = no duplicar aun)"""
+        if not output:
+            return None
+        with self._lock:
+            values = list(self.latencies.get(self._type(output), ()))
+        if len(values) < self.min_samples:
+            return None
+        return max(percentile(values, self.pct), self.min_delay)
+
+    def expected_saving(self, output, elapsed):
+        """
+        Estimacion del tiempo ahorrado cuando gana el duplicado en `elapsed` segundos.
+
+        Se toma la media de las latencias observadas mayores que `elapsed`
+        como lo que habria tardado la peticion original; sin muestras en la
+        cola no se cuenta ahorro (estimacion conservadora).
+        """
+        with self._lock:
+            tail = [v for v in self.latencies.get(self._type(output), ()) if v > elapsed]
+        if not tail:
+            return 0.0
+        return sum(tail) / len(tail) - elapsed
+
+    def record_fired(self):
+        with self._lock:
+            self.fired += 1
+
+    def record_outcome(self, winner, saved=0.0):
+        """winner: 'hedge', 'primary' o None (ninguna rama valida)"""
+        with self._lock:
+            if winner == 'hedge':
+                self.hedge_wins += 1
+                self.saved_seconds += saved
+            elif winner == 'primary':
+                self.primary_wins += 1
+            else:
+                self.no_winner += 1
+
+    def stats(self):
+        """Resumen para execution_report.json"""
+        with self._lock:
+            thresholds = {}
+            for file_type, values in self.latencies.items():
+                if len(values) >= self.min_samples:
+                    thresholds[file_type] = round(max(percentile(list(values), self.pct), self.min_delay), 3)
+            return {
+                'target_agent': self.target_agent,
+                'fired': self.fired,
+                'hedge_wins': self.hedge_wins,
+                'primary_wins': self.primary_wins,
+                'no_winner': self.no_winner,
+                'saved_seconds_estimate': round(self.saved_seconds, 3),
+                'thresholds': thresholds,
+            }
+
+
+_hedger = None
+
+
+def configure_hedging(enabled=True, target_agent=None):
+    """Crea el hedger del proceso con HEDGING de config (None si esta desactivado)"""
+    global _hedger
+    if not enabled:
+        _hedger = None
+        return None
+    from config import HEDGING
+    _hedger = Hedger(HEDGING['percentile'], HEDGING['min_samples'], HEDGING['min_delay'],
+                     target_agent or HEDGING['target_agent'])
+    return _hedger
+
+
+def get_hedger():
+    """Devuelve el hedger del proceso (None si no se configuro)"""
+    return _hedger
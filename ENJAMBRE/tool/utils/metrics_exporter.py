@@ -0,0 +1,184 @@
+"""
+Exportador de metricas en vivo (formato Prometheus/OpenMetrics).
+Sirve /metrics desde un hilo del propio batch para que un Prometheus local
+pueda scrapear el avance mientras corre, sin servicios externos.
+"""
+
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .concurrency import get_concurrency
+from .response_cache import get_response_cache
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Histograma acumulativo por etiqueta (buckets fijos)"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.series = {}
+
+    def observe(self, label, value):
+        counts, total = self.series.get(label, ([0] * len(self.buckets), [0, 0.0]))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        total[0] += 1
+        total[1] += value
+        self.series[label] = (counts, total)
+
+    def lines(self, name, label_name):
+        for label, (counts, (count, total)) in sorted(self.series.items()):
+            for bound, value in zip(self.buckets, counts):
+                yield f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {value}'
+            yield f'{name}_bucket{{{label_name}="{label}",le="+Inf"}} {count}'
+            yield f'{name}_count{{{label_name}="{label}"}} {count}'
+            yield f'{name}_sum{{{label_name}="{label}"}} {round(total, 6)}'
+
+
+class BatchMetrics:
+    """
+    Metricas de un batch en curso.
+
+    Los contadores se actualizan con observe_task al terminar cada tarea; las
+    peticiones en vuelo y la cache se leen del limitador y de la cache de
+    respuestas del proceso en cada scrape.
+
+    Args:
+        total_tasks: Tareas del batch
+        buckets: Limites (segundos) de los histogramas de latencia
+        prefix: Prefijo de los nombres de metrica
+    """
+
+    def __init__(self, total_tasks=0, buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300), prefix='enjambre'):
+        self.prefix = prefix
+        self.total_tasks = total_tasks
+        self.started = time.time()
+        self.tasks = {'ok': 0, 'failed': 0}
+        self.attempts = 0
+        self.retries = 0
+        self.completion_tokens = 0
+        self.prompt_tokens = 0
+        self.attempt_latency = Histogram(buckets)
+        self.task_latency = Histogram(buckets)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _type(path):
+        return os.path.splitext(path or '')[1].lstrip('.').lower() or 'sin_archivo'
+
+    def observe_task(self, task, result):
+        """Registra una tarea terminada (resultado de execute_task)"""
+        file_type = self._type(task.get('output'))
+        attempts = result.get('attempts') or []
+        with self._lock:
+            self.tasks['ok' if result.get('success') else 'failed'] += 1
+            self.attempts += len(attempts)
+            self.retries += max(0, len(attempts) - 1)
+            for attempt in attempts:
+                self.completion_tokens += attempt.get('completion_tokens') or 0
+                self.prompt_tokens += attempt.get('prompt_tokens') or 0
+                generation = (attempt.get('phases') or {}).get('generation')
+                if generation is not None and not attempt.get('cached'):
+                    self.attempt_latency.observe(file_type, generation)
+            timelines = [a['timeline'] for a in attempts if a.get('timeline')]
+            if timelines:
+                end = timelines[-1]['validated'] or timelines[-1]['ended']
+                if timelines[0]['queued'] is not None and end is not None:
+                    self.task_latency.observe(file_type, end - timelines[0]['queued'])
+
+    def render(self, openmetrics=True):
+        """
+        Texto de exposicion.
+
+        Args:
+            openmetrics: True = OpenMetrics 1.0 (con # EOF), False = formato de texto Prometheus 0.0.4
+        """
+        p = self.prefix
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            # OpenMetrics declara los contadores sin el sufijo _total
+            family = name[:-len('_total')] if openmetrics and kind == 'counter' else name
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            lines.extend(samples)
+
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-6)
+            done = self.tasks['ok'] + self.tasks['failed']
+            metric(f'{p}_tasks_total', 'counter', 'Tareas terminadas por estado',
+                   [f'{p}_tasks_total{{status="{status}"}} {count}' for status, count in self.tasks.items()])
+            metric(f'{p}_tasks_pending', 'gauge', 'Tareas del batch sin terminar',
+                   [f'{p}_tasks_pending {max(0, self.total_tasks - done)}'])
+            metric(f'{p}_attempts_total', 'counter', 'Intentos de generacion',
+                   [f'{p}_attempts_total {self.attempts}'])
+            metric(f'{p}_retries_total', 'counter', 'Intentos repetidos (despues del primero)',
+                   [f'{p}_retries_total {self.retries}'])
+            metric(f'{p}_completion_tokens_total', 'counter', 'Tokens generados',
+                   [f'{p}_completion_tokens_total {self.completion_tokens}'])
+            metric(f'{p}_prompt_tokens_total', 'counter', 'Tokens de prompt enviados',
+                   [f'{p}_prompt_tokens_total {self.prompt_tokens}'])
+            metric(f'{p}_tokens_per_second', 'gauge', 'Tokens generados por segundo desde el inicio del batch',
+                   [f'{p}_tokens_per_second {round(self.completion_tokens / elapsed, 3)}'])
+            metric(f'{p}_generation_seconds', 'histogram', 'Latencia de generacion por intento y tipo de archivo',
+                   list(self.attempt_latency.lines(f'{p}_generation_seconds', 'file_type')))
+            metric(f'{p}_task_seconds', 'histogram', 'Duracion de tarea (cola + intentos) por tipo de archivo',
+                   list(self.task_latency.lines(f'{p}_task_seconds', 'file_type')))
+
+        limiter = get_concurrency()
+        if limiter:
+            metric(f'{p}_requests_in_flight', 'gauge', 'Peticiones al servidor LLM en vuelo',
+                   [f'{p}_requests_in_flight {limiter.in_flight}'])
+            metric(f'{p}_concurrency_limit', 'gauge', 'Limite actual del control AIMD',
+                   [f'{p}_concurrency_limit {limiter.limit}'])
+
+        cache = get_response_cache()
+        if cache and cache.enabled:
+            stats = cache.stats()
+            metric(f'{p}_cache_hits_total', 'counter', 'Aciertos de la cache de respuestas',
+                   [f'{p}_cache_hits_total {stats["hits"]}'])
+            metric(f'{p}_cache_misses_total', 'counter', 'Fallos de la cache de respuestas',
+                   [f'{p}_cache_misses_total {stats["misses"]}'])
+            metric(f'{p}_cache_hit_ratio', 'gauge', 'Tasa de aciertos de la cache de respuestas',
+                   [f'{p}_cache_hit_ratio {stats["hit_rate"]}'])
+
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+def start_metrics_server(metrics, port, host='127.0.0.1'):
+    """
+    Sirve las metricas en http://host:port/metrics desde un hilo daemon.
+
+    Negocia el formato con la cabecera Accept (OpenMetrics si el cliente lo pide).
+
+    Returns:
+        ThreadingHTTPServer: llamar shutdown() al terminar
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+            body = metrics.render(openmetrics).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+    return server
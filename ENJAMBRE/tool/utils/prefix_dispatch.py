@@ -0,0 +1,134 @@
+"""
+Despacho por prefijo para aprovechar la cache de prompts (KV) de llama.cpp.
+Agrupa tareas cuyos prompts comparten prefijo y fija cada grupo a un slot
+del servidor (id_slot + cache_prompt) para reutilizar el prefill.
+"""
+
+import os
+
+
+def common_prefix_len(a, b):
+    """Longitud del prefijo comun de dos cadenas"""
+    return len(os.path.commonprefix([a, b]))
+
+
+def group_by_prefix(prompts, min_prefix=32):
+    """
+    Agrupa prompts que comparten al menos `min_prefix` caracteres iniciales.
+
+    Los prompts se ordenan lexicograficamente, asi los que comparten prefijo
+    quedan contiguos y basta comparar cada uno con el prefijo del grupo actual.
+
+    Args:
+        prompts: Lista de prompts
+        min_prefix: Caracteres comunes minimos para agrupar
+
+    Returns:
+        list: [{'prefix': str, 'indices': [int]}] (cada indice en un solo grupo)
+    """
+    groups = []
+    for index in sorted(range(len(prompts)), key=lambda i: prompts[i]):
+        prompt = prompts[index]
+        if groups:
+            shared = common_prefix_len(groups[-1]['prefix'], prompt)
+            if shared >= min_prefix:
+                groups[-1]['prefix'] = prompt[:shared]
+                groups[-1]['indices'].append(index)
+                continue
+        groups.append({'prefix': prompt, 'indices': [index]})
+    return groups
+
+
+def plan_prefix_dispatch(tasks, prompts, slots, min_prefix=32):
+    """
+    Asigna cada grupo de prefijo a un slot y ordena las tareas para el despacho.
+
+    Los grupos se reparten de mayor a menor sobre el slot menos cargado y las
+    tareas se intercalan entre slots para que todos trabajen desde el inicio.
+    Un grupo con mas de ceil(tareas / slots) tareas se divide entre varios
+    slots (cada uno con su precalentamiento): llama.cpp encola las peticiones
+    fijadas a un mismo slot, asi que un solo grupo grande (p.ej. todas las
+    tareas JS) serializaria el batch. Cada tarea recibe task['pin'] = {'url', 'slot'}.
+
+    Args:
+        tasks: Lista de tareas (se modifican in situ)
+        prompts: Prompt efectivo de cada tarea (mismo orden que tasks)
+        slots: Lista de (url, id_slot) disponibles
+        min_prefix: Caracteres comunes minimos para agrupar
+
+    Returns:
+        tuple: (tareas en orden de despacho, grupos [{'prefix', 'pin', 'tasks'}])
+    """
+    if not tasks or not slots:
+        return tasks, []
+
+    capacity = -(-len(tasks) // len(slots))
+    chunks = []
+    for group in group_by_prefix(prompts, min_prefix):
+        indices = group['indices']
+        chunks.extend({'prefix': group['prefix'], 'indices': indices[start:start + capacity]}
+                      for start in range(0, len(indices), capacity))
+
+    queues = [[] for _ in slots]
+    plan = []
+    for chunk in sorted(chunks, key=lambda c: len(c['indices']), reverse=True):
+        target = min(range(len(slots)), key=lambda s: len(queues[s]))
+        url, slot = slots[target]
+        pin = {'url': url, 'slot': slot}
+        for index in chunk['indices']:
+            tasks[index]['pin'] = pin
+            queues[target].append(tasks[index])
+        plan.append({'prefix': chunk['prefix'], 'pin': pin, 'tasks': len(chunk['indices'])})
+
+    ordered = []
+    for position in range(max(len(queue) for queue in queues)):
+        for queue in queues:
+            if position < len(queue):
+                ordered.append(queue[position])
+    return ordered, plan
+
+
+def prefill_from_response(body):
+    """
+    Extrae tokens de prompt evaluados vs. reutilizados de la cache.
+
+    llama.cpp informa timings.prompt_n (evaluados) y timings.cache_n (cacheados);
+    los servidores compatibles con OpenAI usan usage.prompt_tokens_details.cached_tokens.
+
+    Returns:
+        dict: {'evaluated', 'cached'} o None si la respuesta no lo informa
+    """
+    timings = (body or {}).get('timings') or {}
+    if 'prompt_n' in timings:
+        return {'evaluated': timings['prompt_n'], 'cached': timings.get('cache_n', 0)}
+
+    usage = (body or {}).get('usage') or {}
+    details = usage.get('prompt_tokens_details') or {}
+    if 'prompt_tokens' in usage and 'cached_tokens' in details:
+        cached = details['cached_tokens']
+        return {'evaluated': usage['prompt_tokens'] - cached, 'cached': cached}
+    return None
+
+
+def summarize_prefill(results):
+    """
+    Suma el prefill de todos los intentos de un batch.
+
+    Returns:
+        dict: {'prompt_tokens_evaluated', 'prompt_tokens_cached', 'cached_ratio', 'requests'}
+    """
+    evaluated = cached = requests = 0
+    for result in results:
+        for attempt in result.get('attempts', []):
+            prefill = attempt.get('prefill')
+            if prefill:
+                evaluated += prefill['evaluated']
+                cached += prefill['cached']
+                requests += 1
+    total = evaluated + cached
+    return {
+        'prompt_tokens_evaluated': evaluated,
+        'prompt_tokens_cached': cached,
+        'cached_ratio': round(cached / total, 3) if total else 0,
+        'requests': requests,
+    }
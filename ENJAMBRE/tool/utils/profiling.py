@@ -0,0 +1,194 @@
+"""
+Perfilado del lado Python del pipeline (--profile DIR).
+
+- Etapas (profile_stage): tramos secuenciales del proceso principal. Cada
+  etapa tiene su propio cProfile (<n>_<etapa>.pstats + resumen .txt) y su
+  top de asignaciones de tracemalloc (<n>_<etapa>.tracemalloc.txt).
+  Desde Python 3.12 cProfile registra todos los hilos del proceso, asi que
+  la etapa de generacion incluye el trabajo de los workers.
+- Tramos (profile_span): fases finas en cualquier hilo (template, prompt,
+  generacion, guardado, validacion) que solo van a la traza.
+- trace.json: formato trace_event de Chrome con un carril por hilo
+  (chrome://tracing, Perfetto).
+"""
+
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+from .file_ops import ensure_dir_exists, write_atomic
+
+
+class Profiler:
+    """
+    Perfilador de un proceso del pipeline.
+
+    Args:
+        out_dir: Directorio de salida
+        process_name: Nombre del proceso en la traza
+        top: Lineas de los resumenes de pstats y tracemalloc
+        nframes: Frames que guarda tracemalloc por asignacion
+    """
+
+    def __init__(self, out_dir, process_name, top=25, nframes=1):
+        self.out_dir = out_dir
+        self.process_name = process_name
+        self.top = top
+        self.pid = os.getpid()
+        self.events = []
+        self.threads = {}
+        self.stages = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._stage = None
+        self._count = 0
+
+        ensure_dir_exists(out_dir)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+        self._filters = [tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, pstats)]
+        self._filters.append(tracemalloc.Filter(False, __file__))
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def _now(self):
+        """Microsegundos desde el inicio (unidad de trace_event)"""
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _tid(self):
+        thread = threading.current_thread()
+        with self._lock:
+            self.threads.setdefault(thread.ident, thread.name)
+        return thread.ident
+
+    def _event(self, **event):
+        event.setdefault('pid', self.pid)
+        with self._lock:
+            self.events.append(event)
+
+    # --- Tramos (traza) ---
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        """Tramo en el carril del hilo actual"""
+        tid = self._tid()
+        start = self._now()
+        try:
+            yield
+        finally:
+            self._event(name=name, cat='span', ph='X', ts=start, dur=self._now() - start, tid=tid, args=args)
+
+    # --- Etapas (cProfile + tracemalloc) ---
+
+    def stage(self, name):
+        """Cierra la etapa en curso (si hay) y abre `name`"""
+        self._close_stage()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Otro perfilador activo (p.ej. python -m cProfile): solo traza y tracemalloc
+            profile = None
+        self._stage = {'name': name, 'start': self._now(), 'tid': self._tid(), 'profile': profile}
+
+    def _close_stage(self):
+        stage, self._stage = self._stage, None
+        if stage is None:
+            return
+        profile = stage['profile']
+        if profile:
+            profile.disable()
+        end = self._now()
+        self._count += 1
+        base = os.path.join(self.out_dir, f"{self._count:02d}_{stage['name']}")
+
+        if profile:
+            profile.dump_stats(f"{base}.pstats")
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(self.top)
+            write_atomic(f"{base}.txt", text.getvalue())
+
+        # Asignaciones que crecieron durante la etapa (sin las del propio perfilador)
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._filters)
+        growth = snapshot.compare_to(self._snapshot, 'lineno')[:self.top]
+        self._snapshot = snapshot
+        write_atomic(f"{base}.tracemalloc.txt", '\n'.join(str(stat) for stat in growth) + '\n')
+
+        current, peak = tracemalloc.get_traced_memory()
+        self._event(name=stage['name'], cat='stage', ph='X', ts=stage['start'], dur=end - stage['start'],
+                    tid=stage['tid'], args={'pstats': os.path.basename(base) + '.pstats'})
+        self._event(name='memoria', ph='C', ts=end, tid=stage['tid'],
+                    args={'traced_mb': round(current / 2**20, 3), 'peak_mb': round(peak / 2**20, 3)})
+        self.stages.append({'name': stage['name'], 'seconds': round((end - stage['start']) / 1e6, 4),
+                            'traced_mb': round(current / 2**20, 3), 'file': os.path.basename(base)})
+
+    def finish(self):
+        """
+        Cierra la ultima etapa y escribe trace.json.
+
+        Returns:
+            list: Etapas [{'name', 'seconds', 'traced_mb', 'file'}]
+        """
+        self._close_stage()
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.process_name}}]
+        with self._lock:
+            for tid, thread_name in self.threads.items():
+                metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                                 'args': {'name': thread_name}})
+            events = metadata + self.events
+        write_atomic(os.path.join(self.out_dir, 'trace.json'),
+                     json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+        tracemalloc.stop()
+        return self.stages
+
+
+_profiler = None
+
+
+def configure_profiling(out_dir, process_name):
+    """Activa el perfilado del proceso en `out_dir` (None lo deja desactivado)"""
+    global _profiler
+    _profiler = Profiler(out_dir, process_name) if out_dir else None
+    return _profiler
+
+
+def get_profiler():
+    """Devuelve el perfilador del proceso (None si no se configuro)"""
+    return _profiler
+
+
+def profile_stage(name):
+    """Marca el inicio de una etapa del proceso principal (no-op sin --profile)"""
+    if _profiler:
+        _profiler.stage(name)
+
+
+def profile_span(name, **args):
+    """Context manager de un tramo de la traza (nullcontext sin --profile)"""
+    return _profiler.span(name, **args) if _profiler else contextlib.nullcontext()
+
+
+def profiled(name):
+    """Decorador: registra cada llamada de la funcion como tramo de la traza"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_profiling():
+    """Escribe los resultados del perfilado (None si no estaba activo)"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler.finish() if profiler else None
@@ -0,0 +1,246 @@
+"""
+Analisis de archivos Python generados con una sola pasada de ast.
+
+Un solo ast.parse de app.py da el error de sintaxis (si lo hay), los imports
+(clasificados con sys.stdlib_module_names), la app Flask, sus rutas y las
+entradas de requirements.txt. early_validation_check, la deteccion de imports
+prohibidos y la extraccion de dependencias comparten el mismo resultado,
+cacheado por hash de contenido en la cache de validaciones.
+"""
+
+import ast
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from .validation_cache import content_digest, get_validation_cache
+
+# Modulos de la libreria estandar (sys.stdlib_module_names existe desde Python 3.10)
+STDLIB_MODULES = frozenset(getattr(sys, 'stdlib_module_names', ())) or frozenset({
+    'os', 'sys', 'json', 'time', 'datetime', 're', 'math',
+    'collections', 'itertools', 'functools', 'pathlib', 'random',
+    'subprocess', 'shutil', 'argparse', 'logging', 'typing',
+    'threading', 'multiprocessing', 'queue', 'socket', 'urllib',
+    '__future__'
+})
+
+# Nombre de import -> paquete de pip cuando no basta con cambiar _ por -
+PIP_NAMES = {
+    'PIL': 'pillow',
+    'yaml': 'pyyaml',
+    'bs4': 'beautifulsoup4',
+    'sklearn': 'scikit-learn',
+    'cv2': 'opencv-python',
+    'dotenv': 'python-dotenv',
+    'dateutil': 'python-dateutil',
+    'jwt': 'pyjwt',
+}
+
+# Version minima por paquete en requirements.txt
+REQUIREMENT_PINS = {
+    'flask': '>=2.0.0',
+}
+
+# Metodos de app/Blueprint que registran rutas (@app.get('/') desde Flask 2.0)
+ROUTE_DECORATORS = {'route', 'get', 'post', 'put', 'patch', 'delete'}
+
+
+def pip_name(module):
+    """Paquete de pip de un modulo de primer nivel (flask_cors -> flask-cors)"""
+    return PIP_NAMES.get(module, module.replace('_', '-'))
+
+
+def requirement_line(package):
+    """Entrada de requirements.txt de un paquete (con version minima si la hay)"""
+    return f"{package}{REQUIREMENT_PINS.get(package.lower(), '')}"
+
+
+def _call_name(node):
+    """Nombre de la funcion llamada: Flask(...) o flask.Flask(...) -> 'Flask'"""
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _constant_strings(nodes):
+    return [node.value for node in nodes if isinstance(node, ast.Constant) and isinstance(node.value, str)]
+
+
+def _route(decorator, routers):
+    """Ruta de un decorador @app.route('/x', methods=[...]) (None si no registra una ruta)"""
+    if not isinstance(decorator, ast.Call) or not isinstance(decorator.func, ast.Attribute):
+        return None
+    func = decorator.func
+    if func.attr not in ROUTE_DECORATORS:
+        return None
+    if func.attr != 'route' and not (isinstance(func.value, ast.Name) and func.value.id in routers):
+        return None
+    paths = _constant_strings(decorator.args[:1])
+    methods = [func.attr.upper()] if func.attr != 'route' else ['GET']
+    for keyword in decorator.keywords:
+        if keyword.arg == 'methods' and isinstance(keyword.value, (ast.List, ast.Tuple, ast.Set)):
+            methods = [method.upper() for method in _constant_strings(keyword.value.elts)]
+    return {'path': paths[0] if paths else None, 'methods': methods}
+
+
+def _analyze(content):
+    result = {
+        'syntax_error': None,
+        'imports': [],
+        'stdlib': [],
+        'external': [],
+        'requirements': [],
+        'flask_apps': [],
+        'routes': [],
+        'runs_app': False,
+    }
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError) as e:
+        result['syntax_error'] = {'message': getattr(e, 'msg', None) or str(e),
+                                  'line': getattr(e, 'lineno', None)}
+        return result
+
+    # Primera pasada (la unica sobre el arbol completo): imports y objetos Flask/Blueprint
+    routers = {}
+    functions = []
+    runs = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            result['imports'].extend({'module': alias.name, 'line': node.lineno} for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            # Los imports relativos (from . import x) son del propio proyecto
+            if node.level == 0 and node.module:
+                result['imports'].append({'module': node.module, 'line': node.lineno})
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+            kind = _call_name(node.value)
+            if kind in ('Flask', 'Blueprint'):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        routers[target.id] = kind
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.decorator_list:
+            functions.append(node)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'run':
+            if isinstance(node.func.value, ast.Name):
+                runs.append(node.func.value.id)
+
+    result['flask_apps'] = [name for name, kind in routers.items() if kind == 'Flask']
+    result['runs_app'] = any(name in result['flask_apps'] for name in runs)
+    for function in sorted(functions, key=lambda node: node.lineno):
+        for decorator in function.decorator_list:
+            route = _route(decorator, routers)
+            if route:
+                route.update(function=function.name, line=decorator.lineno)
+                result['routes'].append(route)
+
+    top_level = dict.fromkeys(entry['module'].split('.')[0] for entry in result['imports'])
+    result['stdlib'] = sorted(module for module in top_level if module in STDLIB_MODULES)
+    result['external'] = sorted(module for module in top_level if module not in STDLIB_MODULES)
+    result['requirements'] = python_requirements(result)
+    return result
+
+
+# Analisis recientes en el proceso: digest -> resultado
+_analyses = OrderedDict()
+_analyses_lock = threading.Lock()
+_ANALYSES_MAX = 64
+
+
+def analyze_python(content):
+    """
+    Analiza un archivo Python (una vez por contenido).
+
+    El resultado se guarda en la cache de validaciones (clave: hash del
+    contenido y version de Python, que cambia stdlib_module_names) y en memoria
+    del proceso.
+
+    Returns:
+        dict: {
+            'syntax_error': {'message', 'line'} o None,
+            'imports': [{'module', 'line'}] (sin imports relativos),
+            'stdlib': Modulos de primer nivel de la libreria estandar,
+            'external': Modulos de primer nivel de terceros (o del proyecto),
+            'requirements': Entradas de requirements.txt de los modulos externos,
+            'flask_apps': Variables asignadas con Flask(...),
+            'routes': [{'path', 'methods', 'function', 'line'}],
+            'runs_app': Si se llama a <app>.run(...)
+        }
+    """
+    digest = content_digest(content)
+    with _analyses_lock:
+        cached = _analyses.get(digest)
+        if cached is not None:
+            _analyses.move_to_end(digest)
+            return cached
+    result = get_validation_cache().validate(
+        'python_ast', digest, lambda: _analyze(content), 'python', extra=list(sys.version_info[:2])
+    )
+    with _analyses_lock:
+        _analyses[digest] = result
+        while len(_analyses) > _ANALYSES_MAX:
+            _analyses.popitem(last=False)
+    return result
+
+
+def analyze_python_file(filepath):
+    """
+    analyze_python de un archivo.
+
+    Returns:
+        dict: None si el archivo no existe o no se puede leer
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+    return analyze_python(content)
+
+
+def local_modules(analysis, base_dir):
+    """Modulos externos que son archivos o paquetes del propio proyecto"""
+    return [
+        module for module in analysis['external']
+        if os.path.isfile(os.path.join(base_dir, f"{module}.py")) or os.path.isdir(os.path.join(base_dir, module))
+    ]
+
+
+def python_requirements(analysis, base_dir=None):
+    """
+    Entradas de requirements.txt de un analisis.
+
+    Args:
+        analysis: Resultado de analyze_python
+        base_dir: Carpeta del archivo (excluye sus modulos locales)
+
+    Returns:
+        list: ['flask>=2.0.0', 'flask-cors', ...]
+    """
+    local = set(local_modules(analysis, base_dir)) if base_dir else set()
+    return [requirement_line(pip_name(module)) for module in analysis['external'] if module not in local]
+
+
+def find_forbidden_imports(analysis, forbidden):
+    """
+    Imports del analisis que coinciden con una lista de prohibidos.
+
+    Un prohibido coincide con el modulo y sus submodulos, por nombre de import
+    o de paquete de pip ('flask-sqlalchemy' coincide con flask_sqlalchemy).
+
+    Returns:
+        list: [(prohibido, modulo importado)] sin repetir prohibidos
+    """
+    found = []
+    for name in forbidden:
+        candidates = {name, name.replace('-', '_')}
+        for entry in analysis['imports']:
+            module = entry['module']
+            top = module.split('.')[0]
+            if pip_name(top) == name or any(module == c or module.startswith(c + '.') for c in candidates):
+                found.append((name, module))
+                break
+    return found
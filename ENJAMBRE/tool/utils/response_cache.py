@@ -0,0 +1,196 @@
+"""
+Cache en disco de respuestas LLM direccionado por contenido.
+Evita volver a generar prompts identicos entre ejecuciones.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .file_ops import ensure_dir_exists, write_atomic
+
+
+class ResponseCache:
+    """
+    Cache de respuestas con eviccion LRU acotada por tamano.
+
+    Cada entrada es un JSON en cache_dir/<ab>/<hash>.json. El mtime del
+    archivo marca el ultimo uso: se actualiza en cada hit y se usa para
+    desalojar primero las entradas menos recientes.
+
+    Args:
+        cache_dir: Directorio de la cache
+        max_bytes: Tamano maximo total en disco
+        enabled: False desactiva lecturas y escrituras
+        refresh: True ignora las lecturas pero guarda respuestas nuevas
+    """
+
+    def __init__(self, cache_dir, max_bytes, enabled=True, refresh=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(payload):
+        """
+        Calcula la clave de una peticion.
+
+        Args:
+            payload: Cuerpo de chat completions (model, messages, temperature, max_tokens)
+
+        Returns:
+            str: sha256 hexadecimal
+        """
+        material = {
+            'model': payload.get('model'),
+            'messages': payload.get('messages'),
+            'temperature': payload.get('temperature'),
+            'max_tokens': payload.get('max_tokens'),
+        }
+        raw = json.dumps(material, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        Busca una respuesta.
+
+        Returns:
+            str: Contenido cacheado, None si no existe (o cache desactivada/refresh)
+        """
+        if not self.enabled or self.refresh:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)['content']
+            os.utime(path, None)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, key, content):
+        """Guarda una respuesta (escritura atomica) y desaloja si se excede el limite"""
+        if not self.enabled or not content:
+            return False
+
+        path = self._path(key)
+        data = json.dumps({'key': key, 'content': content, 'created': time.time()}, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+
+        try:
+            ensure_dir_exists(os.path.dirname(path))
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            write_atomic(path, data)
+        except OSError:
+            return False
+
+        with self._lock:
+            self.stores += 1
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += size - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return True
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Elimina entradas menos usadas hasta quedar en el 90% del limite"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def stats(self):
+        """Contadores para execution_report.json"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'refresh': self.refresh,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """Devuelve la cache de respuestas del proceso (creandola con CACHE de config)"""
+    global _response_cache
+    if _response_cache is None:
+        from config import CACHE
+        _response_cache = ResponseCache(CACHE['dir'], CACHE['max_bytes'], CACHE['enabled'])
+    return _response_cache
+
+
+def configure_response_cache(enabled=True, refresh=False):
+    """Ajusta la cache del proceso segun las opciones de linea de comandos"""
+    cache = get_response_cache()
+    cache.enabled = enabled
+    cache.refresh = refresh
+    return cache
+
+
+def store_validated_output(cache_key, content, output_path=None):
+    """
+    Guarda en cache una salida que ya paso early_validation_check.
+
+    Si no se tiene el contenido crudo (motor subprocess), se usa el archivo guardado.
+    """
+    if not cache_key:
+        return False
+    if content is None and output_path:
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            return False
+    return get_response_cache().put(cache_key, content)
@@ -0,0 +1,186 @@
+"""
+Reglas de validacion declarativas de templates.json.
+
+Cada template puede declarar sus checks de estructura en "structure_checks":
+
+    {"name": "app.py exists", "file": "app.py", "exists": true}
+    {"name": "render_template in app.py", "file": "app.py", "contains": "render_template"}
+    {"name": "HTML link /static/style.css", "file": "templates/index.html", "contains": ["href", "/static/style.css"]}
+    {"name": "Flask route", "file": "app.py", "regex": "@app\\.route\\(['\\"]/['\\"]"}
+    {"name": "JS NO require()", "file": "static/script.js", "forbid": "require("}
+    {"name": "JS NO {match}", "file": "static/script.js", "forbid_set": "nodejs_api"}
+
+"contains" exige todos los textos de la lista. Un check "forbid"/"forbid_set"
+solo aparece en el resultado (como fallido) si el archivo contiene alguno de
+los patrones; "{match}" en el nombre se reemplaza por el primero encontrado y
+"min_count" exige un minimo de apariciones. "when" y "unless" condicionan un
+check a otro ({"file": ..., "contains": ...}; por defecto el mismo archivo).
+
+compile_rules convierte la lista en un RulePlan: regex compiladas una vez y
+checks agrupados por archivo, asi cada archivo se consulta una sola vez (un
+ScanResult de ProjectSnapshot) sin importar cuantas reglas lo usen.
+"""
+
+import json
+import re
+
+from .validation_cache import content_digest
+from .validators import COMMONJS_PATTERNS, NODEJS_API_PATTERNS, PYTHON_IN_JS_PATTERNS
+
+# Tablas de patrones de validators.py disponibles para "forbid_set"
+PATTERN_SETS = {
+    'nodejs_api': NODEJS_API_PATTERNS,
+    'commonjs': COMMONJS_PATTERNS,
+    'python_in_js': PYTHON_IN_JS_PATTERNS,
+}
+
+RULE_KINDS = ('exists', 'contains', 'regex', 'forbid', 'forbid_set')
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _as_list_of_dicts(value):
+    if not value:
+        return []
+    return [value] if isinstance(value, dict) else list(value)
+
+
+class _Target:
+    """Estado de un archivo durante la ejecucion de un plan (se consulta una vez)"""
+
+    def __init__(self, snapshot, path):
+        self.exists = snapshot.exists(path)
+        self.scan = snapshot.scan(path) if self.exists else None
+
+
+class CompiledRule:
+    """
+    Check (o condicion) de structure_checks ya compilado.
+
+    Args:
+        rule: Dict de templates.json
+        default_file: Archivo de las condiciones que no indican uno
+    """
+
+    def __init__(self, rule, default_file=None):
+        kinds = [kind for kind in RULE_KINDS if kind in rule]
+        if len(kinds) != 1:
+            raise ValueError(f"Regla de validacion con {len(kinds)} tipos (uno de {', '.join(RULE_KINDS)}): {rule}")
+        self.kind = kinds[0]
+        self.file = rule.get('file', default_file)
+        if not self.file:
+            raise ValueError(f"Regla de validacion sin 'file': {rule}")
+        self.name = rule.get('name')
+        self.min_count = rule.get('min_count', 1)
+        self.regex = None
+        self.patterns = ()
+
+        value = rule[self.kind]
+        if self.kind == 'regex':
+            self.regex = re.compile(value)
+        elif self.kind == 'forbid_set':
+            if value not in PATTERN_SETS:
+                raise ValueError(f"forbid_set desconocido: {value} (validos: {', '.join(PATTERN_SETS)})")
+            self.patterns = tuple(PATTERN_SETS[value])
+        elif self.kind != 'exists':
+            self.patterns = tuple(_as_list(value))
+
+        self.when = [CompiledRule(cond, self.file) for cond in _as_list_of_dicts(rule.get('when'))]
+        self.unless = [CompiledRule(cond, self.file) for cond in _as_list_of_dicts(rule.get('unless'))]
+
+    @property
+    def files(self):
+        """Archivos que consulta el check (incluidas sus condiciones)"""
+        files = [self.file]
+        for cond in self.when + self.unless:
+            files.extend(cond.files)
+        return files
+
+    @property
+    def is_forbid(self):
+        return self.kind in ('forbid', 'forbid_set')
+
+    def match(self, target):
+        """
+        Evalua el check sobre un archivo.
+
+        Returns:
+            Para exists/contains/regex: bool. Para forbid: primer patron
+            encontrado (None si no hay ninguno o el archivo no se puede leer)
+        """
+        if self.kind == 'exists':
+            return target.exists
+        scan = target.scan
+        if self.kind == 'contains':
+            return scan is not None and all(pattern in scan for pattern in self.patterns)
+        if self.kind == 'regex':
+            return scan is not None and self.regex.search(scan.content) is not None
+        if scan is None:
+            return None
+        for pattern in self.patterns:
+            if pattern in scan and (self.min_count <= 1 or scan.count(pattern) >= self.min_count):
+                return pattern
+        return None
+
+
+class RulePlan:
+    """
+    Plan de ejecucion de los structure_checks de un template.
+
+    Args:
+        rules: Lista de checks de templates.json
+    """
+
+    def __init__(self, rules):
+        self.rules = [CompiledRule(rule) for rule in rules or []]
+        for rule in self.rules:
+            if not rule.name:
+                raise ValueError(f"Regla de validacion sin 'name' (archivo {rule.file})")
+        # Checks agrupados por archivo, en el orden de primera aparicion
+        self.by_file = {}
+        for index, rule in enumerate(self.rules):
+            self.by_file.setdefault(rule.file, []).append((index, rule))
+        self.paths = list(dict.fromkeys(path for rule in self.rules for path in rule.files))
+        self.digest = content_digest(json.dumps(rules or [], sort_keys=True, ensure_ascii=False))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def run(self, snapshot):
+        """
+        Ejecuta el plan sobre un ProjectSnapshot.
+
+        Returns:
+            list: [(nombre, ok)] en el orden declarado (los forbid solo si fallan)
+        """
+        targets = {}
+
+        def target(path):
+            if path not in targets:
+                targets[path] = _Target(snapshot, path)
+            return targets[path]
+
+        def holds(cond):
+            result = cond.match(target(cond.file))
+            return result is not None and result is not False
+
+        outcomes = [None] * len(self.rules)
+        for path, rules in self.by_file.items():
+            current = target(path)
+            for index, rule in rules:
+                if not all(holds(cond) for cond in rule.when) or any(holds(cond) for cond in rule.unless):
+                    continue
+                result = rule.match(current)
+                if rule.is_forbid:
+                    if result is not None:
+                        outcomes[index] = (rule.name.replace('{match}', result), False)
+                else:
+                    outcomes[index] = (rule.name, bool(result))
+        return [outcome for outcome in outcomes if outcome is not None]
+
+
+def compile_rules(rules):
+    """Compila una lista de structure_checks (ValueError si una regla no es valida)"""
+    return RulePlan(rules)
@@ -0,0 +1,123 @@
+"""
+Instantanea de los archivos de un proyecto generado.
+
+Las validaciones de proyecto (validate_output.py, validate_media.py)
+consultan muchos patrones de los mismos pocos archivos. ProjectSnapshot hace
+un stat y una lectura por archivo, la primera vez que se consulta, y sirve
+todas las comprobaciones desde memoria.
+"""
+
+import json
+import os
+import stat
+
+from .validation_cache import content_digest
+from .validators import FILE_TYPES_BY_EXT, scan_content
+
+_MISSING = object()
+
+
+class ProjectSnapshot:
+    """
+    Contenido de los archivos de un proyecto, leido una vez por archivo.
+
+    Las rutas son relativas a la raiz del proyecto ('templates/index.html').
+    El texto se decodifica como UTF-8 con finales de linea universales, igual
+    que open(path, 'r').
+
+    Args:
+        root: Carpeta del proyecto
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.reads = 0
+        self._stats = {}
+        self._data = {}
+        self._text = {}
+        self._scans = {}
+
+    def path(self, rel):
+        return os.path.join(self.root, rel)
+
+    def _stat(self, rel):
+        result = self._stats.get(rel, _MISSING)
+        if result is _MISSING:
+            try:
+                result = os.stat(self.path(rel))
+            except OSError:
+                result = None
+            self._stats[rel] = result
+        return result
+
+    def exists(self, rel):
+        return self._stat(rel) is not None
+
+    def isdir(self, rel):
+        result = self._stat(rel)
+        return result is not None and stat.S_ISDIR(result.st_mode)
+
+    def size(self, rel):
+        result = self._stat(rel)
+        return result.st_size if result is not None else None
+
+    def data(self, rel):
+        """Bytes del archivo (None si no existe, es carpeta o no se puede leer)"""
+        data = self._data.get(rel, _MISSING)
+        if data is _MISSING:
+            data = None
+            if self.exists(rel) and not self.isdir(rel):
+                try:
+                    with open(self.path(rel), 'rb') as f:
+                        data = f.read()
+                    self.reads += 1
+                except OSError:
+                    pass
+            self._data[rel] = data
+        return data
+
+    def read(self, rel):
+        """Texto del archivo (None si no existe o no es UTF-8 valido)"""
+        text = self._text.get(rel, _MISSING)
+        if text is _MISSING:
+            text = None
+            data = self.data(rel)
+            if data is not None:
+                try:
+                    text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                except UnicodeDecodeError:
+                    pass
+            self._text[rel] = text
+        return text
+
+    def scan(self, rel):
+        """ScanResult del archivo con los patrones de su tipo (None si no se puede leer)"""
+        scan = self._scans.get(rel, _MISSING)
+        if scan is _MISSING:
+            text = self.read(rel)
+            ext = os.path.splitext(rel)[1].lstrip('.').lower()
+            scan = scan_content(text, FILE_TYPES_BY_EXT.get(ext, ext)) if text is not None else None
+            self._scans[rel] = scan
+        return scan
+
+    def contains(self, rel, search_string):
+        """Igual que check_file_content: False si no existe o no se puede leer"""
+        scan = self.scan(rel)
+        return scan is not None and search_string in scan
+
+    def digest(self, rel):
+        """Hash del contenido en bytes (None si no se puede leer)"""
+        data = self.data(rel)
+        return content_digest(data) if data is not None else None
+
+    def fingerprint(self, rels):
+        """Hash del contenido y existencia de varias rutas (clave de cache)"""
+        material = {rel: 'dir' if self.isdir(rel) else self.digest(rel) for rel in rels}
+        return content_digest(json.dumps(material, sort_keys=True))
+
+    def write(self, rel, text):
+        """Escribe un archivo del proyecto y actualiza la instantanea"""
+        with open(self.path(rel), 'w', encoding='utf-8') as f:
+            f.write(text)
+        for cache in (self._stats, self._data, self._text, self._scans):
+            cache.pop(rel, None)
@@ -0,0 +1,107 @@
+"""
+Escritura incremental de respuestas en streaming.
+Escribe el codigo en disco a medida que llega y aborta ante lenguaje incorrecto.
+El avance se escribe en <archivo>.part; el archivo final aparece de forma
+atomica al terminar, asi nadie lee una salida a medio generar.
+"""
+
+import os
+
+from .code_extract import StreamingCodeExtractor
+from .file_ops import ensure_dir_exists, save_output
+from .structure import structure_tokenizer
+from .validators import FILE_TYPES_BY_EXT, check_partial_output
+
+
+class StreamingOutput:
+    """
+    Consumidor de texto en streaming para un archivo de salida.
+
+    Uso:
+        stream = StreamingOutput('static/script.js')
+        error = stream.feed(delta)   # None o mensaje de aborto
+        stream.finish(full_content)  # normaliza y publica el archivo final
+        stream.discard()             # (si se aborta) elimina el parcial
+
+    Args:
+        output_path: Ruta del archivo (None = solo acumular)
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        ext = output_path.rsplit('.', 1)[-1].lower() if output_path else ''
+        self.file_type = FILE_TYPES_BY_EXT.get(ext)
+        self.extractor = StreamingCodeExtractor()
+        self.structure = structure_tokenizer(self.file_type)
+        self.code = ''
+        self.content = ''
+        self.error = None
+        self._file = None
+        self.part_path = f"{output_path}.part" if output_path else None
+
+        if output_path:
+            dir_path = os.path.dirname(output_path)
+            if dir_path:
+                ensure_dir_exists(dir_path)
+            self._file = open(self.part_path, 'w', encoding='utf-8')
+
+    def feed(self, delta):
+        """
+        Agrega texto recibido, lo escribe en disco y revisa el codigo parcial.
+
+        Returns:
+            str: Mensaje de error si hay que cancelar la peticion, None si no
+        """
+        self.content += delta
+        new_code = self.extractor.feed(delta)
+
+        if self.extractor.restarted:
+            self.code = ''
+            self.structure = structure_tokenizer(self.file_type)
+            if self._file:
+                self._file.seek(0)
+                self._file.truncate()
+
+        if not new_code:
+            return None
+
+        start = len(self.code)
+        self.code += new_code
+        if self._file:
+            self._file.write(new_code)
+            self._file.flush()
+
+        if self.file_type:
+            self.error = check_partial_output(self.code, self.file_type, start)
+        if self.structure and not self.error:
+            # Solo cierres que no corresponden: lo que falta cerrar puede llegar despues
+            errors_before = len(self.structure.errors)
+            self.structure.feed(new_code)
+            if len(self.structure.errors) > errors_before:
+                self.error = f"Estructura invalida en streaming: {self.structure.errors[errors_before]}"
+        return self.error
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Cierra y elimina el archivo parcial"""
+        self.close()
+        if self.part_path and os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def finish(self, content=None):
+        """
+        Publica el archivo final con la extraccion definitiva (escritura atomica).
+
+        Returns:
+            str: Ruta guardada (None si no hay archivo)
+        """
+        self.close()
+        if not self.output_path:
+            return None
+        saved_path = save_output(self.content if content is None else content, self.output_path)
+        self.discard()
+        return saved_path
@@ -0,0 +1,490 @@
+"""
+Tokenizador estructural de JS, CSS y HTML en una sola pasada.
+
+Sigue la anidacion real de (), [] y {} ignorando lo que esta dentro de
+cadenas, template literals, expresiones regulares y comentarios, y detecta
+cadenas o comentarios sin cerrar. Acepta el texto por chunks (feed) y se
+puede reanudar en cualquier punto: sirve para el combinador modular, la
+validacion temprana y la generacion en streaming.
+
+Los tramos sin tokens se saltan con expresiones regulares compiladas (en C),
+asi que el coste en Python es proporcional al numero de tokens y no al de
+caracteres.
+"""
+
+import re
+
+OPENERS = {'(': ')', '[': ']', '{': '}'}
+CLOSERS = {')': '(', ']': '[', '}': '{'}
+
+# Palabras tras las que '/' abre una expresion regular en JS (y no divide)
+REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                  'case', 'do', 'else', 'yield', 'await'}
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+_CODE_TOKENS = {
+    'js': re.compile(r'[{}()\[\]"\'`/]'),
+    'css': re.compile(r'[{}()\[\]"\'/]'),
+}
+_STRING_TOKENS = {quote: re.compile(r'[\\\n' + quote + ']') for quote in ('"', "'")}
+_TEMPLATE_TOKENS = re.compile(r'[\\`$]')
+_REGEX_TOKENS = re.compile(r'[\\/\[\]\n]')
+_WORD_TAIL = re.compile(r'[A-Za-z_$][\w$]*\Z')
+_PARTIAL_WORD = re.compile(r'[\w$]+\Z')
+
+
+class StructureReport:
+    """
+    Resultado del tokenizador.
+
+    Attributes:
+        language: 'js', 'css' o 'html'
+        errors: Cierres sin apertura o que no corresponden, cadenas/comentarios sin cerrar
+        unclosed: Aperturas sin cerrar al final [(caracter, linea)] (o ('<script>', linea) en HTML)
+        max_depth: Anidacion maxima alcanzada
+        lines: Lineas procesadas
+    """
+
+    def __init__(self, language, errors, unclosed, max_depth, lines):
+        self.language = language
+        self.errors = errors
+        self.unclosed = unclosed
+        self.max_depth = max_depth
+        self.lines = lines
+
+    @property
+    def ok(self):
+        return not self.errors and not self.unclosed
+
+    def summary(self, limit=3):
+        """Descripcion corta de los problemas (cadena vacia si ok)"""
+        problems = list(self.errors[:limit])
+        if self.unclosed and len(problems) < limit:
+            opened = ', '.join(f"'{char}' (linea {line})" for char, line in self.unclosed[-limit:])
+            problems.append(f"sin cerrar: {opened}")
+        return '; '.join(problems)
+
+    def to_dict(self):
+        return {'ok': self.ok, 'errors': self.errors, 'unclosed': self.unclosed,
+                'max_depth': self.max_depth, 'lines': self.lines}
+
+
+class CodeTokenizer:
+    """
+    Tokenizador de JS o CSS reanudable por chunks.
+
+    Uso:
+        tokenizer = CodeTokenizer('js')
+        tokenizer.feed(chunk)          # tantas veces como haga falta
+        report = tokenizer.finish()    # StructureReport
+
+    Args:
+        language: 'js' o 'css'
+        first_line: Numero de la primera linea (codigo embebido en HTML)
+    """
+
+    def __init__(self, language, first_line=1):
+        if language not in _CODE_TOKENS:
+            raise ValueError(f"Lenguaje no soportado: {language}")
+        self.language = language
+        self.errors = []
+        self.stack = []          # [(apertura, linea)]; '${' abre codigo dentro de un template literal
+        self.max_depth = 0
+        self.mode = 'code'
+        self.quote = None
+        self.in_class = False
+        self.line = first_line
+        self._last = None        # Ultimo caracter significativo (decide si '/' abre una regex)
+        self._last_word = ''
+        self._pending = ''
+        self._tokens = _CODE_TOKENS[language]
+
+    @property
+    def depth(self):
+        return len(self.stack)
+
+    def _line_at(self, buf, index):
+        """Linea de una posicion del buffer en curso (las posiciones consultadas solo avanzan)"""
+        self._line_cur += buf.count('\n', self._line_pos, index)
+        self._line_pos = index
+        return self._line_cur
+
+    def _error(self, message, buf, index):
+        self.errors.append(f"{message} en linea {self._line_at(buf, index)}")
+
+    def _note_code(self, run):
+        stripped = run.rstrip()
+        if stripped:
+            self._last = stripped[-1]
+            match = _WORD_TAIL.search(stripped[-64:])
+            self._last_word = match.group() if match else ''
+
+    def _regex_allowed(self):
+        last = self._last
+        if last is None or last in REGEX_PRECEDERS:
+            return True
+        return (last.isalnum() or last in '_$') and self._last_word in REGEX_KEYWORDS
+
+    def _close(self, char, buf, index):
+        if not self.stack:
+            self._error(f"'{char}' sin apertura", buf, index)
+            return
+        opener = self.stack[-1][0]
+        if opener == CLOSERS[char] or (opener == '${' and char == '}'):
+            self.stack.pop()
+            if opener == '${':
+                self.mode = 'template'
+            return
+        self._error(f"'{char}' cierra '{opener}'", buf, index)
+        # Recuperacion: si la apertura correcta esta mas abajo se descartan las intermedias
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == CLOSERS[char]:
+                del self.stack[depth:]
+                return
+
+    def feed(self, chunk, final=False):
+        """Procesa un chunk (final=True: no quedan mas datos; el ultimo token no espera al siguiente)"""
+        buf = self._pending + chunk
+        self._pending = ''
+        self._line_cur, self._line_pos = self.line, 0
+        n = len(buf)
+        i = 0
+        while i < n:
+            mode = self.mode
+            if mode == 'code':
+                match = self._tokens.search(buf, i)
+                if not match:
+                    tail = buf[i:]
+                    partial = None if final else _PARTIAL_WORD.search(tail)
+                    if partial:
+                        # Una palabra cortada al final (p.ej. 'retu' + 'rn') se completa en el siguiente chunk
+                        self._note_code(tail[:partial.start()])
+                        self._pending = partial.group()
+                        n -= len(self._pending)
+                    else:
+                        self._note_code(tail)
+                    i = n
+                    break
+                j = match.start()
+                if j > i:
+                    self._note_code(buf[i:j])
+                char = buf[j]
+                if char in OPENERS:
+                    self.stack.append((char, self._line_at(buf, j)))
+                    if len(self.stack) > self.max_depth:
+                        self.max_depth = len(self.stack)
+                    self._last = char
+                    i = j + 1
+                elif char in CLOSERS:
+                    self._close(char, buf, j)
+                    self._last = char
+                    self._last_word = ''
+                    i = j + 1
+                elif char == '`':
+                    self.mode = 'template'
+                    i = j + 1
+                elif char in '"\'':
+                    self.mode = 'string'
+                    self.quote = char
+                    i = j + 1
+                else:  # '/'
+                    if j + 1 >= n and not final:
+                        self._pending = buf[j:]
+                        n = j
+                        break
+                    following = buf[j + 1] if j + 1 < n else ''
+                    if following == '*':
+                        self.mode = 'block_comment'
+                        i = j + 2
+                    elif following == '/' and self.language == 'js':
+                        self.mode = 'line_comment'
+                        i = j + 2
+                    elif self.language == 'js' and self._regex_allowed():
+                        self.mode = 'regex'
+                        self.in_class = False
+                        i = j + 1
+                    else:
+                        self._last = '/'
+                        i = j + 1
+            elif mode == 'string':
+                match = _STRING_TOKENS[self.quote].search(buf, i)
+                if not match:
+                    i = n
+                    break
+                j = match.start()
+                char = buf[j]
+                if char == '\\':
+                    if j + 1 >= n and not final:
+                        self._pending = buf[j:]
+                        n = j
+                        break
+                    i = j + 2
+                    continue
+                if char == '\n':
+                    self._error("Cadena sin cerrar", buf, j)
+                self.mode = 'code'
+                self._last = '"'
+                self._last_word = ''
+                i = j + 1
+            elif mode == 'template':
+                match = _TEMPLATE_TOKENS.search(buf, i)
+                if not match:
+                    i = n
+                    break
+                j = match.start()
+                char = buf[j]
+                if char in '\\$' and j + 1 >= n and not final:
+                    self._pending = buf[j:]
+                    n = j
+                    break
+                if char == '\\':
+                    i = j + 2
+                elif char == '`':
+                    self.mode = 'code'
+                    self._last = '`'
+                    self._last_word = ''
+                    i = j + 1
+                elif j + 1 < n and buf[j + 1] == '{':
+                    self.stack.append(('${', self._line_at(buf, j)))
+                    if len(self.stack) > self.max_depth:
+                        self.max_depth = len(self.stack)
+                    self.mode = 'code'
+                    self._last = '{'
+                    i = j + 2
+                else:
+                    i = j + 1
+            elif mode == 'line_comment':
+                j = buf.find('\n', i)
+                if j < 0:
+                    i = n
+                    break
+                self.mode = 'code'
+                i = j + 1
+            elif mode == 'block_comment':
+                j = buf.find('*/', i)
+                if j < 0:
+                    if not final and buf.endswith('*'):
+                        self._pending = '*'
+                        n -= 1
+                    i = n
+                    break
+                self.mode = 'code'
+                i = j + 2
+            else:  # regex
+                match = _REGEX_TOKENS.search(buf, i)
+                if not match:
+                    i = n
+                    break
+                j = match.start()
+                char = buf[j]
+                if char == '\\':
+                    if j + 1 >= n and not final:
+                        self._pending = buf[j:]
+                        n = j
+                        break
+                    i = j + 2
+                elif char == '[':
+                    self.in_class = True
+                    i = j + 1
+                elif char == ']':
+                    self.in_class = False
+                    i = j + 1
+                elif char == '\n' or not self.in_class:
+                    # Un salto de linea indica que era una division mal clasificada: se sigue como codigo
+                    self.mode = 'code'
+                    self._last = 'a'
+                    self._last_word = ''
+                    i = j + 1
+                else:
+                    i = j + 1
+        self.line = self._line_at(buf, n)
+        return self
+
+    def finish(self):
+        """Cierra el texto y devuelve el StructureReport"""
+        if self._pending:
+            self.feed('', final=True)
+        errors = list(self.errors)
+        if self.mode == 'string':
+            errors.append(f"Cadena sin cerrar al final (linea {self.line})")
+        elif self.mode == 'template':
+            errors.append(f"Template literal sin cerrar al final (linea {self.line})")
+        elif self.mode == 'block_comment':
+            errors.append(f"Comentario sin cerrar al final (linea {self.line})")
+        unclosed = [('{' if char == '${' else char, line) for char, line in self.stack]
+        return StructureReport(self.language, errors, unclosed, self.max_depth, self.line)
+
+
+_TEXT_TOKENS = re.compile(r'<')
+_TAG_NAME = re.compile(r'(/?)([A-Za-z][\w:-]*)')
+_TAG_TOKENS = re.compile(r'["\'>]')
+_EMBEDDED = {'script': 'js', 'style': 'css'}
+_EMBEDDED_END = {name: re.compile(f'</{name}', re.IGNORECASE) for name in _EMBEDDED}
+
+
+class HtmlTokenizer:
+    """
+    Tokenizador de HTML reanudable por chunks.
+
+    Detecta comentarios y etiquetas sin cerrar, y valida el contenido de
+    <script> y <style> con CodeTokenizer (los errores llevan el prefijo de la
+    etiqueta y el numero de linea del documento).
+    """
+
+    def __init__(self):
+        self.language = 'html'
+        self.errors = []
+        self.unclosed = []
+        self.max_depth = 0
+        self.mode = 'text'
+        self.quote = None
+        self.tag = None          # (nombre, es_cierre, linea) de la etiqueta en curso
+        self.embedded = None     # (nombre, CodeTokenizer) dentro de <script>/<style>
+        self.line = 1
+        self._pending = ''
+
+    def _line_at(self, buf, index):
+        """Linea de una posicion del buffer en curso (las posiciones consultadas solo avanzan)"""
+        self._line_cur += buf.count('\n', self._line_pos, index)
+        self._line_pos = index
+        return self._line_cur
+
+    def _close_embedded(self, line):
+        name, tokenizer = self.embedded
+        report = tokenizer.finish()
+        self.errors.extend(f"<{name}>: {error}" for error in report.errors)
+        self.unclosed.extend(report.unclosed)
+        self.max_depth = max(self.max_depth, report.max_depth)
+        self.embedded = None
+        return report
+
+    def feed(self, chunk, final=False):
+        """Procesa un chunk (final=True: no quedan mas datos)"""
+        buf = self._pending + chunk
+        self._pending = ''
+        self._line_cur, self._line_pos = self.line, 0
+        n = len(buf)
+        i = 0
+        while i < n:
+            mode = self.mode
+            if mode == 'text':
+                j = buf.find('<', i)
+                if j < 0:
+                    i = n
+                    break
+                if not final and n - j < 4 and '<!--'.startswith(buf[j:]):
+                    self._pending = buf[j:]
+                    n = j
+                    break
+                if buf.startswith('<!--', j):
+                    self.mode = 'comment'
+                    self.tag = ('!--', False, self._line_at(buf, j))
+                    i = j + 4
+                    continue
+                match = _TAG_NAME.match(buf, j + 1)
+                if match and match.end() >= n and not final:
+                    self._pending = buf[j:]
+                    n = j
+                    break
+                if match:
+                    self.mode = 'tag'
+                    self.tag = (match.group(2).lower(), bool(match.group(1)), self._line_at(buf, j))
+                    i = match.end()
+                elif buf.startswith('<!', j) or buf.startswith('<?', j):
+                    self.mode = 'tag'
+                    self.tag = ('!', False, self._line_at(buf, j))
+                    i = j + 2
+                else:
+                    i = j + 1  # '<' literal
+            elif mode == 'tag':
+                if self.quote:
+                    j = buf.find(self.quote, i)
+                    if j < 0:
+                        i = n
+                        break
+                    self.quote = None
+                    i = j + 1
+                    continue
+                match = _TAG_TOKENS.search(buf, i)
+                if not match:
+                    i = n
+                    break
+                j = match.start()
+                if buf[j] != '>':
+                    self.quote = buf[j]
+                    i = j + 1
+                    continue
+                name, closing, _ = self.tag
+                self.mode = 'text'
+                i = j + 1
+                if name in _EMBEDDED and not closing and buf[j - 1:j] != '/':
+                    self.embedded = (name, CodeTokenizer(_EMBEDDED[name], self._line_at(buf, i)))
+                    self.mode = 'embedded'
+            elif mode == 'comment':
+                j = buf.find('-->', i)
+                if j < 0:
+                    if not final:
+                        keep = 2 if buf.endswith('--') else 1 if buf.endswith('-') else 0
+                        if keep:
+                            self._pending = buf[n - keep:]
+                            n -= keep
+                    i = n
+                    break
+                self.mode = 'text'
+                i = j + 3
+            else:  # embedded
+                name, tokenizer = self.embedded
+                end = _EMBEDDED_END[name].search(buf, i)
+                if end:
+                    tokenizer.feed(buf[i:end.start()], final=True)
+                    self._close_embedded(self._line_at(buf, end.start()))
+                    self.mode = 'text'
+                    i = end.start()
+                    continue
+                # Guardar el final por si '</script' llega partido entre chunks
+                keep = 0 if final else min(n - i, len(name) + 1)
+                tokenizer.feed(buf[i:n - keep])
+                if keep:
+                    self._pending = buf[n - keep:]
+                    n -= keep
+                i = n
+                break
+        self.line = self._line_at(buf, n)
+        return self
+
+    def finish(self):
+        """Cierra el documento y devuelve el StructureReport"""
+        if self._pending:
+            self.feed('', final=True)
+        if self.mode == 'comment':
+            self.errors.append(f"Comentario HTML sin cerrar (linea {self.tag[2]})")
+        elif self.mode == 'tag':
+            self.errors.append(f"Etiqueta <{self.tag[0]} sin cerrar (linea {self.tag[2]})")
+        elif self.mode == 'embedded':
+            name = self.embedded[0]
+            self._close_embedded(self.line)
+            self.unclosed.append((f"<{name}>", self.line))
+        return StructureReport('html', self.errors, self.unclosed, self.max_depth, self.line)
+
+
+def structure_tokenizer(file_type):
+    """Tokenizador para un tipo de archivo ('js', 'css', 'html'; None si no hay)"""
+    if file_type == 'html':
+        return HtmlTokenizer()
+    if file_type in _CODE_TOKENS:
+        return CodeTokenizer(file_type)
+    return None
+
+
+def scan_structure(content, file_type):
+    """
+    Analiza un texto completo.
+
+    Returns:
+        StructureReport: None si el tipo no tiene tokenizador
+    """
+    tokenizer = structure_tokenizer(file_type)
+    if tokenizer is None:
+        return None
+    tokenizer.feed(content, final=True)
+    return tokenizer.finish()
@@ -0,0 +1,137 @@
+"""
+Registro de templates (templates.json) con cache por proceso.
+El archivo se parsea una sola vez y se vuelve a leer solo si cambia su
+mtime; contratos y ejemplos quedan indexados por ruta, nombre de archivo y
+extension para que cada tarea los resuelva sin recorrerlos, y los
+structure_checks se compilan una vez por carga en un RulePlan.
+"""
+
+import os
+import threading
+
+from .file_ops import load_json
+from .rule_plan import compile_rules
+
+
+class PathIndex:
+    """
+    Indices de un dict {ruta: valor} de un template (contracts, examples).
+
+    Ante varias claves con el mismo nombre o extension gana la primera en el
+    orden del archivo, igual que el recorrido lineal que reemplaza.
+    """
+
+    def __init__(self, mapping):
+        self.by_path = dict(mapping or {})
+        self.by_name = {}
+        self.by_ext = {}
+        for key, value in self.by_path.items():
+            self.by_name.setdefault(key.rsplit('/', 1)[-1], value)
+            if '.' in key:
+                self.by_ext.setdefault(key.rsplit('.', 1)[1], value)
+
+    def __bool__(self):
+        return bool(self.by_path)
+
+    def for_file(self, output_file):
+        """Valor para una ruta de salida: ruta completa o, si no, nombre de archivo"""
+        output_file = output_file.replace('\\', '/')
+        if output_file in self.by_path:
+            return self.by_path[output_file]
+        return self.by_name.get(output_file.rsplit('/', 1)[-1])
+
+    def for_prompt(self, output_file):
+        """Valor para mejorar un prompt: clave igual al nombre de archivo o, si no, misma extension"""
+        filename = output_file.split('/')[-1]
+        if filename in self.by_path:
+            return self.by_path[filename]
+        return self.by_ext.get(output_file.split('.')[-1].lower())
+
+
+class TemplateIndex:
+    """Template de templates.json con sus contratos y ejemplos indexados"""
+
+    def __init__(self, template):
+        self.template = template
+        self.name = template.get('template_name')
+        self.contracts = PathIndex(template.get('contracts'))
+        self.examples = PathIndex(template.get('examples'))
+        self._check_plan = None
+
+    @property
+    def check_plan(self):
+        """RulePlan de structure_checks (se compila en la primera consulta)"""
+        if self._check_plan is None:
+            self._check_plan = compile_rules(self.template.get('structure_checks'))
+        return self._check_plan
+
+
+class TemplateRegistry:
+    """
+    Templates de un templates.json cargados una vez por proceso.
+
+    Cada consulta compara el mtime y tamano del archivo con los de la ultima
+    carga (un stat) y solo vuelve a parsear si cambiaron.
+
+    Args:
+        path: Ruta de templates.json
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.loads = 0
+        self._signature = None
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return self._indexes
+        with self._lock:
+            if signature != self._signature:
+                templates = load_json(self.path) if signature else None
+                self._indexes = {
+                    template['template_name']: TemplateIndex(template)
+                    for template in templates or [] if 'template_name' in template
+                }
+                self._signature = signature
+                self.loads += 1
+            return self._indexes
+
+    def get(self, template_name):
+        """Template por nombre (None si no existe)"""
+        index = self._refresh().get(template_name)
+        return index.template if index else None
+
+    def index(self, template_name):
+        """TemplateIndex por nombre (None si no existe)"""
+        return self._refresh().get(template_name)
+
+    def index_for(self, template):
+        """TemplateIndex de un template ya cargado (se indexa aparte si no viene del registro)"""
+        index = self.index(template.get('template_name'))
+        return index if index and index.template is template else TemplateIndex(template)
+
+    def names(self):
+        return list(self._refresh())
+
+    def structure_types(self):
+        """Templates que declaran structure_checks (tipos de validate_output.py)"""
+        return [name for name, index in self._refresh().items() if index.template.get('structure_checks')]
+
+
+_registry = None
+
+
+def get_template_registry():
+    """Devuelve el registro de templates del proceso (templates.json de CONFIG_FILES)"""
+    global _registry
+    if _registry is None:
+        from config import CONFIG_FILES
+        _registry = TemplateRegistry(CONFIG_FILES['templates'])
+    return _registry
@@ -0,0 +1,124 @@
+"""
+Instrumentacion por fases de cada intento de generacion.
+Convierte las marcas de tiempo de un intento (cola, envio, primer y ultimo
+token, guardado, validacion) en duraciones por fase y agrega percentiles
+por tipo de archivo para execution_report.json.
+"""
+
+import os
+
+from .token_budget import percentile
+
+
+def attempt_timeline(result, validation_started=None, validated_at=None):
+    """
+    Marcas de tiempo (epoch) de un intento.
+
+    Args:
+        result: Resultado de run_attempt ('queued_at', 'sent_at', 'ttft', 'finished_at', 'saved_at', 'ended_at')
+        validation_started: Inicio de early_validation_check (None si no se valido)
+        validated_at: Fin de early_validation_check
+
+    Returns:
+        dict: {'queued', 'sent', 'first_token', 'last_token', 'saved', 'ended', 'validation_started', 'validated'}
+    """
+    sent = result.get('sent_at')
+    ttft = result.get('ttft')
+    return {
+        'queued': result.get('queued_at'),
+        'sent': sent,
+        'first_token': sent + ttft if sent is not None and ttft is not None else None,
+        'last_token': result.get('finished_at'),
+        'saved': result.get('saved_at'),
+        'ended': result.get('ended_at'),
+        'validation_started': validation_started,
+        'validated': validated_at,
+    }
+
+
+def attempt_phases(timeline):
+    """
+    Duracion de cada fase de un intento (None si la fase no aplica).
+
+    - queue: espera al limitador de concurrencia (y al pool de hilos en el primer intento)
+    - ttft: envio -> primer token (prefill; solo streaming)
+    - decode: primer -> ultimo token (solo streaming)
+    - generation: envio -> ultimo token (motor subprocess: envio -> archivo guardado)
+    - save: ultimo token -> archivo publicado
+    - validation: early_validation_check
+    - total: cola -> fin del intento
+    """
+    def span(start, end):
+        if timeline.get(start) is None or timeline.get(end) is None:
+            return None
+        return round(max(0.0, timeline[end] - timeline[start]), 4)
+
+    end = 'validated' if timeline.get('validated') is not None else 'ended'
+    return {
+        'queue': span('queued', 'sent'),
+        'ttft': span('sent', 'first_token'),
+        'decode': span('first_token', 'last_token'),
+        'generation': span('sent', 'last_token' if timeline.get('last_token') is not None else 'saved'),
+        'save': span('last_token', 'saved'),
+        'validation': span('validation_started', 'validated'),
+        'total': span('queued', end),
+    }
+
+
+def record_validation(attempt, started, ended):
+    """Agrega la duracion de early_validation_check a un intento del reporte"""
+    attempt['timeline'].update(validation_started=started, validated=ended)
+    attempt['phases'] = attempt_phases(attempt['timeline'])
+
+
+def _stats(values, pcts):
+    if not values:
+        return None
+    summary = {f'p{pct}': round(percentile(values, pct), 4) for pct in pcts}
+    summary['count'] = len(values)
+    return summary
+
+
+def summarize_phases(results, pcts=(50, 95, 99)):
+    """
+    Percentiles de cada fase por tipo de archivo.
+
+    Ademas de las fases de cada intento incluye por tarea 'retry' (tiempo
+    gastado en intentos fallidos antes del ultimo) y 'task' (primer
+    encolado -> fin del ultimo intento), y los tokens de prompt/completion.
+
+    Args:
+        results: Resultados de execute_task (con 'attempts' y 'target')
+        pcts: Percentiles a calcular
+
+    Returns:
+        dict: {tipo: {fase: {'p50', 'p95', 'p99', 'count'}}}
+    """
+    samples = {}
+    for result in results:
+        # 'target' (ruta de salida de la tarea) existe tambien en tareas fallidas
+        output = result.get('target') or result.get('file_saved') or ''
+        file_type = os.path.splitext(output)[1].lstrip('.').lower() or 'sin_archivo'
+        bucket = samples.setdefault(file_type, {})
+
+        attempts = [a for a in result.get('attempts', []) if a.get('phases') and not a.get('cached')]
+        for attempt in attempts:
+            for phase, value in attempt['phases'].items():
+                if value is not None:
+                    bucket.setdefault(phase, []).append(value)
+            for key in ('prompt_tokens', 'completion_tokens'):
+                if attempt.get(key):
+                    bucket.setdefault(key, []).append(attempt[key])
+
+        if attempts:
+            retry = sum(a['phases']['total'] or 0 for a in attempts[:-1])
+            bucket.setdefault('retry', []).append(round(retry, 4))
+            first, last = attempts[0]['timeline'], attempts[-1]['timeline']
+            end = last['validated'] if last['validated'] is not None else last['ended']
+            if first['queued'] is not None and end is not None:
+                bucket.setdefault('task', []).append(round(end - first['queued'], 4))
+
+    return {
+        file_type: {name: _stats(values, pcts) for name, values in phases.items()}
+        for file_type, phases in sorted(samples.items())
+    }
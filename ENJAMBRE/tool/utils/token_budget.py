@@ -0,0 +1,156 @@
+"""
+Presupuesto dinamico de max_tokens a partir de ejecuciones anteriores.
+Aprende el tamano de las salidas por tipo de archivo, template y tarea
+desde los execution_report.json existentes.
+"""
+
+import glob
+import math
+import os
+
+from .file_ops import load_json
+
+
+def percentile(values, pct):
+    """Percentil por rango mas cercano (values no vacio)"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class TokenBudget:
+    """
+    Calcula un max_tokens ajustado para cada tarea.
+
+    Las muestras se agrupan de lo mas especifico a lo mas general:
+    (template, nombre de tarea) -> (template, extension) -> extension.
+    Se usa el primer grupo con al menos `min_samples` muestras y el
+    presupuesto es percentil `pct` x `margin`, acotado a [min_tokens, maximo del modo].
+
+    Args:
+        pct: Percentil de tamano de salida a cubrir
+        margin: Factor de holgura sobre el percentil
+        min_tokens: Presupuesto minimo
+        min_samples: Muestras minimas para confiar en un grupo
+        chars_per_token: Estimacion cuando un reporte no trae usage (bytes del archivo / este valor)
+    """
+
+    def __init__(self, pct=99, margin=1.25, min_tokens=256, min_samples=5, chars_per_token=3.5):
+        self.pct = pct
+        self.margin = margin
+        self.min_tokens = min_tokens
+        self.min_samples = min_samples
+        self.chars_per_token = chars_per_token
+        self.samples = {}
+        self.reports_loaded = 0
+
+    @staticmethod
+    def _ext(output):
+        return os.path.splitext(output or '')[1].lstrip('.').lower()
+
+    def _keys(self, output, template, name):
+        """Grupos de la tarea, de mas especifico a mas general (sin repetidos)"""
+        ext = self._ext(output)
+        keys = (('name', template, name), ('ext', template, ext), ('ext', None, ext))
+        return [key for key in dict.fromkeys(keys) if key[2]]
+
+    def add_sample(self, tokens, output, template=None, name=None):
+        """Registra el tamano (tokens) de una salida generada"""
+        if not tokens or tokens <= 0:
+            return
+        for key in self._keys(output, template, name):
+            self.samples.setdefault(key, []).append(tokens)
+
+    def load_report(self, report_path):
+        """Agrega las tareas exitosas de un execution_report.json"""
+        report = load_json(report_path)
+        if not isinstance(report, dict):
+            return False
+
+        template = (report.get('execution_info') or {}).get('template')
+        for result in report.get('results') or []:
+            if not result.get('success'):
+                continue
+            tokens = None
+            for attempt in reversed(result.get('attempts') or []):
+                if attempt.get('success') and attempt.get('completion_tokens'):
+                    tokens = attempt['completion_tokens']
+                    break
+            file_info = result.get('file_info') or {}
+            if tokens is None and file_info.get('size_bytes'):
+                tokens = int(file_info['size_bytes'] / self.chars_per_token)
+            self.add_sample(tokens, result.get('file_saved') or file_info.get('path'), template, result.get('name'))
+        self.reports_loaded += 1
+        return True
+
+    def load_history(self, directories):
+        """Carga los execution_report.json de los directorios dados (hasta 2 niveles)"""
+        seen = set()
+        for directory in directories:
+            if not directory or not os.path.isdir(directory):
+                continue
+            for pattern in ('execution_report.json', '*/execution_report.json', '*/*/execution_report.json'):
+                for path in glob.glob(os.path.join(directory, pattern)):
+                    real = os.path.realpath(path)
+                    if real not in seen:
+                        seen.add(real)
+                        self.load_report(real)
+        return self.reports_loaded
+
+    def max_tokens(self, mode_max, output=None, template=None, name=None):
+        """
+        Presupuesto para una tarea.
+
+        Args:
+            mode_max: max_tokens del modo (limite superior y valor sin historial)
+            output: Ruta de salida (define el tipo de archivo)
+            template: Template de la ejecucion
+            name: Nombre de la tarea
+
+        Returns:
+            int: max_tokens a pedir
+        """
+        for key in self._keys(output, template, name):
+            values = self.samples.get(key)
+            if values and len(values) >= self.min_samples:
+                budget = int(percentile(values, self.pct) * self.margin)
+                return min(max(budget, self.min_tokens), mode_max)
+        return mode_max
+
+    def stats(self):
+        """Resumen por tipo de archivo para execution_report.json"""
+        by_ext = {}
+        for (kind, template, value), values in self.samples.items():
+            if kind == 'ext' and template is None:
+                by_ext[value] = {
+                    'samples': len(values),
+                    f'p{self.pct}': percentile(values, self.pct),
+                }
+        return {'reports_loaded': self.reports_loaded, 'by_ext': by_ext}
+
+
+_token_budget = None
+
+
+def get_token_budget():
+    """Devuelve el presupuesto del proceso (None si no se configuro)"""
+    return _token_budget
+
+
+def configure_token_budget(history_dirs, enabled=True):
+    """
+    Crea el presupuesto del proceso con TOKEN_BUDGET de config y carga el historial.
+
+    Returns:
+        TokenBudget: None si esta desactivado
+    """
+    global _token_budget
+    if not enabled:
+        _token_budget = None
+        return None
+    from config import TOKEN_BUDGET
+    _token_budget = TokenBudget(TOKEN_BUDGET['percentile'], TOKEN_BUDGET['margin'],
+                                TOKEN_BUDGET['min_tokens'], TOKEN_BUDGET['min_samples'],
+                                TOKEN_BUDGET['chars_per_token'])
+    _token_budget.load_history(history_dirs)
+    return _token_budget
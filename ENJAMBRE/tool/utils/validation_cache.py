@@ -0,0 +1,139 @@
+"""
+Cache en disco de resultados de validacion direccionado por contenido.
+
+La clave es (hash del contenido, tipo de archivo, validador, version de las
+reglas): early_validation_check, validate_output.py, validate_media.py y
+modular_generator comparten la cache, asi que un archivo que no cambio no se
+vuelve a validar ni en otro proceso ni al repetir la generacion del proyecto.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from .response_cache import ResponseCache
+
+
+def content_digest(content):
+    """sha256 hexadecimal de un contenido (str o bytes)"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+# Digests de archivos ya leidos en el proceso: ruta -> ((mtime_ns, size), digest)
+_file_digests = {}
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(filepath):
+    """
+    Digest del contenido de un archivo (None si no existe o no se puede leer).
+
+    Dentro del proceso se reutiliza mientras el mtime y el tamano no cambien.
+    """
+    try:
+        stat = os.stat(filepath)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+    key = os.path.abspath(filepath)
+    with _file_digests_lock:
+        cached = _file_digests.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    try:
+        with open(filepath, 'rb') as f:
+            digest = content_digest(f.read())
+    except OSError:
+        return None
+    with _file_digests_lock:
+        _file_digests[key] = (signature, digest)
+    return digest
+
+
+class ValidationCache(ResponseCache):
+    """
+    Resultados de validacion (JSON) con la misma eviccion LRU que ResponseCache.
+
+    Args:
+        cache_dir: Directorio de la cache
+        max_bytes: Tamano maximo total en disco
+        rules: Version del conjunto de reglas (cambiarla invalida todo)
+        enabled: False valida siempre sin leer ni guardar
+    """
+
+    def __init__(self, cache_dir, max_bytes, rules, enabled=True):
+        super().__init__(cache_dir, max_bytes, enabled)
+        self.rules = rules
+
+    def make_key(self, validator, digest, file_type=None, extra=None):
+        """
+        Clave de una validacion.
+
+        Args:
+            validator: Nombre del validador ('early', 'file_language', ...)
+            digest: Hash del contenido validado (content_digest/file_digest)
+            file_type: Tipo de archivo
+            extra: Parametros adicionales del validador (serializables a JSON)
+        """
+        material = {'validator': validator, 'digest': digest, 'file_type': file_type,
+                    'rules': self.rules, 'extra': extra}
+        raw = json.dumps(material, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def validate(self, validator, digest, compute, file_type=None, extra=None):
+        """
+        Resultado de una validacion: desde la cache o ejecutando compute().
+
+        Args:
+            validator: Nombre del validador
+            digest: Hash del contenido (None: no cachear)
+            compute: Funcion sin argumentos que valida y devuelve un resultado JSON
+            file_type: Tipo de archivo
+            extra: Parametros adicionales del validador
+
+        Returns:
+            Resultado de compute (las tuplas vuelven como listas desde la cache)
+        """
+        if not self.enabled or digest is None:
+            return compute()
+        key = self.make_key(validator, digest, file_type, extra)
+        cached = self.get(key)
+        if cached is not None:
+            try:
+                return json.loads(cached)['result']
+            except (ValueError, KeyError):
+                pass
+        result = compute()
+        self.put(key, json.dumps({'validator': validator, 'result': result}, ensure_ascii=False))
+        return result
+
+    def stats(self):
+        """Contadores para execution_report.json"""
+        stats = super().stats()
+        stats.pop('refresh', None)
+        stats['rules'] = self.rules
+        return stats
+
+
+_validation_cache = None
+
+
+def get_validation_cache():
+    """Devuelve la cache de validaciones del proceso (VALIDATION_CACHE de config)"""
+    global _validation_cache
+    if _validation_cache is None:
+        from config import VALIDATION_CACHE
+        from .validators import rules_version
+        _validation_cache = ValidationCache(VALIDATION_CACHE['dir'], VALIDATION_CACHE['max_bytes'],
+                                            rules_version(), VALIDATION_CACHE['enabled'])
+    return _validation_cache
+
+
+def configure_validation_cache(enabled=True):
+    """Activa o desactiva la cache de validaciones del proceso"""
+    cache = get_validation_cache()
+    cache.enabled = enabled
+    return cache
@@ -3,7 +3,14 @@ Validaciones de contenido y lenguaje para archivos generados.
 Detecta errores comunes como mezcla de lenguajes.
 """
 
+import hashlib
+import json
 import os
+import threading
+from collections import OrderedDict
+
+from .pattern_scan import PatternScanner, ScanResult
+from .validation_cache import content_digest, get_validation_cache
 
 # Patrones que indican lenguaje INCORRECTO en un tipo de archivo
 WRONG_LANG_PATTERNS = {
@@ -26,6 +33,47 @@ WRONG_LANG_PATTERNS = {
     ],
 }
 
+# Patrones de codigo Python/Flask que no deben aparecer en un .js
+PYTHON_IN_JS_PATTERNS = [
+    'from flask import',
+    'from flask import Flask',
+    'app = Flask(',
+    '@app.route(',
+    'def index(',
+    "render_template('",
+    "if __name__ == '__main__':",
+    'app.run(port=5000',
+    'app.run(port=5000,',
+    'debug=True'
+]
+
+# Patrones que abortan una generacion en streaming apenas aparecen.
+# Son un subconjunto conservador de WRONG_LANG_PATTERNS: solo los que no
+# pueden aparecer legitimamente en un archivo correcto.
+STREAM_ABORT_PATTERNS = {
+    'js': PYTHON_IN_JS_PATTERNS + ["require('", 'require("', 'require(`', 'module.exports'],
+    'css': ['from flask', '@app.route', 'def ', '<!DOCTYPE', '<html'],
+    'html': ['from flask', '@app.route', 'def index('],
+    'python': ['<!DOCTYPE', '<html>', '</html>'],
+}
+
+# APIs de Node.js server-side (no funcionan en el navegador)
+NODEJS_API_PATTERNS = ['fs.', 'path.', 'process.', '__dirname', '__filename']
+
+# Sintaxis CommonJS (Node.js) en un .js
+COMMONJS_PATTERNS = ["require('", 'require("', 'require(`']
+
+# Etiquetas de apertura/cierre que debe tener un HTML completo
+HTML_STRUCTURE_PATTERNS = ['</html>', '<body>', '</body>', '<head>', '</head>']
+
+# Extension de archivo -> tipo usado en los diccionarios de patrones
+FILE_TYPES_BY_EXT = {
+    'py': 'python',
+    'html': 'html',
+    'css': 'css',
+    'js': 'js',
+}
+
 # Keywords ESPERADOS por tipo de archivo (minimo 50% deben estar presentes)
 EXPECTED_KEYWORDS = {
     'css': ['body', '{', '}', ':', ';'],
@@ -43,6 +91,108 @@ REQUIRED_KEYWORDS = {
 }
 
 
+# Version de la logica de validacion: subirla al cambiar como se evaluan los
+# patrones (los cambios en las tablas de patrones ya cambian rules_version())
+RULES_VERSION = 3
+
+
+def rules_version():
+    """Huella de las reglas de validacion (invalida la cache de validaciones)"""
+    tables = [RULES_VERSION, WRONG_LANG_PATTERNS, PYTHON_IN_JS_PATTERNS, STREAM_ABORT_PATTERNS,
+              NODEJS_API_PATTERNS, COMMONJS_PATTERNS, HTML_STRUCTURE_PATTERNS, EXPECTED_KEYWORDS,
+              REQUIRED_KEYWORDS]
+    raw = json.dumps(tables, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _scan_groups(file_type):
+    """Todos los patrones de validacion de un tipo de archivo, por comprobacion"""
+    groups = {
+        'wrong_lang': WRONG_LANG_PATTERNS.get(file_type, []),
+        'expected': EXPECTED_KEYWORDS.get(file_type, []),
+        'required': REQUIRED_KEYWORDS.get(file_type, []),
+        'stream_abort': STREAM_ABORT_PATTERNS.get(file_type, []),
+    }
+    if file_type == 'js':
+        groups.update(python_in_js=PYTHON_IN_JS_PATTERNS, nodejs_api=NODEJS_API_PATTERNS,
+                      commonjs=['require('] + COMMONJS_PATTERNS + ['module.exports'], es_modules=['import ', ' from '])
+    elif file_type == 'html':
+        groups['structure'] = HTML_STRUCTURE_PATTERNS
+    elif file_type == 'python':
+        groups['flask'] = ['from flask import']
+    return groups
+
+
+_scanners = {}
+
+
+def get_scanner(file_type):
+    """PatternScanner de un tipo de archivo (se compila una vez por proceso)"""
+    scanner = _scanners.get(file_type)
+    if scanner is None:
+        scanner = _scanners[file_type] = PatternScanner(_scan_groups(file_type))
+    return scanner
+
+
+def scan_content(content, file_type):
+    """
+    Escanea un contenido con los patrones de su tipo.
+
+    Args:
+        content: Texto (o un ScanResult, que se devuelve tal cual)
+        file_type: Tipo ('css', 'js', 'html', 'python'; otro: sin poda)
+
+    Returns:
+        ScanResult: cada patron se busca a lo sumo una vez
+    """
+    if isinstance(content, ScanResult):
+        return content
+    return get_scanner(file_type).scan(content)
+
+
+# Lecturas recientes de archivos: (ruta) -> ((mtime_ns, size), ScanResult)
+_file_scans = OrderedDict()
+_file_scans_lock = threading.Lock()
+_FILE_SCANS_MAX = 64
+
+
+def scan_file(filepath):
+    """
+    ScanResult de un archivo, leido una sola vez mientras no cambie.
+
+    Las validaciones de proyecto consultan muchos patrones de los mismos
+    archivos; la lectura y las busquedas se reutilizan mientras el mtime y
+    el tamano del archivo no cambien.
+
+    Returns:
+        ScanResult: None si el archivo no existe o no se puede leer
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(filepath)
+    with _file_scans_lock:
+        cached = _file_scans.get(key)
+        if cached and cached[0] == signature:
+            _file_scans.move_to_end(key)
+            return cached[1]
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception:
+        return None
+    ext = os.path.splitext(filepath)[1].lstrip('.').lower()
+    scan = scan_content(content, FILE_TYPES_BY_EXT.get(ext, ext))
+    with _file_scans_lock:
+        _file_scans[key] = (signature, scan)
+        _file_scans.move_to_end(key)
+        while len(_file_scans) > _FILE_SCANS_MAX:
+            _file_scans.popitem(last=False)
+    return scan
+
+
 def check_file_content(filepath, search_string):
     """
     Busca un string en el contenido de un archivo.
@@ -54,13 +204,8 @@ def check_file_content(filepath, search_string):
     Returns:
         bool: True si se encuentra, False si no existe o no se encuentra
     """
-    if not os.path.exists(filepath):
-        return False
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return search_string in f.read()
-    except Exception:
-        return False
+    scan = scan_file(filepath)
+    return scan is not None and search_string in scan
 
 
 def detect_wrong_language(content, file_type):
@@ -68,18 +213,45 @@ def detect_wrong_language(content, file_type):
     Detecta si hay codigo de otro lenguaje contaminando el archivo.
 
     Args:
-        content: Contenido del archivo
+        content: Contenido del archivo (o su ScanResult)
         file_type: Tipo esperado ('css', 'js', 'html', 'python')
 
     Returns:
         list: Lista de patrones incorrectos encontrados (vacia si OK)
     """
-    patterns = WRONG_LANG_PATTERNS.get(file_type, [])
-    found = []
-    for pattern in patterns:
-        if pattern in content:
-            found.append(pattern)
-    return found
+    return scan_content(content, file_type).group('wrong_lang')
+
+
+def check_partial_output(content, file_type, start=0):
+    """
+    Revisa codigo parcial (streaming) buscando senales de lenguaje incorrecto.
+
+    Args:
+        content: Codigo recibido hasta el momento
+        file_type: Tipo esperado ('css', 'js', 'html', 'python')
+        start: Offset desde el que hay texto nuevo (evita re-escanear todo)
+
+    Returns:
+        str: Mensaje de error si hay que abortar, None si se puede seguir
+    """
+    if file_type == 'js':
+        stripped = content.lstrip()
+        first_line_end = stripped.find('\n')
+        if first_line_end != -1 and start <= len(content) - len(stripped) + first_line_end:
+            if stripped[:first_line_end].strip().startswith('#'):
+                return "Archivo JavaScript contiene comentarios estilo Python (#) - debe usar // o /* */"
+
+    patterns = STREAM_ABORT_PATTERNS.get(file_type, [])
+    if not patterns:
+        return None
+
+    # Solapar con el texto anterior para no perder patrones partidos entre chunks
+    overlap = max(len(p) for p in patterns)
+    window = content[max(0, start - overlap):]
+    pattern = scan_content(window, file_type).first_of(patterns)
+    if pattern:
+        return f"Contenido de otro lenguaje detectado en streaming: '{pattern}'"
+    return None
 
 
 def validate_file_language(filepath, file_type):
@@ -111,8 +283,18 @@ def validate_file_language(filepath, file_type):
     except Exception as e:
         return {'valid': False, 'status': 'ERROR', 'message': str(e)}
 
+    # size va en la clave: el texto leido no distingue finales de linea CRLF/LF
+    return get_validation_cache().validate(
+        'file_language', content_digest(content),
+        lambda: _file_language_result(content, file_type, size), file_type, extra=size
+    )
+
+
+def _file_language_result(content, file_type, size):
+    scan = scan_content(content, file_type)
+
     # Detectar lenguaje incorrecto
-    wrong_patterns = detect_wrong_language(content, file_type)
+    wrong_patterns = scan.group('wrong_lang')
     if wrong_patterns:
         return {
             'valid': False,
@@ -123,7 +305,7 @@ def validate_file_language(filepath, file_type):
 
     # Verificar keywords esperados
     keywords = EXPECTED_KEYWORDS.get(file_type, [])
-    found = sum(1 for kw in keywords if kw in content)
+    found = len(scan.group('expected'))
     if found < len(keywords) // 2:
         return {
             'valid': False,
@@ -155,9 +337,15 @@ def validate_required_keywords(filepath, file_type):
     except Exception as e:
         return False, f"Error leyendo: {e}"
 
-    required = REQUIRED_KEYWORDS.get(file_type, [])
-    for keyword in required:
-        if keyword not in content:
-            return False, f"Falta keyword: {keyword}"
+    return tuple(get_validation_cache().validate(
+        'required_keywords', content_digest(content),
+        lambda: _required_keywords_result(content, file_type), file_type
+    ))
+
 
+def _required_keywords_result(content, file_type):
+    scan = scan_content(content, file_type)
+    for keyword in REQUIRED_KEYWORDS.get(file_type, []):
+        if keyword not in scan:
+            return False, f"Falta keyword: {keyword}"
     return True, "OK"
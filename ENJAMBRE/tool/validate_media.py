@@ -7,34 +7,50 @@ Verifica que contengan keywords esenciales según el tipo
 import os
 import sys
 
-from utils import check_file_content
+from utils import ProjectSnapshot, get_validation_cache
 
-def validate_file(file_path, file_type):
-    """Valida un archivo individual"""
-    if not os.path.exists(file_path):
+# Keywords obligatorias por tipo (flexible con comillas)
+MEDIA_KEYWORDS = {
+    'python': ['Flask', 'render_template', '@app.route'],
+    'html': ['<!DOCTYPE html>', 'link rel=', 'script src'],
+    'css': ['body', 'margin', 'background', 'canvas'],
+    'js': ['const canvas', 'particles', 'requestAnimationFrame', 'mouse']
+}
+
+def validate_file(file_path, file_type, snapshot=None):
+    """
+    Valida un archivo individual (cacheado por hash de contenido).
+
+    Args:
+        file_path: Ruta del archivo (relativa al proyecto si se pasa snapshot)
+        file_type: Tipo ('python', 'html', 'css', 'js')
+        snapshot: ProjectSnapshot del proyecto (una lectura por archivo)
+    """
+    if snapshot is None:
+        snapshot = ProjectSnapshot(os.path.dirname(file_path))
+        file_path = os.path.basename(file_path)
+    if not snapshot.exists(file_path):
         return False, "Archivo no existe"
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Keywords obligatorias por tipo (flexible con comillas)
-    keywords = {
-        'python': ['Flask', 'render_template', '@app.route'],
-        'html': ['<!DOCTYPE html>', 'link rel=', 'script src'],
-        'css': ['body', 'margin', 'background', 'canvas'],
-        'js': ['const canvas', 'particles', 'requestAnimationFrame', 'mouse']
-    }
-    
-    required = keywords.get(file_type, [])
+    content = snapshot.read(file_path)
+    if content is None:
+        return False, "Error leyendo el archivo"
     
+    required = MEDIA_KEYWORDS.get(file_type, [])
+    return tuple(get_validation_cache().validate(
+        'media', snapshot.digest(file_path), lambda: check_keywords(content, required), file_type, extra=required
+    ))
+
+def check_keywords(content, required):
+    """Primer keyword obligatorio que falta en el contenido"""
     for keyword in required:
         if keyword not in content:
             return False, f"Falta keyword: {keyword}"
     
     return True, "OK"
 
-def validate_project(project_dir):
-    """Valida todo el proyecto"""
+def validate_project(project_dir, snapshot=None):
+    """Valida todo el proyecto (snapshot: ProjectSnapshot ya cargado del mismo proyecto)"""
     files_to_check = {
         'app.py': 'python',
         'templates/index.html': 'html',
@@ -44,10 +60,10 @@ def validate_project(project_dir):
     
     results = {}
     all_passed = True
+    snapshot = snapshot or ProjectSnapshot(project_dir)
     
     for file_path, file_type in files_to_check.items():
-        full_path = os.path.join(project_dir, file_path)
-        passed, message = validate_file(full_path, file_type)
+        passed, message = validate_file(file_path, file_type, snapshot)
         results[file_path] = {'passed': passed, 'message': message}
         if not passed:
             all_passed = False
@@ -57,14 +73,8 @@ def validate_project(project_dir):
         'details': results
     }
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Uso: python validate_media.py <project_dir>")
-        sys.exit(1)
-    
-    project_dir = sys.argv[1]
-    result = validate_project(project_dir)
-    
+def print_report(result):
+    """Imprime el resultado de validate_project"""
     print("\n" + "="*60)
     print("VALIDACION MEDIA - KEYWORDS")
     print("="*60)
@@ -78,4 +88,13 @@ if __name__ == '__main__':
         print("OK: TODAS LAS VALIDACIONES PASARON")
     else:
         print("FAIL: ALGUNAS VALIDACIONES FALLARON")
-    print("="*60)
\ No newline at end of file
+    print("="*60)
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Uso: python validate_media.py <project_dir>")
+        sys.exit(1)
+    
+    project_dir = sys.argv[1]
+    result = validate_project(project_dir)
+    print_report(result)
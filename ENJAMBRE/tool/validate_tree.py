@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Validacion en paralelo de todos los proyectos generados bajo una carpeta.
+
+Recorre el arbol, detecta las raices de proyecto (app.py, index.html o
+templates/index.html), las reparte en lotes entre un pool de procesos y
+ejecuta en cada una validate_output.validate_structure y
+validate_media.validate_project sobre un mismo ProjectSnapshot. Los
+resultados se combinan en un reporte JSON o JSONL; con la cache de
+validaciones los proyectos sin cambios no se vuelven a validar. Solo lee:
+no aplica las correcciones de validate_structure (fix_html_urls).
+
+Uso:
+    python validate_tree.py ../tests --type flask-fullstack --output tree_report.json
+    python validate_tree.py /proyectos --workers 16 --output tree_report.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import ProjectSnapshot, configure_validation_cache, ensure_dir_exists, save_json
+from validate_output import validate_structure, structure_types
+from validate_media import validate_project as validate_media_project
+
+# Archivos que marcan la raiz de un proyecto generado
+PROJECT_MARKERS = ['app.py', 'index.html', os.path.join('templates', 'index.html')]
+
+# Carpetas que no se recorren
+SKIP_DIRS = {'__pycache__', 'node_modules', 'venv', '.git', '.cache'}
+
+CHECKS = ('structure', 'media')
+
+
+def find_projects(root):
+    """
+    Raices de proyecto bajo una carpeta (sin entrar en subcarpetas de un proyecto).
+
+    Returns:
+        list: Rutas ordenadas
+    """
+    projects = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if any(os.path.isfile(os.path.join(dirpath, marker)) for marker in PROJECT_MARKERS):
+            projects.append(dirpath)
+            dirnames[:] = []
+            continue
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.'))
+    return sorted(projects)
+
+
+def init_worker(cache_enabled):
+    """Inicializa la cache de validaciones en cada proceso del pool"""
+    configure_validation_cache(enabled=cache_enabled)
+
+
+def validate_project(job):
+    """
+    Valida un proyecto (se ejecuta en un proceso del pool).
+
+    Args:
+        job: (ruta del proyecto, tipo de template, checks)
+
+    Returns:
+        dict: {'project', 'success', 'structure', 'media', 'reads', 'elapsed'}
+    """
+    project_dir, template_type, checks = job
+    started = time.perf_counter()
+    snapshot = ProjectSnapshot(project_dir)
+    result = {'project': project_dir, 'success': True}
+    try:
+        if 'structure' in checks:
+            result['structure'] = validate_structure(snapshot, template_type, fix=False)
+            result['success'] = result['success'] and result['structure']['success']
+        if 'media' in checks:
+            result['media'] = validate_media_project(project_dir, snapshot)
+            result['success'] = result['success'] and result['media']['success']
+    except Exception as e:
+        result.update(success=False, error=f"{type(e).__name__}: {e}")
+    result['reads'] = snapshot.reads
+    result['elapsed'] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def run_validation(projects, template_type, checks, workers, cache_enabled=True):
+    """
+    Valida los proyectos en un pool de procesos (en este proceso si workers es 1).
+
+    Los proyectos se reparten en lotes (chunksize) para que el coste de IPC no
+    domine en arboles de miles de proyectos pequenos.
+
+    Yields:
+        dict: Resultado de cada proyecto, en el orden de `projects`
+    """
+    jobs = [(project, template_type, checks) for project in projects]
+    if workers <= 1 or len(jobs) <= 1:
+        init_worker(cache_enabled)
+        for job in jobs:
+            yield validate_project(job)
+        return
+
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(cache_enabled,)) as pool:
+        yield from pool.map(validate_project, jobs, chunksize=chunksize)
+
+
+def summarize(results, elapsed, workers):
+    failed = [r['project'] for r in results if not r['success']]
+    return {
+        'projects': len(results),
+        'passed': len(results) - len(failed),
+        'failed': len(failed),
+        'failed_projects': failed,
+        'elapsed_time': round(elapsed, 4),
+        'projects_per_sec': round(len(results) / elapsed, 2) if elapsed else None,
+        'workers': workers,
+        'file_reads': sum(r.get('reads', 0) for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Valida en paralelo todos los proyectos bajo una carpeta')
+    parser.add_argument('root', help='Carpeta a recorrer')
+    parser.add_argument('--type', default='flask', choices=structure_types(),
+                        help='Tipo de proyecto para validate_structure')
+    parser.add_argument('--checks', default=','.join(CHECKS), help='Validaciones separadas por coma (structure, media)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos del pool')
+    parser.add_argument('--output', help='Reporte combinado (.json, o .jsonl: una linea por proyecto + resumen)')
+    parser.add_argument('--no-cache', action='store_true', help='Revalidar aunque los archivos no hayan cambiado')
+    parser.add_argument('--quiet', action='store_true', help='Mostrar solo el resumen')
+    args = parser.parse_args()
+
+    checks = tuple(c.strip() for c in args.checks.split(',') if c.strip())
+    if not checks or any(c not in CHECKS for c in checks):
+        parser.error(f"--checks: valores validos {', '.join(CHECKS)}")
+    if not os.path.isdir(args.root):
+        parser.error(f"No existe la carpeta: {args.root}")
+
+    projects = find_projects(args.root)
+    if not projects:
+        print(f"No se encontraron proyectos en {args.root}")
+        sys.exit(1)
+    workers = max(1, min(args.workers, len(projects)))
+    print(f"Validando {len(projects)} proyectos con {workers} procesos...")
+
+    jsonl = args.output and args.output.endswith('.jsonl')
+    stream = None
+    if jsonl:
+        ensure_dir_exists(os.path.dirname(os.path.abspath(args.output)))
+        stream = open(args.output, 'w', encoding='utf-8')
+
+    started = time.perf_counter()
+    results = []
+    try:
+        for result in run_validation(projects, args.type, checks, workers, cache_enabled=not args.no_cache):
+            results.append(result)
+            if stream:
+                stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+            if not args.quiet:
+                status = 'OK' if result['success'] else 'FAIL'
+                print(f"  [{status}] {os.path.relpath(result['project'], args.root)}")
+    finally:
+        elapsed = time.perf_counter() - started
+        summary = summarize(results, elapsed, workers)
+        if stream:
+            stream.write(json.dumps({'summary': summary}, ensure_ascii=False) + '\n')
+            stream.close()
+
+    if args.output and not jsonl:
+        save_json(args.output, {'summary': summary, 'results': results})
+
+    print(f"\n{summary['passed']}/{summary['projects']} proyectos pasaron "
+          f"({summary['elapsed_time']:.2f}s, {summary['projects_per_sec'] or 0:.1f} proyectos/s)")
+    if args.output:
+        print(f"Reporte: {args.output}")
+    sys.exit(0 if not summary['failed'] else 1)
+
+
+if __name__ == '__main__':
+    main()